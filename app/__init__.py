@@ -7,9 +7,9 @@ from flask_migrate import Migrate
 from dotenv import load_dotenv
 from flask_wtf import CSRFProtect
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flask_socketio import SocketIO
 from flask_login import LoginManager
+from app.rate_limits import request_key
 import os
 
 load_dotenv()  # Load environment variables from .env file
@@ -21,7 +21,7 @@ db = SQLAlchemy()
 migrate = Migrate()
 csrf = CSRFProtect()
 socketio = SocketIO(cors_allowed_origins="*")  # Add this line
-limiter = Limiter(key_func=get_remote_address)  # make global instance
+limiter = Limiter(key_func=request_key)  # make global instance; policy in app/rate_limits.py
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"  # the name of your login route
 
@@ -37,7 +37,42 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['BREVO_API_KEY'] = os.getenv('BREVO_API_KEY')
+    app.config['BREVO_API_HOST'] = os.getenv('BREVO_API_HOST')  # optional override, e.g. a local fake server
+    # Group emails as one Brevo call per chunk (message versions) instead of one per member
+    app.config['BREVO_BATCH_MODE'] = os.getenv('BREVO_BATCH_MODE', 'false').lower() == 'true'
+    app.config['BREVO_BATCH_SIZE'] = int(os.getenv('BREVO_BATCH_SIZE', 100))
+    # Public address of the app (e.g. https://vms.example.com): batch emails link each member's QR image under it
+    app.config['PUBLIC_BASE_URL'] = os.getenv('PUBLIC_BASE_URL')
+    # How long those QR image links stay valid, in seconds (default 14 days)
+    app.config['QR_LINK_MAX_AGE'] = int(os.getenv('QR_LINK_MAX_AGE', 14 * 24 * 3600))
+    # Optional on-disk cache for rendered QR PNGs (in-memory LRU is always on)
+    app.config['QR_CACHE_DIR'] = os.getenv('QR_CACHE_DIR')
+    # Shared Brevo client: keep-alive pool size and (connect, read) timeouts in seconds
+    app.config['BREVO_POOL_SIZE'] = int(os.getenv('BREVO_POOL_SIZE', 10))
+    app.config['BREVO_CONNECT_TIMEOUT'] = float(os.getenv('BREVO_CONNECT_TIMEOUT', 5))
+    app.config['BREVO_READ_TIMEOUT'] = float(os.getenv('BREVO_READ_TIMEOUT', 30))
+    # Shared state for running several workers / instances (see render.yaml):
+    # rate-limit counters live in Redis, and Socket.IO events are relayed between
+    # processes through a Redis message queue. Without REDIS_URL both stay in-process (single worker only).
     app.config['RATELIMIT_STORAGE_URI'] = os.getenv("REDIS_URL", "memory://")
+    app.config['RATELIMIT_IN_MEMORY_FALLBACK_ENABLED'] = True  # keep limiting (per process) if Redis is down
+    app.config['SOCKETIO_MESSAGE_QUEUE'] = os.getenv("SOCKETIO_MESSAGE_QUEUE") or os.getenv("REDIS_URL")
+    # Number of reverse proxies in front of the app (Render: 1) so limits key on the real client IP
+    app.config['PROXY_COUNT'] = int(os.getenv("PROXY_COUNT", 0))
+    # Email outbox: 'inline' runs the dispatcher in the web process, 'worker' leaves it to `flask outbox-worker`
+    app.config['EMAIL_OUTBOX_DISPATCHER'] = os.getenv("EMAIL_OUTBOX_DISPATCHER", "inline")
+    app.config['EMAIL_OUTBOX_CONCURRENCY'] = int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", 4))
+    # Analytics response cache (shared through Redis when there is one) and its entry TTL in seconds
+    app.config['ANALYTICS_CACHE_REDIS_URL'] = os.getenv("REDIS_URL")
+    app.config['ANALYTICS_CACHE_TTL'] = int(os.getenv("ANALYTICS_CACHE_TTL", 3600))
+    # Opt-in event-loop stall detector: logs any greenlet holding the hub longer than the threshold
+    app.config['STALL_DETECTOR'] = os.getenv("STALL_DETECTOR", "false").lower() == "true"
+    app.config['STALL_THRESHOLD_MS'] = int(os.getenv("STALL_THRESHOLD_MS", 200))
+    # Flask-Login identity cache (shared through Redis when there is one); TTL in seconds
+    app.config['USER_CACHE_REDIS_URL'] = os.getenv("REDIS_URL")
+    app.config['USER_CACHE_TTL'] = int(os.getenv("USER_CACHE_TTL", 60))
+    # Live page updates are merged over this many seconds (0 = emit right away)
+    app.config['LIVE_UPDATE_WINDOW'] = float(os.getenv("LIVE_UPDATE_WINDOW", 0.25))
     '''
     Temporarily removed
     # Mail Configuration
@@ -52,34 +87,50 @@ def create_app():
     '''
     
     # Connection Pool Management for Render/Eventlet/Psycopg2
+    # Per worker process: keep DB_POOL_SIZE + DB_MAX_OVERFLOW times WEB_CONCURRENCY x instances
+    # below the database's connection limit. Greenlets wait up to DB_POOL_TIMEOUT for a free one.
     app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        "pool_size": 10,
-        "max_overflow": 5,
-        "pool_timeout": 30,
-        "pool_recycle": 1800  # recycle connections_
-    }
-
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_pre_ping': True
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 5)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),  # recycle connections_
+        "pool_pre_ping": True,
     }
+    # Under eventlet, let other greenlets run while a query waits on Postgres (see app/green_db.py)
+    app.config['DB_GREEN'] = os.getenv("DB_GREEN", "true").lower() == "true"
     #Temporarily Removed
     '''
     if not app.config['MAIL_USERNAME'] or not app.config['MAIL_PASSWORD']:
         raise RuntimeError("Missing mail credentials in .env")
     '''
 
+    if app.config['PROXY_COUNT']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'], x_proto=app.config['PROXY_COUNT'])
+
+    if int(os.getenv("WEB_CONCURRENCY", 1)) > 1 and not app.config['SOCKETIO_MESSAGE_QUEUE']:
+        print("WARNING: WEB_CONCURRENCY > 1 without REDIS_URL: live updates and rate limits won't be shared between workers")
+
+    if app.config['BREVO_BATCH_MODE'] and not app.config['PUBLIC_BASE_URL']:
+        print("WARNING: BREVO_BATCH_MODE=true without PUBLIC_BASE_URL: group emails are sent one per member, not batched")
+
     # Initialize extensions
+    # Cooperative psycopg2 under eventlet (queries wait without blocking the worker)
+    from app import green_db
+    green_db.init_app(app)
     db.init_app(app)
     #Removed temporarily
     #mail.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
-    socketio.init_app(app)
-    limiter.init_app(app)
+    socketio.init_app(app, message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
+    # Per-class, per-user / per-IP budgets (gate scans generous, public forms strict)
+    from app import rate_limits
+    rate_limits.init_app(app, limiter)
     login_manager.init_app(app)
-
-    # Set default rate limits
-    limiter.default_limits = ["100 per day", "20 per hour"]
+    # Brevo API client is built once here and shared by every email send
+    from app.brevo_client import brevo_client
+    brevo_client.init_app(app)
 
     # Register Blueprints
     from app.routes import main, auth, request, scan, download_log, analytic, profile, download_template
@@ -94,6 +145,30 @@ def create_app():
 
     from app.models import User
 
+    # Email outbox config defaults + `flask outbox-worker` command
+    from app import email_outbox
+    email_outbox.init_app(app)
+
+    # `flask analytics-rebuild` (recomputes the check-in rollups from the logs)
+    from app import analytics_rollup
+    analytics_rollup.init_app(app)
+
+    # Cached user loading for Flask-Login, invalidated when a user is changed
+    from app.user_cache import user_cache
+    user_cache.init_app(app)
+
+    # Analytics response cache, invalidated whenever visitor logs are committed
+    from app.analytics_cache import analytics_cache
+    analytics_cache.init_app(app)
+
+    # Event-loop stall traces (STALL_DETECTOR=true), served at /admin/event-loop-stalls
+    from app.stall_detector import stall_detector
+    stall_detector.init_app(app)
+
+    # Coalesced, room-scoped Socket.IO broadcasts (dashboard / logs / request pages)
+    from app.live_updates import broadcaster
+    broadcaster.init_app(app)
+
     # Register Jinja filters
     from app.utils.helpers import convert_to_ph_time_only
     app.jinja_env.filters['ph_time_only'] = convert_to_ph_time_only
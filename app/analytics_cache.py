@@ -0,0 +1,140 @@
+# app/analytics_cache.py
+# Response cache for the analytics blueprint. Cached bodies are keyed by
+# endpoint + query string under the current *data version*; any commit that
+# wrote visitor logs replaces the version, so stale entries are never read
+# again (they simply expire). The same version feeds the ETag, so a browser
+# that already has the current data gets a 304 without any query running.
+#
+# With REDIS_URL the version and the bodies live in Redis and are shared by all
+# workers; otherwise they are kept in-process (single worker, see render.yaml).
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from app.models import db
+
+VERSION_KEY = "analytics:version"
+
+
+class AnalyticsCache:
+    def __init__(self):
+        self._redis = None
+        self._lock = threading.Lock()
+        self._version = uuid.uuid4().hex
+        self._bodies = OrderedDict()  # (version, key) -> bytes, LRU order
+
+    def init_app(self, app):
+        app.config.setdefault('ANALYTICS_CACHE_REDIS_URL', None)
+        app.config.setdefault('ANALYTICS_CACHE_TTL', 3600)
+        app.config.setdefault('ANALYTICS_CACHE_SIZE', 256)
+        if app.config['ANALYTICS_CACHE_REDIS_URL']:
+            import redis
+            self._redis = redis.Redis.from_url(app.config['ANALYTICS_CACHE_REDIS_URL'],
+                                               socket_timeout=1, socket_connect_timeout=1)
+        app.extensions['analytics_cache'] = self
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+
+    # --- data version ---
+
+    def mark_changed(self):
+        """Call when staging writes that change analytics data; the version is replaced after commit."""
+        db.session.info['analytics_changed'] = True
+
+    def _after_commit(self, session):
+        if session.info.pop('analytics_changed', False):
+            self.bump()
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('analytics_changed', None)
+
+    def bump(self):
+        version = uuid.uuid4().hex
+        if self._redis is not None:
+            try:
+                self._redis.set(VERSION_KEY, version)
+                return
+            except Exception as e:
+                print(f"Analytics cache: version bump failed ({e}); cached results may be stale")
+        with self._lock:
+            self._version = version
+            self._bodies.clear()
+
+    def version(self):
+        if self._redis is not None:
+            try:
+                version = self._redis.get(VERSION_KEY)
+                if version is None:
+                    self._redis.set(VERSION_KEY, self._version, nx=True)
+                    version = self._redis.get(VERSION_KEY)
+                return version.decode()
+            except Exception as e:
+                print(f"Analytics cache unavailable: {e}")
+                return None
+        return self._version
+
+    # --- bodies ---
+
+    def _get(self, version, key):
+        if self._redis is not None:
+            try:
+                return self._redis.get(f"analytics:{version}:{key}")
+            except Exception:
+                return None
+        with self._lock:
+            body = self._bodies.get((version, key))
+            if body is not None:
+                self._bodies.move_to_end((version, key))
+            return body
+
+    def _set(self, version, key, body):
+        if self._redis is not None:
+            try:
+                self._redis.set(f"analytics:{version}:{key}", body, ex=current_app.config['ANALYTICS_CACHE_TTL'])
+            except Exception:
+                pass
+            return
+        with self._lock:
+            if version != self._version:
+                return  # data changed while this body was computed
+            self._bodies[(version, key)] = body
+            while len(self._bodies) > current_app.config['ANALYTICS_CACHE_SIZE']:
+                self._bodies.popitem(last=False)
+
+    def respond(self, view, *args, **kwargs):
+        key = f"{request.endpoint}?{urlencode(sorted(request.args.items(multi=True)))}"
+        version = self.version()
+        if version is None:
+            return view(*args, **kwargs)  # cache down: serve uncached
+
+        etag = hashlib.sha1(f"{version}|{key}".encode()).hexdigest()[:20]
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            body = self._get(version, key)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                self._set(version, key, response.get_data())
+        response.set_etag(etag)
+        # browsers keep the body but revalidate every time (cheap 304 while nothing changed)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+analytics_cache = AnalyticsCache()
+
+
+def cached(view):
+    """Serves a GET JSON analytics view through the analytics cache (with ETag/304)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return analytics_cache.respond(view, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,206 @@
+# app/analytics_rollup.py
+# Check-in rollups for the analytics endpoints. Every check-in bumps its
+# (day, hour, destination, gate), (day, destination) and (day/month, visitor)
+# counters in the same transaction as the log itself, so the rollups are always
+# exact; the `flask analytics-rebuild` command recomputes them from VisitorLog
+# when needed (backfill, repair after manual edits).
+from collections import Counter
+from datetime import date, datetime, timedelta
+import click
+import pytz
+from sqlalchemy import func, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.analytics_cache import analytics_cache
+from app.models import db, HourlyCheckinRollup, DailyDestinationRollup, DailyVisitorRollup, MonthlyVisitorRollup
+
+MANILA = pytz.timezone('Asia/Manila')
+
+
+def _manila(ts):
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=pytz.utc)  # logs are written with datetime.utcnow()
+    return ts.astimezone(MANILA)
+
+
+def _upsert(model, counts, keys):
+    if not counts:
+        return
+    # sorted so concurrent batches lock rollup rows in the same order
+    rows = [dict(zip(keys, key), checkins=n) for key, n in sorted(counts.items())]
+    stmt = pg_insert(model).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=keys, set_={"checkins": model.checkins + stmt.excluded.checkins}
+    ))
+
+
+def record_checkins(logs):
+    """Adds a batch of Checked-In log values (dicts) to the rollups. The caller commits."""
+    hourly, destinations, daily, monthly = Counter(), Counter(), Counter(), Counter()
+    for log in logs:
+        local = _manila(log["timestamp"])
+        day = local.date()
+        destination = log.get("destination") or "General"
+        hourly[(day, local.hour, destination, log.get("check_in_gate") or "")] += 1
+        destinations[(day, destination)] += 1
+        daily[(day, log["name"])] += 1
+        monthly[(day.replace(day=1), log["name"])] += 1
+
+    _upsert(HourlyCheckinRollup, hourly, ["day", "hour", "destination", "gate"])
+    _upsert(DailyDestinationRollup, destinations, ["day", "destination"])
+    _upsert(DailyVisitorRollup, daily, ["day", "name"])
+    _upsert(MonthlyVisitorRollup, monthly, ["month", "name"])
+
+
+# --- Reads used by routes/analytic.py (start/end are inclusive Manila dates or None) ---
+
+def _day_range(query, column, start, end):
+    if start and end:
+        query = query.filter(column >= start, column <= end)
+    return query
+
+
+def destination_counts(start=None, end=None):
+    total = func.sum(DailyDestinationRollup.checkins)
+    query = db.session.query(DailyDestinationRollup.destination, total.label("count"))
+    query = _day_range(query, DailyDestinationRollup.day, start, end)
+    return query.group_by(DailyDestinationRollup.destination).order_by(total.desc()).all()
+
+
+def daily_counts(start=None, end=None):
+    query = db.session.query(DailyDestinationRollup.day, func.sum(DailyDestinationRollup.checkins).label("count"))
+    query = _day_range(query, DailyDestinationRollup.day, start, end)
+    return query.group_by(DailyDestinationRollup.day).order_by(DailyDestinationRollup.day).all()
+
+
+def hourly_counts(start=None, end=None):
+    """Check-ins per Manila hour of day and gate (/api/peak_hours and /api/analytics)."""
+    total = func.sum(HourlyCheckinRollup.checkins)
+    query = db.session.query(HourlyCheckinRollup.hour, HourlyCheckinRollup.gate, total.label("count"))
+    query = _day_range(query, HourlyCheckinRollup.day, start, end)
+    return query.group_by(HourlyCheckinRollup.hour, HourlyCheckinRollup.gate) \
+        .order_by(HourlyCheckinRollup.hour, HourlyCheckinRollup.gate).all()
+
+
+def _full_months(start, end):
+    """First days of the calendar months that lie completely inside [start, end]."""
+    month = start if start.day == 1 else (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    months = []
+    while True:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        if next_month - timedelta(days=1) > end:
+            return months
+        months.append(month)
+        month = next_month
+
+
+def top_visitors(start=None, end=None, limit=5):
+    """
+    Top visitors by check-ins. Whole months inside the range come from the
+    monthly rollup and only the partial months at the edges from the daily one.
+    """
+    if not (start and end):
+        parts = [db.session.query(MonthlyVisitorRollup.name, MonthlyVisitorRollup.checkins)]
+    else:
+        months = _full_months(start, end)
+        if months:
+            covered_from = months[0]
+            covered_to = (months[-1] + timedelta(days=32)).replace(day=1)  # exclusive
+            parts = [
+                db.session.query(MonthlyVisitorRollup.name, MonthlyVisitorRollup.checkins)
+                .filter(MonthlyVisitorRollup.month >= covered_from, MonthlyVisitorRollup.month <= months[-1]),
+                db.session.query(DailyVisitorRollup.name, DailyVisitorRollup.checkins)
+                .filter(DailyVisitorRollup.day >= start, DailyVisitorRollup.day < covered_from),
+                db.session.query(DailyVisitorRollup.name, DailyVisitorRollup.checkins)
+                .filter(DailyVisitorRollup.day >= covered_to, DailyVisitorRollup.day <= end),
+            ]
+        else:
+            parts = [
+                db.session.query(DailyVisitorRollup.name, DailyVisitorRollup.checkins)
+                .filter(DailyVisitorRollup.day >= start, DailyVisitorRollup.day <= end)
+            ]
+
+    counts = union_all(*[part.statement for part in parts]).subquery()
+    total = func.sum(counts.c.checkins)
+    return db.session.query(counts.c.name, total.label("count")).group_by(counts.c.name) \
+        .order_by(total.desc()).limit(limit).all()
+
+
+# --- Rebuild ---
+
+REBUILD_SQL = [
+    """
+    INSERT INTO hourly_checkin_rollup (day, hour, destination, gate, checkins)
+    SELECT (timestamp AT TIME ZONE 'Asia/Manila')::date,
+           extract(hour FROM timestamp AT TIME ZONE 'Asia/Manila')::smallint,
+           destination, coalesce(check_in_gate, ''), count(*)
+    FROM visitor_log
+    WHERE status = 'Checked-In' AND timestamp >= :start_utc AND timestamp < :end_utc
+    GROUP BY 1, 2, 3, 4
+    """,
+    """
+    INSERT INTO daily_destination_rollup (day, destination, checkins)
+    SELECT (timestamp AT TIME ZONE 'Asia/Manila')::date, destination, count(*)
+    FROM visitor_log
+    WHERE status = 'Checked-In' AND timestamp >= :start_utc AND timestamp < :end_utc
+    GROUP BY 1, 2
+    """,
+    """
+    INSERT INTO daily_visitor_rollup (day, name, checkins)
+    SELECT (timestamp AT TIME ZONE 'Asia/Manila')::date, name, count(*)
+    FROM visitor_log
+    WHERE status = 'Checked-In' AND timestamp >= :start_utc AND timestamp < :end_utc
+    GROUP BY 1, 2
+    """,
+    """
+    INSERT INTO monthly_visitor_rollup (month, name, checkins)
+    SELECT date_trunc('month', timestamp AT TIME ZONE 'Asia/Manila')::date, name, count(*)
+    FROM visitor_log
+    WHERE status = 'Checked-In' AND timestamp >= :start_utc AND timestamp < :end_utc
+    GROUP BY 1, 2
+    """,
+]
+
+
+def rebuild(start=None, end=None):
+    """
+    Recomputes the rollups from VisitorLog for the whole calendar months that
+    contain [start, end] (everything when no range is given) and commits.
+    The rollup tables are locked meanwhile, so concurrent scans wait instead
+    of being counted twice or lost.
+    """
+    if start and end:
+        start = start.replace(day=1)
+        end = (end.replace(day=1) + timedelta(days=32)).replace(day=1)  # exclusive
+    else:
+        start, end = date(2000, 1, 1), date(2100, 1, 1)
+    start_utc = MANILA.localize(datetime.combine(start, datetime.min.time())).astimezone(pytz.utc)
+    end_utc = MANILA.localize(datetime.combine(end, datetime.min.time())).astimezone(pytz.utc)
+
+    db.session.execute(text(
+        "LOCK TABLE hourly_checkin_rollup, daily_destination_rollup, daily_visitor_rollup, monthly_visitor_rollup "
+        "IN SHARE ROW EXCLUSIVE MODE"
+    ))
+    db.session.query(HourlyCheckinRollup).filter(
+        HourlyCheckinRollup.day >= start, HourlyCheckinRollup.day < end).delete()
+    db.session.query(DailyDestinationRollup).filter(
+        DailyDestinationRollup.day >= start, DailyDestinationRollup.day < end).delete()
+    db.session.query(DailyVisitorRollup).filter(
+        DailyVisitorRollup.day >= start, DailyVisitorRollup.day < end).delete()
+    db.session.query(MonthlyVisitorRollup).filter(
+        MonthlyVisitorRollup.month >= start, MonthlyVisitorRollup.month < end).delete()
+    for sql in REBUILD_SQL:
+        db.session.execute(text(sql), {"start_utc": start_utc, "end_utc": end_utc})
+    analytics_cache.mark_changed()
+    db.session.commit()
+
+
+def init_app(app):
+    @app.cli.command("analytics-rebuild")
+    @click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First Manila day to rebuild.")
+    @click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last Manila day to rebuild.")
+    def analytics_rebuild(start, end):
+        """Recomputes the analytics rollups from the visitor logs."""
+        if bool(start) != bool(end):
+            raise click.UsageError("Give both --start and --end, or neither for a full rebuild.")
+        rebuild(start and start.date(), end and end.date())
+        click.echo("Analytics rollups rebuilt.")
@@ -0,0 +1,111 @@
+# app/brevo_client.py
+# One Brevo API client per app, created in create_app and shared by every send,
+# so emails reuse pooled keep-alive HTTPS connections instead of a new
+# Configuration / ApiClient (and TLS handshake) per message.
+import threading
+import time
+import sib_api_v3_sdk
+from flask import current_app
+
+
+class BrevoMetrics:
+    """Thread/greenlet-safe counters for Brevo API calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_error = None
+        # group emails: recipients sent through message-version batches vs one call each
+        # because batching was unavailable (no PUBLIC_BASE_URL)
+        self.batch_recipients = 0
+        self.batch_calls = 0
+        self.unbatched_recipients = 0
+
+    def record(self, latency, error=None):
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if error is not None:
+                self.errors += 1
+                self.last_error = f"{type(error).__name__}: {error}"[:300]
+
+    def record_group(self, recipients, api_calls, batched):
+        with self._lock:
+            if batched:
+                self.batch_recipients += recipients
+                self.batch_calls += api_calls
+            else:
+                self.unbatched_recipients += recipients
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_latency_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else 0.0,
+                "max_latency_ms": round(self.max_latency * 1000, 1),
+                "last_error": self.last_error,
+                "batch_recipients": self.batch_recipients,
+                "batch_calls": self.batch_calls,
+                "calls_saved": self.batch_recipients - self.batch_calls,
+                "unbatched_group_recipients": self.unbatched_recipients,
+            }
+
+
+class _BrevoState:
+    def __init__(self, app):
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = app.config['BREVO_API_KEY']
+        if app.config.get('BREVO_API_HOST'):
+            # e.g. the local fake server in scripts/fake_brevo_server.py
+            configuration.host = app.config['BREVO_API_HOST']
+        # urllib3 keeps up to this many idle keep-alive connections to Brevo
+        configuration.connection_pool_maxsize = app.config['BREVO_POOL_SIZE']
+
+        self.api_client = sib_api_v3_sdk.ApiClient(configuration)
+        self.emails = sib_api_v3_sdk.TransactionalEmailsApi(self.api_client)
+        self.timeout = (app.config['BREVO_CONNECT_TIMEOUT'], app.config['BREVO_READ_TIMEOUT'])
+        self.metrics = BrevoMetrics()
+
+
+class BrevoClient:
+    """Flask extension wrapping the Brevo SDK with a shared connection pool and metrics."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BREVO_POOL_SIZE', 10)
+        app.config.setdefault('BREVO_CONNECT_TIMEOUT', 5)
+        app.config.setdefault('BREVO_READ_TIMEOUT', 30)
+        app.extensions['brevo'] = _BrevoState(app)
+
+    @property
+    def _state(self):
+        return current_app.extensions['brevo']
+
+    def send_transac_email(self, send_smtp_email):
+        """Sends through the shared client; raises ApiException like the SDK does."""
+        state = self._state
+        started = time.perf_counter()
+        try:
+            result = state.emails.send_transac_email(send_smtp_email, _request_timeout=state.timeout)
+        except Exception as e:
+            state.metrics.record(time.perf_counter() - started, e)
+            raise
+        state.metrics.record(time.perf_counter() - started)
+        return result
+
+    def record_group(self, recipients, api_calls, batched):
+        self._state.metrics.record_group(recipients, api_calls, batched)
+
+    def metrics(self):
+        return self._state.metrics.snapshot()
+
+
+brevo_client = BrevoClient()
@@ -2,35 +2,32 @@
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
 from flask import current_app
-from io import BytesIO
-import qrcode
+from app.brevo_client import brevo_client
+from app.utils.qr_render import render_qr_png, qr_image_token
 import base64
 
-def _get_brevo_api_instance():
-    """Configures and returns a Brevo API instance."""
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = current_app.config['BREVO_API_KEY']
-    return sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+SENDER = {"name": "ICC Visitor Management System", "email": "afablejrchito@gmail.com"}
+
+def _encode_attachments(attachments):
+    brevo_attachments = []
+    for attachment in attachments or []:
+        encoded_content = base64.b64encode(attachment['content']).decode('utf-8')
+        brevo_attachments.append({"content": encoded_content, "name": attachment['name']})
+    return brevo_attachments
 
 def send_email(subject, html_content, recipient_email, recipient_name, attachments=None):
     """
     Generic function to send an email using the Brevo API.
     `attachments` should be a list of dicts: [{'name': 'filename.ext', 'content': bytes}]
     """
-    api_instance = _get_brevo_api_instance()
-    sender = {"name": "ICC Visitor Management System", "email": "afablejrchito@gmail.com"}
     to = [{"email": recipient_email, "name": recipient_name}]
-    brevo_attachments = []
-    if attachments:
-        for attachment in attachments:
-            encoded_content = base64.b64encode(attachment['content']).decode('utf-8')
-            brevo_attachments.append({"content": encoded_content, "name": attachment['name']})
+    brevo_attachments = _encode_attachments(attachments)
     send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-        to=to, sender=sender, subject=subject, html_content=html_content,
+        to=to, sender=SENDER, subject=subject, html_content=html_content,
         attachment=brevo_attachments if brevo_attachments else None
     )
     try:
-        api_instance.send_transac_email(send_smtp_email)
+        brevo_client.send_transac_email(send_smtp_email)
         return True
     except ApiException as e:
         print(f"Exception when calling Brevo API: {e}\n")
@@ -38,10 +35,7 @@ def send_email(subject, html_content, recipient_email, recipient_name, attachmen
 
 def send_visitor_qr_email(req):
     """Sends a single visitor QR code email."""
-    qr_img = qrcode.make(req.unique_code)
-    img_io = BytesIO()
-    qr_img.save(img_io, format="PNG")
-    qr_bytes = img_io.getvalue()
+    qr_bytes = render_qr_png(req.unique_code)
 
     subject = "Your ICC Visitor QR Code"
     # MODIFIED: Removed the "Already registered?" sentence.
@@ -58,6 +52,35 @@ def send_visitor_qr_email(req):
 
     return send_email(subject, html_content, req.email, req.name, attachments)
 
+def send_group_member_qr_email(r, group_bytes=None):
+    """Sends one group member their individual QR plus the shared group QR."""
+    if not r.email:
+        return False
+
+    if group_bytes is None:
+        group_bytes = render_qr_png(r.group_code)
+    indiv_bytes = render_qr_png(r.unique_code)
+
+    subject = "Your ICC Group & Visitor QR Codes"
+    # MODIFIED: Removed the "Already registered?" sentence.
+    html_content = f"""
+    <p>Hello {r.name},</p>
+    <p>Your group has been successfully registered for a visit to ICC.</p>
+    <p>Attached are two QR codes:</p>
+    <ul>
+        <li><strong>Individual QR Code:</strong> Use this if you need to check in or out separately from your group. This code is permanent and can be reused for future visits.</li>
+        <li><strong>Group QR Code:</strong> The group leader can use this to check in or out the entire group at once.</li>
+    </ul>
+    <p>Please keep these QR codes safe and do not share them outside your group.</p>
+    <br>
+    <p>Regards,<br>ICC Visitor Management System</p>
+    """
+    attachments = [
+        {"name": "Individual-QR.png", "content": indiv_bytes},
+        {"name": "Group-QR.png", "content": group_bytes}
+    ]
+    return send_email(subject, html_content, r.email, r.name, attachments)
+
 def send_group_qr_email(reqs):
     """
     Sends group QR (shared code) + each member's own QR in a single email,
@@ -66,37 +89,90 @@ def send_group_qr_email(reqs):
     if not reqs:
         return
 
-    group_code = reqs[0].group_code
-    group_qr_img = qrcode.make(group_code)
-    group_io = BytesIO()
-    group_qr_img.save(group_io, format="PNG")
-    group_bytes = group_io.getvalue()
-
+    group_bytes = render_qr_png(reqs[0].group_code)
     for r in reqs:
-        if not r.email:
-            continue
-
-        indiv_qr_img = qrcode.make(r.unique_code)
-        indiv_io = BytesIO()
-        indiv_qr_img.save(indiv_io, format="PNG")
-        indiv_bytes = indiv_io.getvalue()
-
-        subject = "Your ICC Group & Visitor QR Codes"
-        # MODIFIED: Removed the "Already registered?" sentence.
-        html_content = f"""
-        <p>Hello {r.name},</p>
-        <p>Your group has been successfully registered for a visit to ICC.</p>
-        <p>Attached are two QR codes:</p>
-        <ul>
-            <li><strong>Individual QR Code:</strong> Use this if you need to check in or out separately from your group. This code is permanent and can be reused for future visits.</li>
-            <li><strong>Group QR Code:</strong> The group leader can use this to check in or out the entire group at once.</li>
-        </ul>
-        <p>Please keep these QR codes safe and do not share them outside your group.</p>
-        <br>
-        <p>Regards,<br>ICC Visitor Management System</p>
-        """
-        attachments = [
-            {"name": "Individual-QR.png", "content": indiv_bytes},
-            {"name": "Group-QR.png", "content": group_bytes}
+        send_group_member_qr_email(r, group_bytes)
+
+
+# Brevo template syntax: {{ params.x }} is filled in per message version
+GROUP_BATCH_HTML = """
+<p>Hello {{ params.name }},</p>
+<p>Your group has been successfully registered for a visit to ICC.</p>
+<p>Your QR codes:</p>
+<ul>
+    <li><strong>Individual QR Code</strong> (code <strong>{{ params.unique_code }}</strong>): Use this if you need to check in or out separately from your group. This code is permanent and can be reused for future visits.<br>
+        <img src="{{ params.qr_url }}" alt="Individual QR {{ params.unique_code }}" width="200" height="200"><br>
+        Please save this image: for your security the link to it only works for {{ params.link_days }} days.</li>
+    <li><strong>Group QR Code</strong> (attached): The group leader can use this to check in or out the entire group at once.</li>
+</ul>
+<p>Please keep these QR codes safe and do not share them outside your group.</p>
+<br>
+<p>Regards,<br>ICC Visitor Management System</p>
+"""
+
+def _qr_image_url(code):
+    """Public URL of the QR image for `code` (an email can't carry it per message version)."""
+    path = current_app.url_map.bind("localhost").build("request_bp.qr_image", {"token": qr_image_token(code)})
+    return current_app.config['PUBLIC_BASE_URL'].rstrip("/") + path
+
+def send_group_qr_batch(reqs):
+    """
+    Batch variant of send_group_qr_email: one Brevo call per chunk of members
+    (BREVO_BATCH_SIZE) using message versions instead of one call per member.
+    Brevo versions cannot carry their own attachments, so the shared group QR is
+    attached once and each member's version links their individual QR image
+    (the /qr/<token>.png route under PUBLIC_BASE_URL, valid for QR_LINK_MAX_AGE;
+    mail clients block data: images). Without PUBLIC_BASE_URL every member gets
+    the per-member email with their QR attached (create_app warns about it).
+
+    Returns stats: {"recipients", "api_calls", "calls_saved", "batched", "failed_ids"}.
+    """
+    members = [r for r in reqs if r.email]
+    batched = bool(current_app.config.get('PUBLIC_BASE_URL'))
+    stats = {"recipients": len(members), "api_calls": 0, "calls_saved": 0, "batched": batched, "failed_ids": []}
+    if not members:
+        return stats
+
+    group_bytes = render_qr_png(members[0].group_code)
+    if not batched:
+        for r in members:
+            stats["api_calls"] += 1
+            if not send_group_member_qr_email(r, group_bytes):
+                stats["failed_ids"].append(r.id)
+        brevo_client.record_group(stats["recipients"], stats["api_calls"], batched=False)
+        return stats
+
+    group_attachment = _encode_attachments([{"name": "Group-QR.png", "content": group_bytes}])
+    size = current_app.config.get('BREVO_BATCH_SIZE', 100)
+    link_days = max(1, current_app.config['QR_LINK_MAX_AGE'] // 86400)
+
+    for start in range(0, len(members), size):
+        chunk = members[start:start + size]
+        versions = [
+            sib_api_v3_sdk.SendSmtpEmailMessageVersions(
+                to=[{"email": r.email, "name": r.name}],
+                params={
+                    "name": r.name,
+                    "unique_code": r.unique_code,
+                    "qr_url": _qr_image_url(r.unique_code),
+                    "link_days": link_days,
+                }
+            ) for r in chunk
         ]
-        send_email(subject, html_content, r.email, r.name, attachments)
\ No newline at end of file
+        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+            sender=SENDER, subject="Your ICC Group & Visitor QR Codes",
+            html_content=GROUP_BATCH_HTML, attachment=group_attachment,
+            message_versions=versions
+        )
+        stats["api_calls"] += 1
+        try:
+            brevo_client.send_transac_email(send_smtp_email)
+        except ApiException as e:
+            print(f"Exception when calling Brevo API (batch of {len(chunk)}): {e}\n")
+            stats["failed_ids"].extend(r.id for r in chunk)
+
+    stats["calls_saved"] = stats["recipients"] - stats["api_calls"]
+    brevo_client.record_group(stats["recipients"], stats["api_calls"], batched=True)
+    print(f"Brevo group batch: {stats['recipients']} recipients in {stats['api_calls']} calls "
+          f"({stats['calls_saved']} calls saved)")
+    return stats
@@ -0,0 +1,209 @@
+# app/email_outbox.py
+# Persistent email outbox: routes enqueue rows in the same transaction as the
+# registration, a background dispatcher delivers them with retries + backoff.
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import random
+import threading
+import click
+import pytz
+from sqlalchemy import insert
+from app.models import db, EmailOutbox, Request
+
+_wake = threading.Event()
+_started = False
+
+
+def _now():
+    return datetime.now(pytz.utc)
+
+
+def enqueue_visitor_qr(req):
+    """Queues the single-visitor QR email for `req` (committed by the caller)."""
+    if req.email:
+        db.session.add(EmailOutbox(kind="visitor_qr", request=req))
+
+
+def enqueue_group_qr(reqs):
+    """Queues one group QR email per member that has an email address (one bulk INSERT)."""
+    db.session.flush()  # members need their ids
+    rows = [{"kind": "group_qr", "request_id": r.id} for r in reqs if r.email]
+    if rows:
+        db.session.execute(insert(EmailOutbox), rows)
+
+
+def notify_outbox():
+    """Wakes the in-process dispatcher right away instead of at its next poll."""
+    _wake.set()
+
+
+def _backoff(app, attempts):
+    base = app.config['EMAIL_OUTBOX_BACKOFF_SECONDS']
+    delay = min(base * (2 ** (attempts - 1)), app.config['EMAIL_OUTBOX_MAX_BACKOFF_SECONDS'])
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _claim_batch(app):
+    """
+    Claims due rows: pending ones, and 'sending' ones whose lease expired
+    (the worker died mid-send). SKIP LOCKED lets several dispatchers share the table.
+    """
+    now = _now()
+    limit = app.config['EMAIL_OUTBOX_BATCH_SIZE']
+    if app.config.get('BREVO_BATCH_MODE'):
+        # claim enough rows to fill a whole Brevo batch
+        limit = max(limit, app.config.get('BREVO_BATCH_SIZE', 0))
+    rows = EmailOutbox.query.filter(
+        EmailOutbox.status.in_(["pending", "sending"]),
+        EmailOutbox.next_attempt_at <= now
+    ).order_by(EmailOutbox.next_attempt_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    lease_until = now + timedelta(seconds=app.config['EMAIL_OUTBOX_LEASE_SECONDS'])
+    for row in rows:
+        row.status = "sending"
+        row.next_attempt_at = lease_until
+    ids = [row.id for row in rows]
+    db.session.commit()
+    return ids
+
+
+def _record_result(app, row, error):
+    row.attempts += 1
+    if error is None:
+        row.status = "sent"
+        row.sent_at = _now()
+        row.last_error = None
+    elif row.attempts >= app.config['EMAIL_OUTBOX_MAX_ATTEMPTS']:
+        row.status = "failed"
+        row.last_error = error
+        print(f"Giving up on outbox email #{row.id} after {row.attempts} attempts: {error}")
+    else:
+        row.status = "pending"
+        row.last_error = error
+        row.next_attempt_at = _now() + _backoff(app, row.attempts)
+
+
+def _deliver(app, outbox_ids):
+    """Delivers one claimed email, or one group batch when several ids are given."""
+    from app.brevo_mailer import send_visitor_qr_email, send_group_member_qr_email, send_group_qr_batch
+
+    with app.app_context():
+        rows = EmailOutbox.query.filter(
+            EmailOutbox.id.in_(outbox_ids), EmailOutbox.status == "sending"
+        ).all()
+        if not rows:
+            return
+
+        errors = {}
+        try:
+            if len(rows) > 1:
+                stats = send_group_qr_batch([row.request for row in rows])
+                failed = set(stats["failed_ids"])
+                errors = {row.id: "Brevo batch call failed" for row in rows if row.request_id in failed}
+            else:
+                row = rows[0]
+                if row.kind == "visitor_qr":
+                    ok = send_visitor_qr_email(row.request)
+                else:
+                    ok = send_group_member_qr_email(row.request)
+                if not ok:
+                    errors[row.id] = "Brevo API call failed"
+        except Exception as e:
+            errors = {row.id: str(e) for row in rows}
+
+        for row in rows:
+            _record_result(app, row, errors.get(row.id))
+        db.session.commit()
+
+
+def _plan_deliveries(app, ids):
+    """
+    Splits claimed ids into deliveries. In batch mode the group emails of one
+    group (or one CSV upload) become a single delivery, i.e. one Brevo batch.
+    """
+    if not app.config.get('BREVO_BATCH_MODE'):
+        return [[outbox_id] for outbox_id in ids]
+
+    with app.app_context():
+        rows = db.session.query(EmailOutbox.id, EmailOutbox.kind, Request.group_code).join(
+            Request, EmailOutbox.request_id == Request.id
+        ).filter(EmailOutbox.id.in_(ids)).all()
+
+    deliveries = []
+    groups = {}
+    for row in rows:
+        if row.kind == "group_qr" and row.group_code:
+            groups.setdefault(row.group_code, []).append(row.id)
+        else:
+            deliveries.append([row.id])
+    return deliveries + list(groups.values())
+
+
+def dispatch_once(app, executor=None):
+    """Claims and delivers one batch. Returns the number of emails attempted."""
+    with app.app_context():
+        ids = _claim_batch(app)
+    if not ids:
+        return 0
+    deliveries = _plan_deliveries(app, ids)
+    if executor is None:
+        for outbox_ids in deliveries:
+            _deliver(app, outbox_ids)
+    else:
+        list(executor.map(lambda outbox_ids: _deliver(app, outbox_ids), deliveries))
+    return len(ids)
+
+
+def run_dispatcher(app, sleep=None):
+    """Dispatcher loop. `sleep` defaults to socketio.sleep so it cooperates with eventlet."""
+    from app import socketio
+    sleep = sleep or socketio.sleep
+    poll = app.config['EMAIL_OUTBOX_POLL_SECONDS']
+    # Threads are green under eventlet's monkey patching, so this is a bounded GreenPool there
+    with ThreadPoolExecutor(max_workers=app.config['EMAIL_OUTBOX_CONCURRENCY']) as executor:
+        while True:
+            try:
+                sent = dispatch_once(app, executor)
+            except Exception as e:
+                print(f"Email outbox dispatcher error: {e}")
+                with app.app_context():
+                    db.session.rollback()
+                sent = 0
+            if not sent:
+                # wait for the next poll or an explicit notify_outbox()
+                waited = 0
+                while waited < poll and not _wake.is_set():
+                    sleep(0.5)
+                    waited += 0.5
+                _wake.clear()
+
+
+def start_outbox_dispatcher(app):
+    """Starts the in-process dispatcher once per process (when EMAIL_OUTBOX_DISPATCHER is 'inline')."""
+    global _started
+    from app import socketio
+    if _started or app.config['EMAIL_OUTBOX_DISPATCHER'] != "inline":
+        return
+    _started = True
+    socketio.start_background_task(run_dispatcher, app)
+
+
+def init_app(app):
+    app.config.setdefault('EMAIL_OUTBOX_DISPATCHER', 'inline')  # 'inline' or 'worker' (see `flask outbox-worker`)
+    app.config.setdefault('EMAIL_OUTBOX_CONCURRENCY', 4)
+    app.config.setdefault('EMAIL_OUTBOX_BATCH_SIZE', 20)
+    app.config.setdefault('EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+    app.config.setdefault('EMAIL_OUTBOX_POLL_SECONDS', 5)
+    app.config.setdefault('EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+    app.config.setdefault('EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+    app.config.setdefault('EMAIL_OUTBOX_LEASE_SECONDS', 300)
+
+    @app.cli.command("outbox-worker")
+    @click.option("--once", is_flag=True, help="Deliver one batch and exit.")
+    def outbox_worker(once):
+        """Runs the email outbox dispatcher as a separate process."""
+        import time
+        if once:
+            click.echo(f"Attempted {dispatch_once(app)} emails.")
+            return
+        run_dispatcher(app, sleep=time.sleep)
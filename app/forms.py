@@ -26,15 +26,17 @@ class LoginForm(FlaskForm):
     remember_me = BooleanField('Remember Me') # Changed from remember-me
     submit = SubmitField('Log in')
 
+    user = None  # set by validate_email; the login view uses it too (one lookup per login)
+
     # This custom validator checks if the email exists in the database.
     def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if not user:
+        self.user = User.query.filter_by(email=email.data).first()
+        if not self.user:
             raise ValidationError('The email you entered is not registered.')
 
     # This custom validator checks if the password is correct for the email.
     def validate_password(self, password):
-        user = User.query.filter_by(email=self.email.data).first()
+        user = self.user
         # We only check the password if the user exists
         if user and not user.check_password(password.data):
             raise ValidationError('Incorrect password. Please try again.')
\ No newline at end of file
@@ -0,0 +1,23 @@
+# app/green_db.py
+# psycopg2 is a C extension: eventlet can't reach its sockets by monkey patching,
+# so unless psycopg2 has a wait callback every query blocks the whole worker
+# (Socket.IO, gate scans and all other requests) until Postgres answers.
+# eventlet.monkey_patch() installs eventlet's callback (the psycogreen one) when
+# called with its defaults, as run.py and the gunicorn eventlet worker do; this
+# makes sure it is in place however the process was patched, and lets
+# DB_GREEN=false turn it off to compare (see scripts/green_db_check.py).
+import eventlet
+from psycopg2 import extensions
+
+
+def init_app(app):
+    app.config.setdefault('DB_GREEN', True)
+    if not eventlet.patcher.is_monkey_patched('socket'):
+        return  # plain threads (flask CLI, outbox worker): a blocking driver is fine
+
+    if not app.config['DB_GREEN']:
+        extensions.set_wait_callback(None)
+        print("WARNING: DB_GREEN=false: every database query blocks the whole eventlet worker")
+    elif extensions.get_wait_callback() is None:
+        from eventlet.support.psycopg2_patcher import make_psycopg_green
+        make_psycopg_green()
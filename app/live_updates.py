@@ -0,0 +1,217 @@
+# app/live_updates.py
+# Structured Socket.IO deltas. Instead of telling every open page to reload
+# (and re-run its aggregation queries), the server builds the changed rows and
+# counters once per burst of events and the pages patch themselves in place.
+import threading
+from flask import current_app, request
+from flask_login import current_user
+from flask_socketio import join_room
+from sqlalchemy import case, func, inspect
+from sqlalchemy.orm import aliased
+from app.models import db, VisitorLog, Request, User
+from app.utils.helpers import get_current_time, manila_day_bounds, convert_to_ph_time_only
+from app.utils.presence import count_checked_in, count_visits
+
+# Above this many rows a delta only carries counts; pages show a "refresh" notice instead
+MAX_DELTA_ROWS = 100
+
+
+def dashboard_counters():
+    """The three stat cards of the dashboard (all indexed range counts)."""
+    start_utc, end_utc = manila_day_bounds(get_current_time().date())
+    return {
+        "visitor_today": count_visits(start_utc, end_utc),
+        "checked_in": count_checked_in(start_utc, end_utc),
+        "registered_today": Request.query.filter(
+            Request.timestamp >= start_utc, Request.timestamp < end_utc
+        ).count(),
+    }
+
+
+def session_rows(session_ids):
+    """Logs-page rows (one per visit) for the given visit_session_ids only."""
+    if not session_ids:
+        return []
+    U_checkin = aliased(User, name='u_checkin')
+    U_checkout = aliased(User, name='u_checkout')
+    U_approved = aliased(User, name='u_approved')
+
+    rows = db.session.query(
+        VisitorLog.visit_session_id,
+        func.max(VisitorLog.name).label('name'),
+        func.max(VisitorLog.email).label('email'),
+        func.max(VisitorLog.number).label('number'),
+        func.max(VisitorLog.destination).label('destination'),
+        func.max(VisitorLog.purpose).label('purpose'),
+        func.max(VisitorLog.address).label('address'),
+        func.max(VisitorLog.unique_code).label('unique_code'),
+        func.max(case((VisitorLog.status == 'Checked-In', VisitorLog.timestamp))).label('check_in_time'),
+        func.max(case((VisitorLog.status == 'Checked-In', VisitorLog.check_in_gate))).label('gate_in'),
+        func.max(case((VisitorLog.status == 'Checked-Out', VisitorLog.timestamp))).label('check_out_time'),
+        func.max(case((VisitorLog.status == 'Checked-Out', VisitorLog.check_out_gate))).label('gate_out'),
+        func.max(case((VisitorLog.status == 'Checked-In', U_checkin.username))).label('checked_in_by'),
+        func.max(case((VisitorLog.status == 'Checked-Out', U_checkout.username))).label('checked_out_by'),
+        func.max(U_approved.username).label('approved_by'),
+        func.date(func.timezone('Asia/Manila', func.max(VisitorLog.timestamp))).label('visit_date')
+    ).select_from(VisitorLog).outerjoin(
+        U_checkin, VisitorLog.check_in_by_id == U_checkin.id
+    ).outerjoin(
+        U_checkout, VisitorLog.check_out_by_id == U_checkout.id
+    ).outerjoin(
+        U_approved, VisitorLog.approved_by_id == U_approved.id
+    ).filter(
+        VisitorLog.visit_session_id.in_(session_ids)
+    ).group_by(VisitorLog.visit_session_id).order_by(func.max(VisitorLog.timestamp)).all()
+
+    return [{
+        "session_id": r.visit_session_id,
+        "name": r.name,
+        "email": r.email,
+        "number": r.number,
+        "destination": r.destination,
+        "purpose": r.purpose,
+        "address": r.address,
+        "unique_code": r.unique_code,
+        "approved_by": r.approved_by,
+        "check_in_time": convert_to_ph_time_only(r.check_in_time) if r.check_in_time else None,
+        "gate_in": r.gate_in,
+        "checked_in_by": r.checked_in_by,
+        "check_out_time": convert_to_ph_time_only(r.check_out_time) if r.check_out_time else None,
+        "gate_out": r.gate_out,
+        "checked_out_by": r.checked_out_by,
+        "visit_date": r.visit_date.isoformat() if r.visit_date else None,
+        "visit_date_label": r.visit_date.strftime('%B %d, %Y') if r.visit_date else None,
+    } for r in rows]
+
+
+def request_rows(requests):
+    return [{
+        "id": r.id,
+        "name": r.name,
+        "email": r.email,
+        "number": r.number,
+        "destination": r.destination,
+        "purpose": r.purpose,
+        "address": r.address,
+        "unique_code": r.unique_code,
+        "group_code": r.group_code,
+    } for r in requests]
+
+
+class LiveBroadcaster:
+    """
+    Coalesces live updates. publish_* calls only record what changed; a single
+    flush per window (LIVE_UPDATE_WINDOW, 250 ms by default) builds the payloads
+    once and emits them to the page rooms that display them. A 50-person group
+    scan, or several scans at different gates in the same instant, becomes one
+    dashboard_update.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # insertion-ordered set of visit_session_ids
+        self._requests = {}  # same for request ids
+        self._counters = False
+        self._scheduled = False
+
+    def init_app(self, app):
+        from app import socketio
+        app.config.setdefault('LIVE_UPDATE_WINDOW', 0.25)
+        app.extensions['live_updates'] = self
+        socketio.on_event('connect', _on_connect)
+
+    def publish_visits(self, session_ids):
+        with self._lock:
+            self._sessions.update(dict.fromkeys(session_ids))
+            self._counters = True
+        self._schedule()
+
+    def publish_requests(self, request_ids):
+        with self._lock:
+            self._requests.update(dict.fromkeys(request_ids))
+            self._counters = True
+        self._schedule()
+
+    def _schedule(self):
+        from app import socketio
+        app = current_app._get_current_object()
+        window = app.config['LIVE_UPDATE_WINDOW']
+        if not window:
+            self.flush()
+            return
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        socketio.start_background_task(self._flush_later, app, window)
+
+    def _flush_later(self, app, window):
+        from app import socketio
+        socketio.sleep(window)
+        with app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Live update broadcast failed: {e}")
+            finally:
+                db.session.remove()
+
+    def flush(self):
+        from app import socketio
+        with self._lock:
+            session_ids, self._sessions = list(self._sessions), {}
+            request_ids, self._requests = list(self._requests), {}
+            counters, self._counters = self._counters, False
+            self._scheduled = False
+
+        if session_ids or counters:
+            payload = {
+                "counters": dashboard_counters(),
+                "total": len(session_ids),
+                "truncated": len(session_ids) > MAX_DELTA_ROWS,
+                "sessions": [],
+            }
+            if session_ids and not payload["truncated"]:
+                payload["sessions"] = session_rows(session_ids)
+            socketio.emit('dashboard_update', payload, to=page_room("dashboard"))
+            if session_ids:
+                socketio.emit('dashboard_update', payload, to=page_room("logs"))
+
+        if request_ids:
+            payload = {"total": len(request_ids), "truncated": len(request_ids) > MAX_DELTA_ROWS, "requests": []}
+            if not payload["truncated"]:
+                payload["requests"] = request_rows(
+                    Request.query.filter(Request.id.in_(request_ids)).order_by(Request.id).all()
+                )
+            socketio.emit('request_update', payload, to=page_room("request"))
+
+
+# Pages that receive live updates; a socket joins the room of the page it was opened from
+LIVE_PAGES = ("dashboard", "logs", "request")
+
+
+def page_room(page):
+    return f"page:{page}"
+
+
+def _on_connect(auth=None):
+    # only logged-in staff get a socket; anonymous connections are refused
+    if not current_user.is_authenticated:
+        return False
+    page = request.args.get("page")
+    if page in LIVE_PAGES:
+        join_room(page_room(page))
+
+
+broadcaster = LiveBroadcaster()
+
+
+def publish_visits(session_ids):
+    """Call after committing check-ins/outs: patches Dashboard and Logs (coalesced)."""
+    broadcaster.publish_visits(session_ids)
+
+
+def publish_requests(requests):
+    """Call after committing new requests: patches the Request page and the dashboard counters (coalesced)."""
+    # identity keys avoid reloading the just-committed (expired) objects
+    broadcaster.publish_requests([inspect(r).identity[0] for r in requests])
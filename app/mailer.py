@@ -1,17 +1,13 @@
 from flask_mail import Message
-from io import BytesIO
-import qrcode
 from app import mail
+from app.utils.qr_render import render_qr_png
 import os
 
 def send_visitor_qr_email(req):
     qr_data = req.unique_code
 
-    # Generate QR in memory
-    qr_img = qrcode.make(qr_data)
-    img_io = BytesIO()
-    qr_img.save(img_io, format="PNG")
-    img_io.seek(0)
+    # Generate QR in memory (cached renderer)
+    qr_bytes = render_qr_png(qr_data)
 
     msg = Message("Your ICC Visitor QR Code", recipients=[req.email])
     msg.body = f"""Hello {req.name},
@@ -30,7 +26,7 @@ Regards,
 ICC Visitor Management System
 """
 
-    msg.attach(f"qr_{req.unique_code}.png", "image/png", img_io.read())
+    msg.attach(f"qr_{req.unique_code}.png", "image/png", qr_bytes)
     mail.send(msg)
 
 def send_email(to, subject, body, attachments=None):
@@ -52,23 +48,15 @@ def send_group_qr_email(reqs):
 
     group_code = reqs[0].group_code
 
-    # Generate Group QR in memory
-    group_qr_img = qrcode.make(group_code)
-    group_io = BytesIO()
-    group_qr_img.save(group_io, format="PNG")
-    group_io.seek(0)
-    group_bytes = group_io.read()
+    # Generate Group QR in memory (rendered once, then served from the cache)
+    group_bytes = render_qr_png(group_code)
 
     for r in reqs:
         if not r.email:  # skip if no email
             continue
 
         # Individual QR
-        indiv_qr_img = qrcode.make(r.unique_code)
-        indiv_io = BytesIO()
-        indiv_qr_img.save(indiv_io, format="PNG")
-        indiv_io.seek(0)
-        indiv_bytes = indiv_io.read()
+        indiv_bytes = render_qr_png(r.unique_code)
 
         msg = Message("Your ICC Group & Visitor QR Codes", recipients=[r.email])
         msg.body = f"""Hello {r.name},
@@ -7,6 +7,19 @@ from sqlalchemy.dialects.postgresql import TIMESTAMP
 from flask_login import UserMixin
 
 
+# ✅ Normalized text searched by app/utils/search.py: lower-cased name, email and
+# codes, and the phone number as digits only ("0917-123 4567" -> "09171234567")
+def search_text_sql(*code_columns):
+    # emails split at "@" and "." so their parts are words too; phone numbers reduced to digits
+    parts = ["name", "translate(coalesce(email, ''), '@.', '  ')", "regexp_replace(coalesce(number, ''), '[^0-9]', '', 'g')"]
+    parts += [f"coalesce({column}, '')" for column in code_columns]
+    return "lower(" + " || ' ' || ".join(parts) + ")"
+
+def search_index(name, column):
+    # full-text GIN index (no extension needed); the trigram one is added by migration e9b14f7a2c38 when pg_trgm exists
+    return db.Index(name, db.func.to_tsvector(db.text("'simple'::regconfig"), column), postgresql_using='gin')
+
+
 class Visitor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -22,6 +35,9 @@ class Visitor(db.Model):
     def __repr__(self):
         return f'<Visitor {self.name}>'    
 
+# visitors are matched to requests by name + number
+db.Index('ix_visitor_name_number', Visitor.name, Visitor.number)
+
 # Pending requests table
 class Request(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -38,11 +54,21 @@ class Request(db.Model):
     group_code = db.Column(db.String(64), nullable=True)
     approved_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
 
-    approved_by = db.relationship("User", foreign_keys=[approved_by_id], backref="approved_requests", lazy="joined")
+    # loaded only when read: scans and lookups never need the approver; pages that show it
+    # select the username as a column (or use selectinload() on that query)
+    approved_by = db.relationship("User", foreign_keys=[approved_by_id], backref="approved_requests", lazy="select")
+
+    search_text = db.Column(db.Text, db.Computed(search_text_sql("unique_code", "group_code"), persisted=True))
 
     def __repr__(self):
         return f'<Request {self.name}>'
 
+# request page (date range, newest first, keyset on timestamp + id) and group scans
+db.Index('ix_request_timestamp_id', Request.timestamp, Request.id)
+# name / phone / email / code search
+search_index('ix_request_search_fts', Request.search_text)
+db.Index('ix_request_group_code', Request.group_code, postgresql_where=db.text('group_code IS NOT NULL'))
+
 # Logs table (after request is approved)
 class VisitorLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -70,14 +96,131 @@ class VisitorLog(db.Model):
     #check_in_time = db.Column(TIMESTAMP(timezone=True), nullable=True)
     #check_out_time = db.Column(TIMESTAMP(timezone=True), nullable=True)
 
-    # Relationships
-    approved_by = db.relationship("User", foreign_keys=[approved_by_id], backref="logs_approved", lazy="joined")
-    check_in_by = db.relationship("User", foreign_keys=[check_in_by_id], backref="logs_checked_in", lazy="joined")
-    check_out_by = db.relationship("User", foreign_keys=[check_out_by_id], backref="logs_checked_out", lazy="joined")
+    # Relationships: loaded only when read (no user joins on the scan path, see
+    # scripts/query_shape_check.py). The logs page, live updates and the export
+    # select the usernames as columns; use selectinload() per query if a page
+    # needs the User objects themselves.
+    approved_by = db.relationship("User", foreign_keys=[approved_by_id], backref="logs_approved", lazy="select")
+    check_in_by = db.relationship("User", foreign_keys=[check_in_by_id], backref="logs_checked_in", lazy="select")
+    check_out_by = db.relationship("User", foreign_keys=[check_out_by_id], backref="logs_checked_out", lazy="select")
+
+    search_text = db.Column(db.Text, db.Computed(search_text_sql("unique_code"), persisted=True))
 
     def __repr__(self):
         return f'<VisitorLog {self.name} - {self.status}>'
 
+# ✅ Indexes matched to the hot query shapes (see migration 3f1c7a9b2e64)
+# latest log / history per visitor
+db.Index('ix_visitor_log_visitor_id_timestamp', VisitorLog.visitor_id, VisitorLog.timestamp.desc())
+# per-visit grouping on the logs page, export and duration analytics
+db.Index('ix_visitor_log_session_timestamp', VisitorLog.visit_session_id, VisitorLog.timestamp)
+# lookups by the code that was scanned
+db.Index('ix_visitor_log_unique_code_timestamp', VisitorLog.unique_code, VisitorLog.timestamp.desc())
+# date-range filters on the logs page and the export
+db.Index('ix_visitor_log_timestamp', VisitorLog.timestamp)
+# analytics only ever count check-ins inside a date range
+db.Index('ix_visitor_log_checkin_timestamp', VisitorLog.timestamp, VisitorLog.destination,
+         postgresql_where=db.text("status = 'Checked-In'"))
+# name / phone / email / code search on the logs page and the export
+search_index('ix_visitor_log_search_fts', VisitorLog.search_text)
+
+# One row per visit (keyed by visit_session_id), kept in step with VisitorLog writes.
+# A visit is "open" (visitor is inside) while check_out_time is NULL, so presence
+# checks hit the small partial index instead of scanning the whole log history.
+class VisitSession(db.Model):
+    __tablename__ = 'visit_session'
+
+    id = db.Column(db.String(50), primary_key=True)  # same value as VisitorLog.visit_session_id
+    visitor_id = db.Column(db.Integer, db.ForeignKey('visitor.id'), nullable=True)
+    unique_code = db.Column(db.String(10))
+    name = db.Column(db.String(100), nullable=False)
+    purpose = db.Column(db.String(200))
+    destination = db.Column(db.String(100))
+    address = db.Column(db.String(100))
+    approved_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    check_in_time = db.Column(TIMESTAMP(timezone=True), nullable=False)
+    check_out_time = db.Column(TIMESTAMP(timezone=True), nullable=True)
+    check_in_gate = db.Column(db.String(50), nullable=True)
+    check_out_gate = db.Column(db.String(50), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_visit_session_open_visitor', 'visitor_id', 'check_in_time',
+                 postgresql_where=db.text('check_out_time IS NULL')),
+        db.Index('ix_visit_session_open_code', 'unique_code',
+                 postgresql_where=db.text('check_out_time IS NULL')),
+        db.Index('ix_visit_session_check_in_time', 'check_in_time'),
+    )
+
+    def __repr__(self):
+        return f'<VisitSession {self.name} - {"open" if self.check_out_time is None else "closed"}>'
+
+# Logs page: visits by latest activity (check-out, else check-in), keyset on + id
+db.Index('ix_visit_session_last_activity',
+         db.func.coalesce(VisitSession.check_out_time, VisitSession.check_in_time), VisitSession.id)
+
+# Outgoing emails, written in the same transaction as the registration and
+# delivered later by the dispatcher in app/email_outbox.py
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'visitor_qr' or 'group_qr'
+    request_id = db.Column(db.Integer, db.ForeignKey('request.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending / sending / sent / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(TIMESTAMP(timezone=True), nullable=False, default=lambda: datetime.now(pytz.utc))
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(TIMESTAMP(timezone=True), nullable=False, default=lambda: datetime.now(pytz.utc))
+    sent_at = db.Column(TIMESTAMP(timezone=True), nullable=True)
+
+    request = db.relationship("Request")
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'next_attempt_at',
+                 postgresql_where=db.text("status IN ('pending', 'sending')")),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.kind} #{self.request_id} - {self.status}>'
+
+# ✅ Analytics rollups: check-in counts pre-aggregated by Manila day/hour, kept up
+# to date as logs are written (app/analytics_rollup.py) so the analytics endpoints
+# never aggregate the raw VisitorLog history.
+class HourlyCheckinRollup(db.Model):
+    __tablename__ = 'hourly_checkin_rollup'
+
+    day = db.Column(db.Date, primary_key=True)  # Manila calendar day
+    hour = db.Column(db.SmallInteger, primary_key=True)  # Manila hour, 0-23
+    destination = db.Column(db.String(100), primary_key=True)
+    gate = db.Column(db.String(50), primary_key=True, default='')  # '' when the gate was not recorded
+    checkins = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Same counts per day and destination only: what the distribution and trend charts read
+class DailyDestinationRollup(db.Model):
+    __tablename__ = 'daily_destination_rollup'
+
+    day = db.Column(db.Date, primary_key=True)
+    destination = db.Column(db.String(100), primary_key=True)
+    checkins = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyVisitorRollup(db.Model):
+    __tablename__ = 'daily_visitor_rollup'
+
+    day = db.Column(db.Date, primary_key=True)
+    name = db.Column(db.String(100), primary_key=True)
+    checkins = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Same as DailyVisitorRollup per calendar month, so long ranges read ~12 rows per visitor
+class MonthlyVisitorRollup(db.Model):
+    __tablename__ = 'monthly_visitor_rollup'
+
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    name = db.Column(db.String(100), primary_key=True)
+    checkins = db.Column(db.Integer, nullable=False, default=0)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(150), unique=True, nullable=False)
@@ -98,5 +241,6 @@ class User(UserMixin, db.Model):
  # ✅ Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
-    # Always fetch from DB so gate_role is up to date
-    return User.query.get(int(user_id))
\ No newline at end of file
+    # Cached identity, dropped whenever the user is changed so gate_role stays up to date
+    from app.user_cache import user_cache
+    return user_cache.get(int(user_id))
\ No newline at end of file
@@ -0,0 +1,117 @@
+# app/rate_limits.py
+# Rate-limit policy. Every request is put in a class (gate scans, public forms,
+# login, uploads, exports, everything else) and charged to one bucket per class
+# and principal: the user for signed-in staff, the client IP for everyone else.
+# So a gate tablet behind a shared NAT address has its own generous scan
+# budget, while the public registration form stays strict per IP.
+#
+# Buckets live in the Flask-Limiter storage (RATELIMIT_STORAGE_URI: Redis when
+# REDIS_URL is set, in-process otherwise) with the sliding-window-counter
+# strategy: two counters per bucket, and bursts are smoothed like a token bucket.
+import threading
+from flask import g, request
+from flask_login import current_user
+from flask_limiter.util import get_remote_address
+
+# endpoint -> class (endpoints not listed are "default")
+ROUTE_CLASSES = {
+    'scan.scan_checkin': 'scan',
+    'request_bp.direct_checkin': 'scan',
+    'request_bp.direct_checkin_group': 'scan',
+    'request_bp.submit_request': 'public_form',
+    'request_bp.multi_form_entry': 'public_form',
+    'request_bp.qr_image': 'qr_image',
+    'request_bp.upload_csv': 'upload',
+    'download_log.export_logs_excel': 'export',
+    'auth.login': 'auth',
+    'auth.totp_verify': 'auth',
+    'auth.forgot_password': 'auth',
+    'auth.reset_password': 'auth',
+}
+# only the submissions of these count against their class; viewing the page is "default"
+WRITE_ONLY_CLASSES = {'public_form', 'auth'}
+
+# class -> role -> budget (None = not signed in). A single limit where possible:
+# every limit is a storage round trip per request.
+BUDGETS = {
+    'scan':        {'admin': "600 per minute", 'user': "600 per minute", None: "30 per minute"},
+    'upload':      {'admin': "20 per minute", 'user': "10 per minute", None: "5 per minute"},
+    'export':      {'admin': "30 per minute", 'user': "20 per minute", None: "10 per minute"},
+    'public_form': {'admin': "120 per minute", 'user': "120 per minute", None: "5 per minute;30 per hour"},
+    # QR images linked from batch emails: a member opens theirs a few times, nobody needs more
+    'qr_image':    {'admin': "60 per minute", 'user': "60 per minute", None: "10 per minute;60 per hour"},
+    'auth':        {'admin': "30 per minute", 'user': "30 per minute", None: "10 per minute;50 per hour"},
+    'default':     {'admin': "1200 per minute", 'user': "600 per minute", None: "120 per minute"},
+}
+
+
+def _role():
+    # kept in g: read again after the view commits, current_user would be reloaded
+    if 'rate_role' not in g:
+        if not current_user.is_authenticated:
+            g.rate_role = None
+        else:
+            g.rate_role = current_user.role if current_user.role in BUDGETS['default'] else 'user'
+    return g.rate_role
+
+
+def request_class():
+    cls = g.get('rate_class')
+    if cls is None:
+        cls = ROUTE_CLASSES.get(request.endpoint, 'default')
+        if cls in WRITE_ONLY_CLASSES and request.method in ('GET', 'HEAD'):
+            cls = 'default'
+        g.rate_class = cls
+    return cls
+
+
+def request_key():
+    """Bucket key: class + user id for signed-in staff, class + client IP otherwise."""
+    principal = f"user:{current_user.get_id()}" if current_user.is_authenticated else f"ip:{get_remote_address()}"
+    return f"{request_class()}:{principal}"
+
+
+def request_budget():
+    """Limit string for the current request (Flask-Limiter application limit provider)."""
+    return BUDGETS[request_class()][_role()]
+
+
+class RateLimitMetrics:
+    """Allowed / rejected counts per class and role (per process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, cls, role, rejected):
+        with self._lock:
+            counts = self._counts.setdefault((cls, role or 'anonymous'), [0, 0])
+            counts[1 if rejected else 0] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {"class": cls, "role": role, "allowed": allowed, "rejected": rejected}
+                for (cls, role), (allowed, rejected) in sorted(self._counts.items())
+            ]
+
+
+metrics = RateLimitMetrics()
+
+
+def _on_breach(limit):
+    g.rate_limited = True
+
+
+def _count(response):
+    if 'rate_class' in g:  # the limiter looked at this request
+        metrics.record(g.rate_class, _role(), g.get('rate_limited', False))
+    return response
+
+
+def init_app(app, limiter):
+    app.config.setdefault('RATELIMIT_STRATEGY', 'sliding-window-counter')
+    app.config.setdefault('RATELIMIT_APPLICATION', request_budget)
+    app.config.setdefault('RATELIMIT_ON_BREACH_CALLBACK', _on_breach)
+    limiter.init_app(app)
+    app.after_request(_count)
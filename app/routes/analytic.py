@@ -1,12 +1,22 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime
 from app.models import VisitorLog, Request, db
 from sqlalchemy import func, case
+from app.utils.helpers import in_manila_days
+from app import analytics_rollup as rollup
+from app.utils.duration_stats import duration_stats
+from app.analytics_cache import cached
 
 bp = Blueprint('analytic', __name__)
 
+def _date_range(start_date, end_date):
+    """Parses the start_date/end_date query args (Manila days); raises ValueError on bad input."""
+    if not (start_date and end_date):
+        return None, None
+    return (datetime.strptime(start_date, "%Y-%m-%d").date(),
+            datetime.strptime(end_date, "%Y-%m-%d").date())
+
 @bp.route("/api/visit_durations")
 @login_required
 def visit_durations():
@@ -27,12 +37,11 @@ def visit_durations():
 
     if start_date and end_date:
         try:
-            # Convert string dates to datetime objects at the beginning and end of the day in Manila time
-            manila_tz = pytz.timezone('Asia/Manila')
-            start_dt = manila_tz.localize(datetime.strptime(start_date, "%Y-%m-%d")).astimezone(pytz.utc)
-            end_dt = manila_tz.localize(datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).astimezone(pytz.utc)
-            query = query.filter(VisitorLog.timestamp.between(start_dt, end_dt))
-        except (ValueError, pytz.exceptions.AmbiguousTimeError):
+            # Manila calendar days -> half-open UTC range on the raw timestamp
+            start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+            query = query.filter(in_manila_days(VisitorLog.timestamp, start_dt, end_dt))
+        except ValueError:
             pass # Ignore invalid date formats
 
     logs = query.all()
@@ -45,86 +54,88 @@ def visit_durations():
     
     return jsonify(durations=result)
 
-@bp.route("/api/destination_distribution")  # 1. Renamed Route
-@login_required
-def destination_distribution():             # 2. Renamed Function
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
-    
-    manila_tz = 'Asia/Manila'
-    date_column = func.date(func.timezone(manila_tz, VisitorLog.timestamp))
+# Chart datasets. Each one has its own endpoint and all of them are also served
+# together by /api/analytics, so the page needs a single request.
 
-    # 3. Query 'destination' instead of 'purpose'
-    query = db.session.query(
-        VisitorLog.destination, 
-        func.count(VisitorLog.id)
-    ).filter(VisitorLog.status == "Checked-In")
+def _destination_distribution(start_dt, end_dt):
+    rows = rollup.destination_counts(start_dt, end_dt)
+    return [{'destination': row.destination, 'count': int(row.count)} for row in rows]
 
-    if start_date and end_date:
-        try:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-            query = query.filter(date_column.between(start_dt, end_dt))
-        except ValueError:
-            pass
+def _top_visitors(start_dt, end_dt):
+    rows = rollup.top_visitors(start_dt, end_dt, limit=5)
+    return [{'name': row.name, 'count': int(row.count)} for row in rows]
 
-    # 4. Group by 'destination'
-    logs = query.group_by(VisitorLog.destination).order_by(func.count(VisitorLog.id).desc()).all()
-    
-    # 5. Return JSON with 'destination' key
-    result = [{'destination': row.destination, 'count': row[1]} for row in logs]
-    return jsonify(result)
+def _visitor_trend(start_dt, end_dt):
+    rows = rollup.daily_counts(start_dt, end_dt)
+    return [{'date': str(row.day), 'count': int(row.count)} for row in rows]
 
-@bp.route("/api/top_visitors")
+def _peak_hours(start_dt, end_dt):
+    # Manila hour of day x gate ('' in the rollup = no gate recorded)
+    rows = rollup.hourly_counts(start_dt, end_dt)
+    return [{'hour': row.hour, 'gate': row.gate or None, 'count': int(row.count)} for row in rows]
+
+def _lenient_range():
+    try:
+        return _date_range(request.args.get("start_date"), request.args.get("end_date"))
+    except ValueError:
+        return None, None  # Ignore invalid date formats
+
+
+@bp.route("/api/visit_duration_stats")
 @login_required
-def top_visitors():
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
+@cached
+def visit_duration_stats():
+    # Fixed-size summary for the duration chart (the list above grows with the range)
+    return jsonify(duration_stats(*_lenient_range()))
 
-    manila_tz = 'Asia/Manila'
-    date_column = func.date(func.timezone(manila_tz, VisitorLog.timestamp))
+# The four endpoints below read the check-in rollups (app/analytics_rollup.py)
+# instead of aggregating VisitorLog, so their cost no longer grows with history.
 
-    query = db.session.query(
-        VisitorLog.name,
-        func.count(VisitorLog.id)
-    ).filter(VisitorLog.status == "Checked-In")
+@bp.route("/api/destination_distribution")
+@login_required
+@cached
+def destination_distribution():
+    return jsonify(_destination_distribution(*_lenient_range()))
 
-    if start_date and end_date:
-        try:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-            query = query.filter(date_column.between(start_dt, end_dt))
-        except ValueError:
-            pass
+@bp.route("/api/top_visitors")
+@login_required
+@cached
+def top_visitors():
+    return jsonify(_top_visitors(*_lenient_range()))
 
-    logs = query.group_by(VisitorLog.name).order_by(func.count(VisitorLog.id).desc()).limit(5).all()
-    result = [{'name': row.name, 'count': row[1]} for row in logs]
-    return jsonify(result)
+@bp.route("/api/peak_hours")
+@login_required
+@cached
+def peak_hours():
+    return jsonify(_peak_hours(*_lenient_range()))
 
 
 @bp.route("/api/visitor_trend")
 @login_required
+@cached
 def visitor_trend():
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
+    try:
+        start_dt, end_dt = _date_range(request.args.get("start_date"), request.args.get("end_date"))
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
 
-    manila_tz = 'Asia/Manila'
-    date_column = func.date(func.timezone(manila_tz, VisitorLog.timestamp)).label("date")
+    return jsonify(_visitor_trend(start_dt, end_dt))
 
-    query = db.session.query(
-        date_column,
-        func.count(VisitorLog.id)
-    ).filter(VisitorLog.status == "Checked-In")
 
-    if start_date and end_date:
-        try:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-            query = query.filter(date_column.between(start_dt, end_dt))
-        except ValueError:
-            return jsonify({"error": "Invalid date format"}), 400
-
-    logs = query.group_by(date_column).order_by(date_column).all()
-
-    result = [{'date': str(row.date), 'count': row[1]} for row in logs]
-    return jsonify(result)
+@bp.route("/api/analytics")
+@login_required
+@cached
+def analytics():
+    """All chart datasets of the Analytics page in one response."""
+    try:
+        start_dt, end_dt = _date_range(request.args.get("start_date"), request.args.get("end_date"))
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+
+    return jsonify(
+        visitor_trend=_visitor_trend(start_dt, end_dt),
+        top_visitors=_top_visitors(start_dt, end_dt),
+        destination_distribution=_destination_distribution(start_dt, end_dt),
+        peak_hours=_peak_hours(start_dt, end_dt),
+        visit_duration_stats=duration_stats(start_dt, end_dt),
+    )
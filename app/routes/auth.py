@@ -20,7 +20,7 @@ bp = Blueprint('auth', __name__)
 def login():
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
+        user = form.user  # looked up once by the form's validators
         
         if user.two_factor_enabled:
             session['pending_2fa_user'] = user.id
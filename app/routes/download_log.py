@@ -1,11 +1,17 @@
-from flask import request, Response, Blueprint
+from flask import request, Response, Blueprint, stream_with_context
 from app.models import VisitorLog, db, User
+from app.utils.helpers import filter_sessions_by_day
+from app.utils.search import search_condition
 from datetime import datetime
 from sqlalchemy import func, case
 from sqlalchemy.orm import aliased
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment
-from io import BytesIO
+from openpyxl.utils import get_column_letter
+from io import StringIO
+import csv
+import tempfile
 import pytz
 
 bp = Blueprint('download_log', __name__)
@@ -52,41 +58,54 @@ def export_logs_excel():
     if filter_date:
         try:
             date_obj = datetime.strptime(filter_date, "%Y-%m-%d").date()
-            query = query.having(func.date(func.timezone('Asia/Manila', func.max(VisitorLog.timestamp))) == date_obj)
+            query = filter_sessions_by_day(query, date_obj)
         except ValueError:
             pass 
 
     if search_query:
-        query = query.filter(VisitorLog.name.ilike(f"%{search_query}%"))
+        query = query.filter(search_condition(VisitorLog.search_text, search_query))
 
-    logs = query.order_by(func.max(VisitorLog.timestamp).desc()).all()
+    query = query.order_by(func.max(VisitorLog.timestamp).desc())
 
-    # --- Excel File Generation ---
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Visitor Logs"
+    manila_tz = pytz.timezone('Asia/Manila')
+    filename_date = filter_date or datetime.now(manila_tz).strftime('%Y-%m-%d')
 
-    # Define headers
-    headers = [
-        "Name", "Email", "Number", "Purpose", "Address",
-        "Approved By", "Check-In Time", "Check-In Gate", "Checked-In By",
-        "Check-Out Time", "Check-Out Gate", "Checked-Out By", "Date"
-    ]
-    sheet.append(headers)
+    if request.args.get('format') == 'csv':
+        return Response(
+            stream_with_context(_csv_chunks(query)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment;filename=visitor_logs_{filename_date}.csv'}
+        )
 
-    # Style headers
-    for cell in sheet[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center')
+    return Response(
+        stream_with_context(_xlsx_chunks(query)),
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        headers={'Content-Disposition': f'attachment;filename=visitor_logs_{filename_date}.xlsx'}
+    )
+
+
+# --- Streaming helpers ---
+# Rows come from a server-side cursor (yield_per) so only one batch is in memory at a time.
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
 
-    # Add data rows
+HEADERS = [
+    "Name", "Email", "Number", "Purpose", "Address",
+    "Approved By", "Check-In Time", "Check-In Gate", "Checked-In By",
+    "Check-Out Time", "Check-Out Gate", "Checked-Out By", "Date"
+]
+# Fixed widths: write-only sheets need them before the first row, so no per-cell sizing pass
+COLUMN_WIDTHS = [28, 32, 16, 24, 30, 16, 14, 14, 16, 14, 14, 16, 20]
+
+
+def _export_rows(query):
     manila_tz = pytz.timezone('Asia/Manila')
-    for log in logs:
+    for log in query.yield_per(YIELD_PER):
         check_in_time = log.check_in_time.astimezone(manila_tz).strftime('%I:%M %p') if log.check_in_time else '—'
         check_out_time = log.check_out_time.astimezone(manila_tz).strftime('%I:%M %p') if log.check_out_time else '—'
         visit_date = log.visit_date.strftime('%B %d, %Y') if log.visit_date else '—'
-        
-        row_data = [
+
+        yield [
             log.name, log.email, log.number, log.purpose, log.address,
             log.approved_by or '—',
             check_in_time,
@@ -97,32 +116,46 @@ def export_logs_excel():
             log.checked_out_by or '—',
             visit_date
         ]
-        sheet.append(row_data)
-
-    # Adjust column widths
-    for col_cells in sheet.columns:
-        max_length = 0
-        column = col_cells[0].column_letter 
-        for cell in col_cells:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(cell.value)
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        sheet.column_dimensions[column].width = adjusted_width
-
-    # Save to a memory buffer
-    excel_buffer = BytesIO()
-    workbook.save(excel_buffer)
-    excel_buffer.seek(0)
-    
-    # Create filename
-    filename_date = filter_date or datetime.now(manila_tz).strftime('%Y-%m-%d')
-    filename = f"visitor_logs_{filename_date}.xlsx"
 
-    return Response(
-        excel_buffer,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment;filename={filename}'}
-    )
\ No newline at end of file
+
+def _csv_chunks(query):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM so Excel opens the file as UTF-8
+    writer.writerow(HEADERS)
+    for row in _export_rows(query):
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _xlsx_chunks(query):
+    # Write-only mode streams rows to a temp file instead of keeping every cell in memory.
+    # An .xlsx is a zip, so it is only complete after save(); it is then sent in chunks.
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Visitor Logs")
+    for index, width in enumerate(COLUMN_WIDTHS, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+
+    header_cells = []
+    for title in HEADERS:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center')
+        header_cells.append(cell)
+    sheet.append(header_cells)
+
+    for row in _export_rows(query):
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
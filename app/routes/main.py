@@ -1,17 +1,22 @@
 # app/routes/main.py
 import os
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, session
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
 from flask_login import current_user, login_required
-from app.models import VisitorLog, Request, db, User, Visitor
+from app.models import VisitorLog, VisitSession, Request, db, User, Visitor
 from werkzeug.utils import secure_filename
-from app.utils.helpers import get_current_time, generate_unique_secure_code
+from app.utils.helpers import get_current_time, generate_unique_secure_code, in_manila_days
+from app.utils.pagination import page_size, keyset_paginate
+from app.utils.search import search_condition, match_rank
 from app.utils.qr_decoder import decode_qr
-from datetime import datetime, timedelta
+from app.live_updates import dashboard_counters
+from app.brevo_client import brevo_client
+from app.stall_detector import stall_detector
+from app import rate_limits
+from datetime import datetime
 from sqlalchemy import case, func
 from sqlalchemy.orm import aliased
 from app import socketio, csrf, limiter
 import uuid
-import pytz
 
 
 bp = Blueprint('main', __name__)
@@ -29,50 +34,19 @@ def index():
 @bp.route("/dashboard")
 @login_required
 def dashboard():
-    manila_tz = pytz.timezone("Asia/Manila")
     now_manila = get_current_time()
-    
-    start_of_day_manila = now_manila.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_day_manila = start_of_day_manila + timedelta(days=1)
-    start_utc = start_of_day_manila.astimezone(pytz.utc)
-    end_utc = end_of_day_manila.astimezone(pytz.utc)
-
-    # Calculation for "Registered Today"
-    registered_today = Request.query.filter(
-        Request.timestamp >= start_utc,
-        Request.timestamp < end_utc
-    ).count()
     today_date_str = now_manila.strftime('%Y-%m-%d')
 
-    # Calculation for "Visitors Today"
-    visitor_today = db.session.query(VisitorLog.visit_session_id).filter(
-        VisitorLog.status == "Checked-In",
-        VisitorLog.timestamp >= start_utc,
-        VisitorLog.timestamp < end_utc
-    ).distinct().count()
-
-    # Subquery for latest logs (unchanged)
-    latest_logs_sub = db.session.query(
-        VisitorLog.visit_session_id,
-        func.max(VisitorLog.timestamp).label("latest_time")
-    ).group_by(VisitorLog.visit_session_id).subquery()
-
-    # Corrected calculation for "Currently Checked In"
-    checked_in = db.session.query(VisitorLog).join(
-        latest_logs_sub,
-        (VisitorLog.visit_session_id == latest_logs_sub.c.visit_session_id) &
-        (VisitorLog.timestamp == latest_logs_sub.c.latest_time)
-    ).filter(
-        VisitorLog.status == 'Checked-In',
-        VisitorLog.timestamp >= start_utc, # <-- THIS LINE WAS ADDED TO FIX THE COUNT
-        VisitorLog.timestamp < end_utc      # <-- THIS LINE WAS ADDED TO FIX THE COUNT
-    ).count()
+    # "Visitors Today", "Currently Checked In" (presence table) and "Registered Today";
+    # the same numbers are pushed to open dashboards by app/live_updates.py
+    counters = dashboard_counters()
 
     # Query for "Recent Visitors" table (unchanged)
     U_approved = aliased(User, name='u_approved')
     U_checkin = aliased(User, name='u_checkin')
     U_checkout = aliased(User, name='u_checkout')
     recent_visitors_query = db.session.query(
+        VisitorLog.visit_session_id,
         VisitorLog.name,
         VisitorLog.destination,
         VisitorLog.purpose,
@@ -102,9 +76,9 @@ def dashboard():
     return render_template(
         "Dashboard.html",
         logs=recent_visitors_query,
-        visitor_today=visitor_today,
-        checked_in=checked_in,
-        registered_today=registered_today,
+        visitor_today=counters["visitor_today"],
+        checked_in=counters["checked_in"],
+        registered_today=counters["registered_today"],
         today_date_str=today_date_str
     )
 
@@ -113,22 +87,44 @@ def dashboard():
 def logs():
     filter_date = request.args.get("filter_date")
     search_query = request.args.get("search_query", "").strip()
-    page = request.args.get("page", 1, type=int)
-    
-    # --- ADDED: LOGIC TO REMEMBER PER_PAGE SETTING ---
-    per_page_from_request = request.args.get("per_page")
-    if per_page_from_request:
-        session['per_page'] = int(per_page_from_request)
-    per_page = session.get('per_page', 10)
-    # --- END OF ADDED LOGIC ---
+    per_page = page_size()
 
     now_manila = get_current_time()
 
+    filter_day = None
+    if filter_date:
+        try:
+            filter_day = datetime.strptime(filter_date, "%Y-%m-%d").date()
+        except ValueError:
+            flash("Invalid date format.", "danger")
+            return render_template("Logs.html", logs=[], filter_date=filter_date, search_query=search_query, pagination=None, per_page=per_page)
+    elif not search_query:
+        filter_day = now_manila.date()
+
+    # ✅ Page through visits on the visit_session table, newest activity first:
+    # a keyset seek on (last activity, id) instead of COUNT + OFFSET over the grouped logs
+    last_activity = func.coalesce(VisitSession.check_out_time, VisitSession.check_in_time)
+    columns = [last_activity, VisitSession.id]
+    if search_query:
+        # indexed name / phone / email / code search on the logs, best matches first
+        columns.insert(0, match_rank(search_query, VisitSession.name, VisitSession.unique_code))
+    visits = db.session.query(*columns)
+    if search_query:
+        matching = db.session.query(VisitorLog.visit_session_id).filter(
+            search_condition(VisitorLog.search_text, search_query)
+        )
+        visits = visits.filter(VisitSession.id.in_(matching))
+    if filter_day:
+        visits = visits.filter(in_manila_days(last_activity, filter_day))
+    pagination = keyset_paginate(visits, columns, key=tuple, per_page=per_page)
+    session_ids = [v[-1] for v in pagination.items]
+
     U_checkin = aliased(User, name='u_checkin')
     U_checkout = aliased(User, name='u_checkout')
     U_approved = aliased(User, name='u_approved') 
 
-    base_query = db.session.query(
+    # One row per visit of this page only
+    rows = db.session.query(
         VisitorLog.visit_session_id,
         VisitorLog.visitor_id,
         VisitorLog.name,
@@ -152,6 +148,8 @@ def logs():
         U_checkout, VisitorLog.check_out_by_id == U_checkout.id
     ).outerjoin(
         U_approved, VisitorLog.approved_by_id == U_approved.id 
+    ).filter(
+        VisitorLog.visit_session_id.in_(session_ids)
     ).group_by(
         VisitorLog.visit_session_id,
         VisitorLog.visitor_id,
@@ -162,30 +160,12 @@ def logs():
         VisitorLog.purpose,
         VisitorLog.address,
         VisitorLog.unique_code
-    )
-    if search_query:
-        base_query = base_query.filter(VisitorLog.name.ilike(f"%{search_query}%"))
-
-    if filter_date:
-        try:
-            filter_date_obj = datetime.strptime(filter_date, "%Y-%m-%d").date()
-            base_query = base_query.having(
-                func.date(func.timezone('Asia/Manila', func.max(VisitorLog.timestamp))) == filter_date_obj
-            )
-        except ValueError:
-            flash("Invalid date format.", "danger")
-            return render_template("Logs.html", logs=[], filter_date=filter_date, search_query=search_query, pagination=None, per_page=per_page)
-    else:
-        if not search_query:
-            today_date = now_manila.date()
-            base_query = base_query.having(
-                func.date(func.timezone('Asia/Manila', func.max(VisitorLog.timestamp))) == today_date
-            )
-
-    base_query = base_query.order_by(func.max(VisitorLog.timestamp).desc())
+    ).all() if session_ids else []
+    position = {session_id: i for i, session_id in enumerate(session_ids)}
+    logs = sorted(rows, key=lambda r: position[r.visit_session_id])
 
-    pagination = base_query.paginate(page=page, per_page=per_page, error_out=False)
-    logs = pagination.items
+    # new visits are only added live to the first page of today's list
+    live_insert = pagination.is_first and not search_query and filter_day == now_manila.date()
 
     return render_template(
         "Logs.html",
@@ -193,7 +173,8 @@ def logs():
         filter_date=filter_date,
         search_query=search_query,
         pagination=pagination,
-        per_page=per_page
+        per_page=per_page,
+        live_insert=live_insert
     )
 
 @bp.route("/analytic")
@@ -206,6 +187,29 @@ def analytic():
 def setting():
     return render_template("Setting.html")
 
+@bp.route("/admin/brevo-metrics")
+@login_required
+def brevo_metrics():
+    if current_user.role != 'admin':
+        return jsonify({"message": "Unauthorized access."}), 403
+    return jsonify(brevo_client.metrics())
+
+@bp.route("/admin/rate-limit-metrics")
+@login_required
+def rate_limit_metrics():
+    if current_user.role != 'admin':
+        return jsonify({"message": "Unauthorized access."}), 403
+    budgets = {cls: {role or 'anonymous': budget for role, budget in roles.items()}
+               for cls, roles in rate_limits.BUDGETS.items()}
+    return jsonify({"budgets": budgets, "requests": rate_limits.metrics.snapshot()})
+
+@bp.route("/admin/event-loop-stalls")
+@login_required
+def event_loop_stalls():
+    if current_user.role != 'admin':
+        return jsonify({"message": "Unauthorized access."}), 403
+    return jsonify(stall_detector.report())
+
 @bp.route("/help")
 @login_required
 def help():
@@ -1,19 +1,22 @@
 # app/routes/request.py
-# This version sends emails directly (synchronously) without using background threads.
+# Registration emails are queued in the email outbox and delivered in the background.
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session, abort, Response
 from flask_login import current_user, login_required
 from app.models import db, Request, Visitor, VisitorLog
-from app.utils.helpers import generate_unique_secure_code, get_current_time
-from app.brevo_mailer import send_visitor_qr_email, send_group_qr_email
-from app import csrf, socketio, limiter
+from app.utils.helpers import generate_unique_secure_code, get_current_time, in_manila_days, manila_day_bounds
+from app.utils.presence import find_open_visit, is_checked_in_today, open_codes, record_log
+from app.utils.csv_import import read_sheet, import_requests
+from app.utils.pagination import page_size, keyset_paginate
+from app.utils.search import search_condition, match_rank
+from app.utils.qr_render import render_qr_png, code_from_qr_token
+from app.email_outbox import enqueue_visitor_qr, enqueue_group_qr, notify_outbox
+from app.live_updates import publish_visits, publish_requests
+from app import csrf
 from datetime import datetime
 from collections import defaultdict
 from werkzeug.utils import secure_filename
-import pytz
 import uuid
-import pandas as pd
-import secrets
 
 bp = Blueprint('request_bp', __name__)
 
@@ -22,40 +25,34 @@ bp = Blueprint('request_bp', __name__)
 def request_page():
     search_query = request.args.get("search_query", "").strip()
     filter_date_str = request.args.get("filter_date")
-    # Get the page number from URL arguments, default to 1
-    page = request.args.get('page', 1, type=int)
-    
-    # --- ADDED: LOGIC TO REMEMBER PER_PAGE SETTING ---
-    per_page_from_request = request.args.get("per_page")
-    if per_page_from_request:
-        session['per_page'] = int(per_page_from_request)
-    per_page = session.get('per_page', 10)
-    # --- END OF ADDED LOGIC ---
+    per_page = page_size()
 
     query = Request.query
     if filter_date_str:
         try:
             target_date = datetime.strptime(filter_date_str, "%Y-%m-%d").date()
-            query = query.filter(db.func.date(db.func.timezone('Asia/Manila', Request.timestamp)) == target_date)
+            query = query.filter(in_manila_days(Request.timestamp, target_date))
         except ValueError:
             pass
     elif filter_date_str is None:
         today = get_current_time().date()
-        query = query.filter(db.func.date(db.func.timezone('Asia/Manila', Request.timestamp)) == today)
+        query = query.filter(in_manila_days(Request.timestamp, today))
     
+    # ✅ Keyset pages on (timestamp, id): every page costs one index seek
+    columns = [Request.timestamp, Request.id]
     if search_query:
-        query = query.filter(Request.name.ilike(f"%{search_query}%"))
-    
-    # MODIFIED: Use paginate() instead of all()
-    pagination = query.order_by(Request.timestamp.desc()).paginate(page=page, per_page=per_page, error_out=False)
+        # indexed name / phone / email / code search, best matches first
+        rank = match_rank(search_query, Request.name, Request.unique_code, Request.group_code)
+        query = query.filter(search_condition(Request.search_text, search_query)).add_columns(rank)
+        columns.insert(0, rank)
+        pagination = keyset_paginate(query, columns, key=lambda row: (row[1], row[0].timestamp, row[0].id), per_page=per_page)
+        pagination.items = [row[0] for row in pagination.items]
+    else:
+        pagination = keyset_paginate(query, columns, key=lambda r: (r.timestamp, r.id), per_page=per_page)
     all_matching_requests = pagination.items
 
-    checked_in_codes = set()
-    if all_matching_requests:
-        unique_codes = [req.unique_code for req in all_matching_requests]
-        subquery = db.session.query(VisitorLog.unique_code, db.func.max(VisitorLog.timestamp).label('max_timestamp')).filter(VisitorLog.unique_code.in_(unique_codes)).group_by(VisitorLog.unique_code).subquery()
-        checked_in_logs = db.session.query(VisitorLog.unique_code).join(subquery, db.and_(VisitorLog.unique_code == subquery.c.unique_code, VisitorLog.timestamp == subquery.c.max_timestamp)).filter(VisitorLog.status == 'Checked-In').all()
-        checked_in_codes = {log.unique_code for log in checked_in_logs}
+    # ✅ Presence lookup on the open-visit index instead of a max(timestamp) scan of the logs
+    checked_in_codes = open_codes([req.unique_code for req in all_matching_requests])
 
     grouped_requests = defaultdict(list)
     for req in all_matching_requests:
@@ -64,13 +61,20 @@ def request_page():
         else:
             grouped_requests[f"single-{req.id}"].append(req)
 
+    # new registrations are only added live to the first page of today's (or the unfiltered) list
+    live_insert = pagination.is_first and not search_query and (
+        not filter_date_str or filter_date_str == get_current_time().strftime('%Y-%m-%d')
+    )
+
     return render_template(
         "Request.html",
         groups=grouped_requests,
         checked_in_codes=checked_in_codes,
         search_query=search_query,
         filter_date=filter_date_str,
-        pagination=pagination  # Pass the pagination object to the template
+        pagination=pagination,  # Pass the pagination object to the template
+        per_page=per_page,
+        live_insert=live_insert
     )
 
 @bp.route("/Visitor-register-form")
@@ -115,10 +119,20 @@ def multi_registration_success():
         group_code=group_code
     )
 
+# Public QR image linked from batch group emails (see brevo_mailer.send_group_qr_batch)
+@bp.route("/qr/<token>.png")
+def qr_image(token):
+    code = code_from_qr_token(token)
+    if not code:
+        abort(404)
+    response = Response(render_qr_png(code), mimetype="image/png")
+    # a check-in credential: never stored by shared proxies / CDNs
+    response.headers["Cache-Control"] = "private, no-store"
+    return response
+
 # ✅ UPDATED: submit_request (Added destination)
 @bp.route("/submit-request", methods=["POST"])
 @csrf.exempt
-@limiter.exempt
 def submit_request():
     first_name = request.form.get("first_name", "").strip()
     middle_initial_raw = request.form.get("middle_initial", "").strip()
@@ -158,16 +172,12 @@ def submit_request():
         timestamp=datetime.utcnow()
     )
     db.session.add(new_request)
+    # ✅ Email goes through the outbox, committed together with the request
+    enqueue_visitor_qr(new_request)
     db.session.commit()
+    notify_outbox()
 
-    if new_request.email:
-        try:
-            send_visitor_qr_email(new_request)
-        except Exception as e:
-            print(f"Error sending email for {new_request.email}: {e}")
-
-    socketio.emit('dashboard_update')
-    socketio.emit('request_update')
+    publish_requests([new_request])
 
     session['reg_success_code'] = new_request.unique_code
     session['reg_success_name'] = new_request.name
@@ -182,8 +192,7 @@ def submit_request():
 def direct_checkin(request_id):
     req = Request.query.get_or_404(request_id)
 
-    last_log = VisitorLog.query.filter_by(unique_code=req.unique_code).order_by(VisitorLog.timestamp.desc()).first()
-    if last_log and last_log.status == "Checked-In" and last_log.timestamp.astimezone(pytz.timezone('Asia/Manila')).date() == get_current_time().date():
+    if is_checked_in_today(find_open_visit(unique_code=req.unique_code)):
         flash(f"{req.name} is already checked in.", "warning")
         return redirect(url_for('request_bp.request_page'))
 
@@ -219,10 +228,11 @@ def direct_checkin(request_id):
         approved_by_id=current_user.id
     )
     db.session.add(new_log)
+    record_log(new_log)
+    session_id, name = new_log.visit_session_id, visitor.name  # read before commit expires them
     db.session.commit()
-    flash(f"{visitor.name} has been checked in.", "success")
-    socketio.emit('dashboard_update')
-    socketio.emit('request_update')
+    flash(f"{name} has been checked in.", "success")
+    publish_visits([session_id])
     return redirect(url_for('request_bp.request_page'))
 
 
@@ -231,10 +241,11 @@ def direct_checkin(request_id):
 @login_required
 def direct_checkin_group(group_code):
     group_requests = Request.query.filter_by(group_code=group_code).all()
-    checked_in_count = 0
+    start_of_today_utc, _ = manila_day_bounds(get_current_time().date())
+    already_in = open_codes([req.unique_code for req in group_requests], start_utc=start_of_today_utc)
+    session_ids = []
     for req in group_requests:
-        last_log = VisitorLog.query.filter_by(unique_code=req.unique_code).order_by(VisitorLog.timestamp.desc()).first()
-        if last_log and last_log.status == "Checked-In" and last_log.timestamp.astimezone(pytz.timezone('Asia/Manila')).date() == get_current_time().date():
+        if req.unique_code in already_in:
             continue
 
         visitor = Visitor.query.filter_by(name=req.name, number=req.number).first()
@@ -263,18 +274,17 @@ def direct_checkin_group(group_code):
             approved_by_id=current_user.id
         )
         db.session.add(new_log)
-        checked_in_count += 1
+        record_log(new_log)
+        session_ids.append(new_log.visit_session_id)
     
     db.session.commit()
-    flash(f"{checked_in_count} new members of group {group_code} have been checked in.", "success")
-    socketio.emit('dashboard_update')
-    socketio.emit('request_update')
+    flash(f"{len(session_ids)} new members of group {group_code} have been checked in.", "success")
+    publish_visits(session_ids)
     return redirect(url_for('request_bp.request_page'))
 
 
 # ✅ UPDATED: multi_form_entry (Added destination loop)
 @bp.route('/Multi-form-entry', methods=['GET', 'POST'])
-@limiter.exempt
 @csrf.exempt
 def multi_form_entry():
     if request.method == 'POST':
@@ -325,21 +335,15 @@ def multi_form_entry():
                 group_code = generate_unique_secure_code()
                 for r in created:
                     r.group_code = group_code
-            db.session.commit()
 
             if group_code and len(created) > 1:
-                try:
-                    send_group_qr_email(created)
-                except Exception as e:
-                    print(f"Error sending group email for multi-form: {e}")
-            elif created and created[0].email:
-                try:
-                    send_visitor_qr_email(created[0])
-                except Exception as e:
-                    print(f"Error sending email for {created[0].email}: {e}")
-
-            socketio.emit('dashboard_update')
-            socketio.emit('request_update')
+                enqueue_group_qr(created)
+            else:
+                enqueue_visitor_qr(created[0])
+            db.session.commit()
+            notify_outbox()
+
+            publish_requests(created)
 
             visitors_data = [
                 {"name": r.name, "unique_code": r.unique_code} for r in created
@@ -365,38 +369,30 @@ def upload_csv():
         return redirect(url_for("request_bp.request_page"))
     filename = secure_filename(file.filename)
     ext = filename.rsplit(".", 1)[-1].lower()
+    if ext not in ["csv", "xlsx", "xls"]:
+        flash("Invalid file format. Please upload a CSV or Excel file.", "danger")
+        return redirect(url_for("request_bp.request_page"))
     try:
-        if ext == "csv": df = pd.read_csv(file)
-        elif ext in ["xlsx", "xls"]: df = pd.read_excel(file)
-        else:
-            flash("Invalid file format. Please upload a CSV or Excel file.", "danger")
-            return redirect(url_for("request_bp.request_page"))
+        df = read_sheet(file, ext)
     except Exception as e:
         flash(f"Failed to process file: {str(e)}", "danger")
         return redirect(url_for("request_bp.request_page"))
-    created_requests = []
-    group_code = secrets.token_urlsafe(12)
-    for _, row in df.iterrows():
-        full_name = str(row.get("Name", "")).strip()
-        if not full_name: continue
-        new_request = Request(
-            name=full_name, email=str(row.get("Email", "")).strip(), number=str(row.get("Phone", "")).strip(),
-            purpose=str(row.get("Purpose", "")).strip(), 
-            destination=str(row.get("Destination", "")).strip(), # <--- Added here (Ensure CSV has "Destination" column)
-            address=str(row.get("Address", "")).strip(),
-            unique_code=generate_unique_secure_code(), status="Approve",
-            timestamp=datetime.utcnow(), group_code=group_code
-        )
-        created_requests.append(new_request)
+
+    # ✅ Vectorized import: validation, visitor matching, codes and INSERT are all set-based
+    created_requests, errors, returning = import_requests(df)
     if created_requests:
-        db.session.add_all(created_requests)
+        enqueue_group_qr(created_requests)
         db.session.commit()
-        try:
-            send_group_qr_email(created_requests)
-        except Exception as e:
-            print(f"Error sending group email for CSV upload: {e}")
-        socketio.emit("request_update")
-        flash(f"{len(created_requests)} requests uploaded successfully!", "success")
+        notify_outbox()
+        publish_requests(created_requests)
+        more = ", ..." if len(returning) > 10 else ""
+        note = f" ({len(returning)} returning visitors: rows {', '.join(map(str, returning[:10]))}{more})" if returning else ""
+        flash(f"{len(created_requests)} requests uploaded successfully!{note}", "success")
     else:
+        db.session.rollback()
         flash("No valid rows found in the file.", "warning")
-    return redirect(url_for("request_bp.request_page"))
\ No newline at end of file
+    if errors:
+        shown = "; ".join(f"Row {row}: {message}" for row, message in errors[:10])
+        more = f" (and {len(errors) - 10} more)" if len(errors) > 10 else ""
+        flash(f"{len(errors)} rows skipped. {shown}{more}", "warning")
+    return redirect(url_for("request_bp.request_page"))
@@ -2,11 +2,12 @@ from flask import Blueprint, request, jsonify
 from flask_login import current_user
 from app.models import db, VisitorLog, Request, Visitor
 from app import csrf
-from app import socketio
 from datetime import datetime
 import uuid
-import pytz
-from app.utils.helpers import get_current_time
+from app.utils.scan_resolver import resolve_scan_code, SCANNABLE_STATUSES
+from app.utils.presence import find_open_visit, is_checked_in_today, record_log
+from app.utils.group_checkin import process_group_scan
+from app.live_updates import publish_visits
 
 bp = Blueprint('scan', __name__)
 
@@ -28,13 +29,10 @@ def scan_checkin():
     if not code:
         return jsonify({"message": "Invalid or missing QR code data."}), 400
 
-    manila_tz = pytz.timezone('Asia/Manila')
-    today = get_current_time().date()
-
     # 1) Modal submission: user confirmed purpose/destination -> perform check-in
     if purpose_from_modal is not None:
         # accept single requests whether still "Approve" or already "Completed"
-        req = Request.query.filter(Request.unique_code == code, Request.status.in_(["Approve", "Completed"])).first()
+        req = Request.query.filter(Request.unique_code == code, Request.status.in_(SCANNABLE_STATUSES)).first()
         visitor = Visitor.query.filter_by(qr_code=code).first()
 
         target_visitor = visitor or (req and _find_or_create_visitor(req))
@@ -49,22 +47,21 @@ def scan_checkin():
             
         if req:
             req.status = "Completed"
-        db.session.commit()
 
+        # Single commit: the visitor update and the new log are written together
         action = _process_single_visitor(target_visitor, code, approved_by_id=current_user.id)
         return jsonify({"message": f"{target_visitor.name} {action}."})
 
     # 2) Initial scan: decide whether to show modal or immediately check-out
+    # ✅ One round trip: classifies the code and returns the open visit (if any)
+    resolved = resolve_scan_code(code)
 
     # If it's a permanent visitor record
-    visitor = Visitor.query.filter_by(qr_code=code).first()
-    if visitor:
-        # look at the latest log entry (any status) to determine current state
-        last_entry = VisitorLog.query.filter_by(visitor_id=visitor.id) \
-                                     .order_by(VisitorLog.timestamp.desc()).first()
-        # If latest entry is Checked-In and it's today -> this is a CHECK-OUT, process immediately
-        if last_entry and last_entry.status == "Checked-In" and last_entry.timestamp.astimezone(manila_tz).date() == today:
-            action = _process_single_visitor(visitor, code)
+    if resolved.kind == "visitor":
+        visitor = resolved.visitor
+        # If the visitor has an open visit from today -> this is a CHECK-OUT, process immediately
+        if resolved.checked_in_today:
+            action = _process_single_visitor(visitor, code, open_visit=resolved.open_visit)
             return jsonify({"message": f"{visitor.name} {action}."})
         
         # Otherwise ALWAYS show the purpose modal for individual check-ins
@@ -77,10 +74,9 @@ def scan_checkin():
         })
 
     # If not a permanent visitor, check for an individual registration (single request)
-    req = Request.query.filter(Request.unique_code == code, Request.status.in_(["Approve", "Completed"])).first()
-    if req:
-        # ensure permanent visitor exists
-        _find_or_create_visitor(req)
+    # The permanent visitor is created when the modal is submitted, so nothing is written here.
+    if resolved.kind == "request":
+        req = resolved.request
         return jsonify({
             "action": "show_modal", 
             "name": req.name, 
@@ -88,35 +84,12 @@ def scan_checkin():
             "destination": req.destination or "" 
         })
 
-    # Check for a group code (group check-in/check-out). Group behavior unchanged.
-    group_requests = Request.query.filter(Request.group_code == code, Request.status.in_(["Approve", "Completed"])).all()
-    if group_requests:
-        any_checked_in = False
-        visitors_in_group = []
-        for r in group_requests:
-            v = _find_or_create_visitor(r)
-            visitors_in_group.append(v)
-            last_entry = VisitorLog.query.filter_by(visitor_id=v.id) \
-                                         .order_by(VisitorLog.timestamp.desc()).first()
-            if last_entry and last_entry.status == "Checked-In" and last_entry.timestamp.astimezone(manila_tz).date() == today:
-                any_checked_in = True
-
-        results = []
-        if any_checked_in:
-            # check everyone out (no modal)
-            for v in visitors_in_group:
-                _process_single_visitor(v, v.qr_code, commit=False)
-                results.append(f"{v.name}: Checked-Out")
-        else:
-            # check everyone in (group flow remains automated)
-            for r in group_requests:
-                v = _find_or_create_visitor(r)
-                _process_single_visitor(v, r.unique_code, approved_by_id=r.approved_by_id, commit=False)
-                r.status = "Completed"
-                results.append(f"{v.name}: Checked-In")
-
-        db.session.commit()
-        socketio.emit('dashboard_update')
+    # Check for a group code (group check-in/check-out).
+    # ✅ Bulk engine: set-based lookups, one bulk insert and one commit for the whole group
+    if resolved.kind == "group":
+        results, session_ids = process_group_scan(code, current_user, members=resolved.members)
+        # ✅ One delta with the touched visits instead of a reload on every open page
+        publish_visits(session_ids)
         return jsonify({"message": f"Group {code} processed", "details": results})
 
     return jsonify({"message": "QR code or unique code not recognized."}), 404
@@ -136,22 +109,21 @@ def _find_or_create_visitor(req):
             last_address=getattr(req, "address", None)
         )
         db.session.add(visitor)
-        db.session.commit()
+        # flush only: the caller commits once the whole scan is processed
+        db.session.flush()
     elif visitor.qr_code != req.unique_code:
         visitor.qr_code = req.unique_code
-        db.session.commit()
     return visitor
 
 
-def _process_single_visitor(visitor, used_code, approved_by_id=None, commit=True):
-    last_log = VisitorLog.query.filter_by(visitor_id=visitor.id).order_by(VisitorLog.timestamp.desc()).first()
-    should_check_in = True
-    if last_log and last_log.status == "Checked-In":
-        manila_tz = pytz.timezone('Asia/Manila')
-        now_manila = get_current_time()
-        last_log_manila = last_log.timestamp.astimezone(manila_tz)
-        if last_log_manila.date() == now_manila.date():
-            should_check_in = False
+_UNRESOLVED = object()
+
+
+def _process_single_visitor(visitor, used_code, approved_by_id=None, commit=True, open_visit=_UNRESOLVED):
+    # open_visit may be passed in when the caller already resolved it (see resolve_scan_code)
+    if open_visit is _UNRESOLVED:
+        open_visit = find_open_visit(visitor_id=visitor.id)
+    should_check_in = not is_checked_in_today(open_visit)
 
     if should_check_in:
         new_log = VisitorLog(
@@ -178,23 +150,26 @@ def _process_single_visitor(visitor, used_code, approved_by_id=None, commit=True
             name=visitor.name,
             email=visitor.email,
             number=visitor.number,
-            purpose=last_log.purpose,
-            # ✅ NEW: Copy destination from previous log (or visitor history)
-            destination=getattr(last_log, "destination", visitor.last_destination), 
-            address=last_log.address,
+            purpose=open_visit.purpose,
+            # ✅ NEW: Copy destination from the open visit (or visitor history)
+            destination=open_visit.destination or visitor.last_destination, 
+            address=open_visit.address,
             status="Checked-Out",
             unique_code=used_code,
-            visit_session_id=last_log.visit_session_id,
+            visit_session_id=open_visit.id,
             timestamp=datetime.utcnow(),
             check_out_by_id=current_user.id,
             check_out_gate=current_user.gate_role,
-            approved_by_id=last_log.approved_by_id
+            approved_by_id=open_visit.approved_by_id
         )
         action = "Checked-Out"
 
     db.session.add(new_log)
+    # ✅ Keep the presence table in step with the log
+    record_log(new_log)
     if commit:
+        session_id = new_log.visit_session_id  # read before commit expires it
         db.session.commit()
-        socketio.emit('dashboard_update')
+        publish_visits([session_id])
 
     return action
\ No newline at end of file
@@ -0,0 +1,137 @@
+# app/stall_detector.py
+# Opt-in (STALL_DETECTOR=true) detector for code that holds the eventlet hub:
+# anything that doesn't yield (cv2 / pandas / openpyxl work, a blocking HTTP or
+# DB call) freezes every other request and socket of the worker while it runs.
+#
+# A greenlet switch tracer measures how long each greenlet ran before giving
+# control back; runs longer than STALL_THRESHOLD_MS are logged with the route
+# that was being served. A watchdog OS thread samples the main thread's stack
+# while such a run is still going, so the trace shows the blocking call itself
+# rather than where the greenlet finally yielded. (C code that keeps the GIL
+# stops the watchdog too; those stalls are reported with the yield-point stack.)
+#
+# Results: printed to the log and served to admins at /admin/event-loop-stalls.
+import sys
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from weakref import WeakKeyDictionary
+
+import eventlet
+import greenlet
+from flask import request
+
+STACK_DEPTH = 20  # innermost frames kept per trace
+
+
+class StallDetector:
+    def __init__(self):
+        self.enabled = False
+        self._threshold = 0.2
+        self._stalls = deque(maxlen=50)
+        self._by_route = {}
+        self._routes = WeakKeyDictionary()  # greenlet -> route it last served
+        self._hub = None
+        self._running = None
+        self._since = time.perf_counter()
+        self._sample = None  # (since, stack) taken by the watchdog during the current run
+
+    def init_app(self, app):
+        app.config.setdefault('STALL_DETECTOR', False)
+        app.config.setdefault('STALL_THRESHOLD_MS', 200)
+        app.config.setdefault('STALL_LOG_SIZE', 50)
+        app.extensions['stall_detector'] = self
+        if not app.config['STALL_DETECTOR'] or self.enabled:
+            return
+        if not eventlet.patcher.is_monkey_patched('thread'):
+            print("Stall detector: not running under eventlet, disabled")
+            return
+
+        self._threshold = app.config['STALL_THRESHOLD_MS'] / 1000
+        self._stalls = deque(maxlen=app.config['STALL_LOG_SIZE'])
+        self._hub = eventlet.hubs.get_hub().greenlet
+        app.before_request(self._tag_request)
+
+        real_threading = eventlet.patcher.original('threading')
+        self._main_thread = real_threading.get_ident()
+        self._since = time.perf_counter()
+        greenlet.settrace(self._trace)
+        real_threading.Thread(target=self._watch, name="stall-watchdog", daemon=True).start()
+        self.enabled = True
+
+    # --- request tagging ---
+
+    def _tag_request(self):
+        # kept after the request ends: a stall is only measured when the greenlet
+        # yields, which is often after the response has been built
+        rule = request.url_rule.rule if request.url_rule else request.path
+        self._routes[greenlet.getcurrent()] = f"{request.method} {rule}"
+
+    # --- measuring (main thread, on every greenlet switch) ---
+
+    def _trace(self, event, args):
+        if event not in ('switch', 'throw'):
+            return
+        origin, target = args
+        now = time.perf_counter()
+        if origin is not self._hub and now - self._since >= self._threshold:
+            try:
+                self._record(origin, now - self._since)
+            except Exception as e:
+                print(f"Stall detector error: {e}")
+        self._since = now
+        self._running = target
+
+    def _record(self, origin, duration):
+        sample = self._sample
+        if sample is not None and sample[0] == self._since:
+            stack = sample[1]
+        else:
+            stack = traceback.format_stack(origin.gr_frame) if origin.gr_frame is not None else []
+        stack = [line.rstrip() for line in stack[-STACK_DEPTH:]]
+        route = self._routes.get(origin, "(no request)")
+        duration_ms = round(duration * 1000, 1)
+
+        self._stalls.append({
+            "at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "route": route,
+            "duration_ms": duration_ms,
+            "stack": stack,
+        })
+        stats = self._by_route.setdefault(route, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] = round(stats["total_ms"] + duration_ms, 1)
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        print(f"Event loop stall: {route} held the hub for {duration_ms} ms\n" + "\n".join(stack[-6:]))
+
+    # --- sampling (watchdog OS thread) ---
+
+    def _watch(self):
+        sleep = eventlet.patcher.original('time').sleep
+        while True:
+            sleep(self._threshold / 2)
+            since, running = self._since, self._running
+            if running is None or running is self._hub:
+                continue
+            if time.perf_counter() - since < self._threshold:
+                continue
+            if self._sample is not None and self._sample[0] == since:
+                continue  # already sampled this run
+            frame = sys._current_frames().get(self._main_thread)
+            if frame is not None and self._since == since:
+                self._sample = (since, traceback.format_stack(frame))
+
+    # --- report ---
+
+    def report(self):
+        routes = sorted(self._by_route.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": round(self._threshold * 1000),
+            "by_route": [{"route": route, **stats} for route, stats in routes],
+            "stalls": list(reversed(self._stalls)),
+        }
+
+
+stall_detector = StallDetector()
@@ -0,0 +1,104 @@
+# app/user_cache.py
+# Identity cache for Flask-Login. load_user used to SELECT the user on every
+# authenticated request (every gate scan included) to keep gate_role fresh.
+# Now the user's columns are cached (in Redis when REDIS_URL is set, so all
+# workers share them, otherwise in-process) and turned back into a User bound
+# to the request's session without a query.
+#
+# Freshness: any commit that updates or deletes a User (update_profile, the
+# password reset...) drops its entry; USER_CACHE_TTL bounds staleness for
+# anything else (e.g. another process without Redis, or SQL run by hand).
+import json
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from app.models import db, User
+
+# Secrets stay out of the cache; they are loaded on first access like any expired attribute
+CACHED_COLUMNS = ('id', 'email', 'username', 'role', 'gate_role', 'profile_picture', 'two_factor_enabled')
+
+
+class UserCache:
+    def __init__(self):
+        self._redis = None
+        self._lock = threading.Lock()
+        self._local = {}  # user id -> (expires_at, columns)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_REDIS_URL', None)
+        app.config.setdefault('USER_CACHE_TTL', 60)
+        self._ttl = app.config['USER_CACHE_TTL']
+        if app.config['USER_CACHE_REDIS_URL']:
+            import redis
+            self._redis = redis.Redis.from_url(app.config['USER_CACHE_REDIS_URL'],
+                                               socket_timeout=1, socket_connect_timeout=1)
+        app.extensions['user_cache'] = self
+        event.listen(db.session, 'before_flush', self._before_flush)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+
+    # --- lookups ---
+
+    def get(self, user_id):
+        """The User with this id, attached to db.session; no query when cached."""
+        columns = self._read(user_id)
+        if columns is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self._write(user_id, {name: getattr(user, name) for name in CACHED_COLUMNS})
+            return user
+        user = User(**columns)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        if self._redis is not None:
+            try:
+                self._redis.delete(f"user:{user_id}")
+            except Exception as e:
+                print(f"User cache: invalidation of user {user_id} failed ({e})")
+        with self._lock:
+            self._local.pop(user_id, None)
+
+    # --- invalidation on commit ---
+
+    def _before_flush(self, session, flush_context, instances):
+        changed = [obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)]
+        if changed:
+            session.info.setdefault('users_changed', set()).update(changed)
+
+    def _after_commit(self, session):
+        for user_id in session.info.pop('users_changed', ()):
+            self.invalidate(user_id)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('users_changed', None)
+
+    # --- storage ---
+
+    def _read(self, user_id):
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(f"user:{user_id}")
+                return json.loads(raw) if raw is not None else None
+            except Exception:
+                return None
+        with self._lock:
+            entry = self._local.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _write(self, user_id, columns):
+        if self._redis is not None:
+            try:
+                self._redis.set(f"user:{user_id}", json.dumps(columns), ex=self._ttl)
+            except Exception:
+                pass
+            return
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self._ttl, columns)
+
+
+user_cache = UserCache()
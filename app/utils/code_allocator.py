@@ -0,0 +1,72 @@
+import secrets
+import string
+import threading
+from sqlalchemy import or_
+from app.models import db, Request
+
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+# bytes >= 252 are dropped so every character is equally likely (252 = 7 * 36)
+_UNBIASED_LIMIT = 256 - 256 % len(CODE_ALPHABET)
+# codes handed out by this process, so two requests served concurrently by the same
+# worker never get the same code before either has committed
+_RECENT_LIMIT = 100_000
+
+
+class CodeAllocator:
+    """
+    Hands out batches of random codes that are not used as a request code or a
+    group code yet. Each batch of candidates is checked with a single IN query;
+    the unique constraint on Request.unique_code stays the final guard.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent = set()
+
+    @staticmethod
+    def _candidates(count, length):
+        codes = set()
+        while len(codes) < count:
+            missing = count - len(codes)
+            raw = secrets.token_bytes(missing * length * 2)
+            chars = [CODE_ALPHABET[b % len(CODE_ALPHABET)] for b in raw if b < _UNBIASED_LIMIT]
+            for i in range(0, len(chars) - length + 1, length):
+                codes.add(''.join(chars[i:i + length]))
+                if len(codes) == count:
+                    break
+        return codes
+
+    def _taken(self, candidates):
+        rows = db.session.query(Request.unique_code, Request.group_code).filter(or_(
+            Request.unique_code.in_(candidates), Request.group_code.in_(candidates)
+        ))
+        return {code for row in rows for code in row if code in candidates}
+
+    def allocate(self, count, length=8):
+        with self._lock:
+            # only between calls: clearing mid-call would let a later round redraw a code of this batch
+            if len(self._recent) >= _RECENT_LIMIT:
+                self._recent.clear()
+        codes = []
+        while len(codes) < count:
+            with self._lock:
+                candidates = self._candidates(count - len(codes), length) - self._recent
+            candidates -= self._taken(candidates)
+            with self._lock:
+                candidates -= self._recent
+                candidates.difference_update(codes)
+                self._recent |= candidates
+            codes.extend(candidates)
+        return codes
+
+
+_allocator = CodeAllocator()
+
+
+def allocate_codes(count, length=8):
+    """`count` fresh codes in one call (usually one query)."""
+    return _allocator.allocate(count, length) if count > 0 else []
+
+
+def allocate_code(length=8):
+    return _allocator.allocate(1, length)[0]
@@ -0,0 +1,127 @@
+from datetime import datetime
+from sqlalchemy import func, insert, tuple_
+from app.models import db, Request, Visitor
+from app.utils.helpers import generate_unique_secure_codes
+import pandas as pd
+import secrets
+
+# Request field -> sheet header (headers are matched case-insensitively)
+COLUMNS = {
+    "name": "Name",
+    "email": "Email",
+    "number": "Phone",
+    "purpose": "Purpose",
+    "destination": "Destination",
+    "address": "Address",
+}
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+
+def read_sheet(file, ext):
+    """Reads every cell as text so phone numbers keep their leading zeros."""
+    if ext == "csv":
+        return pd.read_csv(file, dtype=str, keep_default_na=False)
+    return pd.read_excel(file, dtype=str, keep_default_na=False)
+
+
+def _normalize(df):
+    headers = {str(c).strip().lower(): c for c in df.columns}
+    rows = pd.DataFrame(index=df.index)
+    for field, header in COLUMNS.items():
+        source = headers.get(header.lower())
+        if source is None:
+            rows[field] = ""
+        else:
+            rows[field] = df[source].fillna("").astype(str).str.strip()
+
+    rows["name"] = rows["name"].str.split().str.join(" ")
+    rows["number"] = rows["number"].str.replace(r"\.0$", "", regex=True)  # numeric Excel cells
+    rows["email"] = rows["email"].str.lower()
+    rows["row"] = df.index + 2  # spreadsheet row number (header is row 1)
+    # rows that are blank all the way across are just ignored
+    return rows[(rows[list(COLUMNS)] != "").any(axis=1)]
+
+
+def _validate(rows):
+    """Returns a Series with the first problem of every row ('' when the row is valid)."""
+    errors = pd.Series("", index=rows.index)
+
+    def flag(mask, message):
+        errors[mask & (errors == "")] = message
+
+    flag(rows["name"] == "", "missing name")
+    flag((rows["email"] != "") & ~rows["email"].str.match(EMAIL_PATTERN), "invalid email")
+    for field, header in COLUMNS.items():
+        limit = Request.__table__.c[field].type.length
+        flag(rows[field].str.len() > limit, f"{header} is longer than {limit} characters")
+
+    # same person twice in the sheet: keep the first occurrence
+    key = [rows["name"].str.casefold(), rows["number"]]
+    first_row = rows.groupby(key)["row"].transform("first")
+    flag(first_row != rows["row"], "duplicate of row " + first_row.astype(str))
+    return errors
+
+
+def _match_visitors(rows):
+    """
+    Matches rows to existing visitors by name (case-insensitive) + number in one
+    query and gives matched rows the visitor's stored spelling of the name: scans
+    link a request to its Visitor on the exact (name, number), so "juan dela cruz"
+    would otherwise become a second Visitor next to "Juan Dela Cruz".
+    Nothing else is taken from the visitor (email etc. stay as uploaded).
+    Returns the spreadsheet row numbers of the returning visitors.
+    """
+    pairs = list(set(zip(rows["name"].str.lower(), rows["number"])))
+    if not pairs:
+        return []
+    known = pd.DataFrame(
+        db.session.query(func.lower(Visitor.name), Visitor.number, Visitor.name)
+        .filter(tuple_(func.lower(Visitor.name), Visitor.number).in_(pairs))
+        .order_by(Visitor.id).all(),
+        columns=["key", "number", "visitor_name"],
+    ).drop_duplicates(["key", "number"])
+    if known.empty:
+        return []
+
+    merged = rows[["number"]].assign(key=rows["name"].str.lower()) \
+        .merge(known, on=["key", "number"], how="left").set_index(rows.index)
+    matched = merged["visitor_name"].notna()
+    rows.loc[matched, "name"] = merged.loc[matched, "visitor_name"]
+    return rows.loc[matched, "row"].astype(int).tolist()
+
+
+def import_requests(df):
+    """
+    Turns an uploaded sheet into approved group requests with set-based work:
+    pandas normalization/validation, one query against Visitor, one IN query
+    per round of code allocation and one bulk INSERT.
+    The caller commits.
+
+    Returns (created_requests, errors, returning_rows) where errors is a list
+    of (row_number, message) for the rows that were skipped and returning_rows
+    the row numbers matched to an existing visitor.
+    """
+    rows = _normalize(df)
+    error_by_row = _validate(rows)
+    errors = [(int(rows.at[i, "row"]), message) for i, message in error_by_row.items() if message]
+    valid = rows[error_by_row == ""].copy()
+    if valid.empty:
+        return [], errors, []
+
+    returning = _match_visitors(valid)
+    valid["destination"] = valid["destination"].mask(valid["destination"] == "", "General")
+    valid["unique_code"] = generate_unique_secure_codes(len(valid))
+
+    now = datetime.utcnow()
+    group_code = secrets.token_urlsafe(12)
+    values = [
+        dict(record, status="Approve", timestamp=now, group_code=group_code)
+        for record in valid[list(COLUMNS) + ["unique_code"]].to_dict("records")
+    ]
+
+    # One INSERT statement for the whole sheet; SQLAlchemy's insertmanyvalues sends it as
+    # multi-row VALUES batches, and unlike a literal .values([...]) its compiled form is cached.
+    created = db.session.scalars(
+        insert(Request).returning(Request, sort_by_parameter_order=True), values
+    ).all()
+    return created, errors, returning
@@ -0,0 +1,94 @@
+from sqlalchemy import func, extract
+from app.models import db, VisitSession
+from app.utils.helpers import in_manila_days
+
+# Visit duration statistics for the analytics page, computed in SQL over the
+# visit_session table. The payload has the same size whatever the range:
+# a fixed set of histogram buckets, three percentiles, at most MAX_DESTINATIONS
+# destination means and at most ~MAX_MEDIAN_POINTS median points.
+
+BUCKET_MINUTES = 5
+MAX_BUCKET_MINUTES = 240  # longer visits share one "240+ min" bucket
+PERCENTILES = (0.5, 0.9, 0.99)
+MAX_DESTINATIONS = 20
+MAX_MEDIAN_POINTS = 92
+
+
+def _minutes():
+    return extract("epoch", VisitSession.check_out_time - VisitSession.check_in_time) / 60
+
+
+def _completed(start=None, end=None):
+    """Completed visits (checked in and out) that started in the Manila days [start, end]."""
+    query = db.session.query().select_from(VisitSession).filter(VisitSession.check_out_time.isnot(None))
+    if start and end:
+        query = query.filter(in_manila_days(VisitSession.check_in_time, start, end))
+    return query
+
+
+def _median_interval(start, end):
+    """Coarsest date_trunc unit that keeps the medians series within MAX_MEDIAN_POINTS."""
+    if start and end:
+        days = (end - start).days + 1
+        if days <= MAX_MEDIAN_POINTS:
+            return "day"
+        if days <= MAX_MEDIAN_POINTS * 7:
+            return "week"
+    return "month"
+
+
+def _histogram(minutes, start, end):
+    bucket_count = MAX_BUCKET_MINUTES // BUCKET_MINUTES
+    # 1..bucket_count for 0..240 min, bucket_count + 1 for the overflow bucket
+    bucket = func.width_bucket(minutes, 0, MAX_BUCKET_MINUTES, bucket_count)
+    counts = dict(_completed(start, end).add_columns(bucket.label("bucket"), func.count())
+                  .group_by(bucket).all())
+
+    buckets = []
+    for i in range(1, bucket_count + 2):
+        low = (i - 1) * BUCKET_MINUTES
+        label = f"{low}-{low + BUCKET_MINUTES} min" if i <= bucket_count else f"{MAX_BUCKET_MINUTES}+ min"
+        # negative durations (clock skew) fall in bucket 0; count them with the first bucket
+        count = counts.get(i, 0) + (counts.get(0, 0) if i == 1 else 0)
+        buckets.append({"label": label, "min": low, "count": count})
+    return buckets
+
+
+def duration_stats(start=None, end=None):
+    """Histogram, percentiles, mean per destination and median per day/week/month of visit durations."""
+    minutes = _minutes()
+
+    summary = _completed(start, end).add_columns(
+        func.count().label("count"),
+        func.avg(minutes).label("mean"),
+        *[func.percentile_cont(p).within_group(minutes) for p in PERCENTILES],
+    ).one()
+
+    destination = func.coalesce(VisitSession.destination, "General")
+    by_destination = _completed(start, end).add_columns(
+        destination.label("destination"), func.count().label("count"), func.avg(minutes).label("mean")
+    ).group_by(destination).order_by(func.count().desc()).limit(MAX_DESTINATIONS).all()
+
+    interval = _median_interval(start, end)
+    period = func.date_trunc(interval, func.timezone("Asia/Manila", VisitSession.check_in_time))
+    medians = _completed(start, end).add_columns(
+        period.label("period"),
+        func.percentile_cont(0.5).within_group(minutes).label("median"),
+    ).group_by(period).order_by(period).all()
+
+    return {
+        "count": summary.count,
+        "mean_minutes": _round(summary.mean),
+        "percentiles": {f"p{round(p * 100)}": _round(v) for p, v in zip(PERCENTILES, summary[2:])},
+        "histogram": _histogram(minutes, start, end),
+        "by_destination": [
+            {"destination": r.destination, "count": r.count, "mean_minutes": _round(r.mean)}
+            for r in by_destination
+        ],
+        "median_interval": interval,
+        "medians": [{"date": r.period.date().isoformat(), "median_minutes": _round(r.median)} for r in medians],
+    }
+
+
+def _round(value):
+    return round(float(value), 2) if value is not None else None
@@ -0,0 +1,139 @@
+from datetime import datetime
+from sqlalchemy import insert, update, tuple_
+from app.models import db, Visitor, VisitorLog, Request
+from app.utils.scan_resolver import SCANNABLE_STATUSES
+from app.utils.presence import find_open_visits, is_checked_in_today, record_logs
+import uuid
+
+
+def _load_visitors(members):
+    """Finds or creates the permanent Visitor of every member with set-based queries."""
+    # name + number identifies a visitor (same rule as _find_or_create_visitor);
+    # when a pair repeats inside a group the last member's code wins.
+    by_pair = {(m.name, m.number): m for m in members}
+
+    visitors = {}
+    existing = Visitor.query.filter(tuple_(Visitor.name, Visitor.number).in_(list(by_pair))).all()
+    for v in existing:
+        visitors[(v.name, v.number)] = v
+
+    stale_codes = [
+        {"id": v.id, "qr_code": by_pair[pair].unique_code}
+        for pair, v in visitors.items() if v.qr_code != by_pair[pair].unique_code
+    ]
+    if stale_codes:
+        db.session.execute(update(Visitor), stale_codes)
+
+    missing = [m for pair, m in by_pair.items() if pair not in visitors]
+    if missing:
+        created = db.session.scalars(
+            insert(Visitor).returning(Visitor, sort_by_parameter_order=True),
+            [{
+                "name": m.name,
+                "email": m.email,
+                "number": m.number,
+                "qr_code": m.unique_code,
+                "last_purpose": m.purpose,
+                "last_destination": m.destination or "General",
+                "last_address": m.address,
+            } for m in missing]
+        ).all()
+        for v in created:
+            visitors[(v.name, v.number)] = v
+
+    return {m.id: visitors[(m.name, m.number)] for m in members}
+
+
+def process_group_scan(group_code, user, members=None):
+    """
+    Checks a whole group in or out in a handful of set-based statements:
+    one query for the members (skipped when the resolver already returned them),
+    one for their visitors (plus one bulk insert for new ones), one for their
+    open visits, one bulk insert for the new logs, one statement to update the
+    presence table and a single commit.
+
+    If any member is currently checked in, the scan checks out the members who
+    are in; otherwise every member is checked in.
+    Returns (results, session_ids): "<name>: <action>" strings and the
+    visit_session_ids that were opened or closed.
+    """
+    if members is None:
+        members = Request.query.filter(
+            Request.group_code == group_code, Request.status.in_(SCANNABLE_STATUSES)
+        ).all()
+    if not members:
+        return [], []
+
+    visitor_by_member = _load_visitors(members)
+    open_visits = find_open_visits([v.id for v in visitor_by_member.values()])
+
+    checked_in = {
+        v.id for v in visitor_by_member.values()
+        if is_checked_in_today(open_visits.get(v.id))
+    }
+
+    now = datetime.utcnow()
+    new_logs = []
+    results = []
+    seen = set()
+    for m in members:
+        v = visitor_by_member[m.id]
+        if v.id in seen:
+            continue
+        seen.add(v.id)
+
+        if checked_in:
+            if v.id not in checked_in:
+                results.append(f"{v.name}: Not checked in")
+                continue
+            visit = open_visits[v.id]
+            new_logs.append({
+                "visitor_id": v.id,
+                "name": v.name,
+                "email": v.email,
+                "number": v.number,
+                "purpose": visit.purpose,
+                "destination": visit.destination or v.last_destination,
+                "address": visit.address,
+                "status": "Checked-Out",
+                "unique_code": m.unique_code,
+                "visit_session_id": visit.id,
+                "timestamp": now,
+                "check_out_by_id": user.id,
+                "check_out_gate": user.gate_role,
+                "approved_by_id": visit.approved_by_id,
+            })
+            results.append(f"{v.name}: Checked-Out")
+        else:
+            new_logs.append({
+                "visitor_id": v.id,
+                "name": v.name,
+                "email": v.email,
+                "number": v.number,
+                "purpose": v.last_purpose,
+                "destination": v.last_destination,
+                "address": v.last_address,
+                "status": "Checked-In",
+                "unique_code": m.unique_code,
+                "visit_session_id": str(uuid.uuid4()),
+                "timestamp": now,
+                "check_in_by_id": user.id,
+                "check_in_gate": user.gate_role,
+                "approved_by_id": m.approved_by_id or user.id,
+            })
+            results.append(f"{v.name}: Checked-In")
+
+    if new_logs:
+        db.session.execute(insert(VisitorLog), new_logs)
+        record_logs(new_logs)
+
+    if not checked_in:
+        db.session.execute(
+            update(Request)
+            .where(Request.id.in_([m.id for m in members]))
+            .values(status="Completed")
+            .execution_options(synchronize_session=False)
+        )
+
+    db.session.commit()
+    return results, [log["visit_session_id"] for log in new_logs]
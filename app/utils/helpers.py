@@ -1,22 +1,55 @@
-import string
-import secrets
-from app.models import Request
+from app.models import db, VisitorLog
+from app.utils.code_allocator import allocate_code, allocate_codes
 from functools import wraps
 from flask import session, redirect, url_for, flash
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func
 import pytz
 
 def generate_unique_secure_code(length=8):
-    characters = string.ascii_uppercase + string.digits
-    while True:
-        code = ''.join(secrets.choice(characters) for _ in range(length))
-        if not Request.query.filter_by(unique_code=code).first():
-            return code
+    return allocate_code(length)
+
+def generate_unique_secure_codes(count, length=8):
+    """Bulk version of generate_unique_secure_code (one IN query for the whole batch)."""
+    return allocate_codes(count, length)
 
 def get_current_time():
     manila_tz = pytz.timezone('Asia/Manila')
     return datetime.now(manila_tz)
 
+def manila_day_bounds(start_date, end_date=None):
+    """
+    Turns Manila calendar dates into a half-open UTC range [start_utc, end_utc).
+    end_date is inclusive and defaults to start_date (a single day).
+    """
+    manila_tz = pytz.timezone('Asia/Manila')
+    end_date = end_date or start_date
+    start_manila = manila_tz.localize(datetime.combine(start_date, datetime.min.time()))
+    end_manila = manila_tz.localize(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    return start_manila.astimezone(pytz.utc), end_manila.astimezone(pytz.utc)
+
+def in_manila_days(column, start_date, end_date=None):
+    """
+    Sargable replacement for func.date(func.timezone('Asia/Manila', column)) == day:
+    compares the raw column against UTC bounds so an index on it can be used.
+    Works on plain columns and on aggregates such as func.max(column) in HAVING.
+    """
+    start_utc, end_utc = manila_day_bounds(start_date, end_date)
+    return and_(column >= start_utc, column < end_utc)
+
+def filter_sessions_by_day(query, day):
+    """
+    Limits a per-visit VisitorLog query (grouped by visit_session_id) to visits
+    whose latest log falls on `day`. The WHERE narrows to visits with any log on
+    that day through the timestamp index; the HAVING keeps the exact rule.
+    """
+    sessions_on_day = db.session.query(VisitorLog.visit_session_id).filter(
+        in_manila_days(VisitorLog.timestamp, day)
+    )
+    return query.filter(
+        VisitorLog.visit_session_id.in_(sessions_on_day)
+    ).having(in_manila_days(func.max(VisitorLog.timestamp), day))
+
 def convert_to_ph_time(dt):
     if dt is None:
         return "N/A"
@@ -0,0 +1,144 @@
+import base64
+import json
+import math
+from datetime import datetime
+from flask import request, session
+from sqlalchemy import func, select, tuple_
+from app.models import db
+
+# Keyset ("cursor") pagination for the Logs and Request pages. A page is found
+# by seeking the (sort values..., id) index past the last row of the previous
+# page, so page 500 costs the same as page 1 and no COUNT over the whole result runs.
+
+PER_PAGE_CHOICES = (10, 25, 50, 100)
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = PER_PAGE_CHOICES[-1]
+# Below this estimate the total is counted exactly (cheap); above it the planner's estimate is shown
+EXACT_COUNT_LIMIT = 1000
+
+
+def page_size():
+    """per_page from the query string, remembered in the session, capped at MAX_PER_PAGE."""
+    requested = request.args.get("per_page", type=int)
+    if requested:
+        session['per_page'] = requested
+    per_page = session.get('per_page', DEFAULT_PER_PAGE)
+    return max(1, min(int(per_page), MAX_PER_PAGE))
+
+
+def encode_cursor(values):
+    raw = json.dumps([{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    """The key values stored in a cursor, or None when it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != size:
+            return None
+        return [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in values]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def approximate_count(query):
+    """
+    Row count of `query`: the planner's estimate (EXPLAIN, nothing is scanned),
+    replaced by an exact COUNT when the estimate is small. Returns (count, exact).
+    """
+    statement = query.statement
+    compiled = statement.compile(dialect=db.session.get_bind().dialect)
+    plan = db.session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate > EXACT_COUNT_LIMIT:
+        return estimate, False
+    return db.session.scalar(select(func.count()).select_from(statement.subquery())), True
+
+
+class KeysetPage:
+    """One page of rows plus the cursors and numbers the pagination bar needs."""
+
+    def __init__(self, items, keys, per_page, page, has_prev, has_next, total, exact):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.total = total
+        self.total_is_exact = exact
+        self.prev_cursor = encode_cursor(keys[0]) if keys and has_prev else None
+        self.next_cursor = encode_cursor(keys[-1]) if keys and has_next else None
+
+    @property
+    def pages(self):
+        """Number of pages, or None when the total wasn't asked for."""
+        if self.total is None:
+            return None
+        return max(1, math.ceil(self.total / self.per_page), self.page)
+
+    @property
+    def offset(self):
+        """Number of rows before this page (for the # column)."""
+        return self.per_page * (self.page - 1)
+
+    @property
+    def is_first(self):
+        return not self.has_prev
+
+
+def keyset_paginate(query, columns, key, per_page, with_total=False):
+    """
+    Page of `query` ordered by `columns` descending (the last one must be unique,
+    e.g. the id), driven by the request args: `after` / `before` cursors, `last=1`
+    for the final page, and `page` only for display. `key(row)` returns the row's
+    values for `columns`.
+
+    A page costs one keyset seek. The total (approximate_count: an EXPLAIN, plus
+    a COUNT when small) is only worked out with `with_total=True` and for the
+    last page, which needs it to line up with forward paging and to know its number.
+    """
+    after = decode_cursor(request.args.get("after"), len(columns))
+    before = None if after else decode_cursor(request.args.get("before"), len(columns))
+    last = not (after or before) and request.args.get("last") == "1"
+    page = max(1, request.args.get("page", 1, type=int))
+
+    total, exact = approximate_count(query) if with_total or last else (None, False)
+
+    position = tuple_(*columns)
+    if before or last:
+        # walk backwards (oldest first) and flip the rows afterwards
+        if before:
+            query = query.filter(position > tuple_(*before))
+        query = query.order_by(*[c.asc() for c in columns])
+    else:
+        if after:
+            query = query.filter(position < tuple_(*after))
+        query = query.order_by(*[c.desc() for c in columns])
+
+    limit = per_page
+    if last and exact and total:
+        limit = total - (math.ceil(total / per_page) - 1) * per_page  # same rows as paging forward
+    rows = query.limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    if before or last:
+        rows.reverse()
+        has_prev, has_next = more, not last
+        if last:
+            page = max(1, math.ceil(total / per_page))
+        elif not has_prev:
+            page = 1
+    else:
+        has_prev, has_next = bool(after), more
+        if not after:
+            page = 1
+
+    return KeysetPage(rows, [key(row) for row in rows], per_page, page, has_prev, has_next, total, exact)
@@ -0,0 +1,140 @@
+from sqlalchemy import insert, update, select, func
+from app.models import db, VisitSession
+from app.utils.helpers import get_current_time
+from app.analytics_rollup import record_checkins
+from app.analytics_cache import analytics_cache
+import pytz
+
+# Helpers that keep the visit_session table in step with VisitorLog.
+# Every place that writes a Checked-In log opens a session, every Checked-Out
+# log closes one, and check-ins are added to the analytics rollups.
+# They only stage statements; the caller commits.
+
+
+def _session_values(log):
+    return {
+        "id": log["visit_session_id"],
+        "visitor_id": log.get("visitor_id"),
+        "unique_code": log.get("unique_code"),
+        "name": log["name"],
+        "purpose": log.get("purpose"),
+        "destination": log.get("destination"),
+        "address": log.get("address"),
+        "approved_by_id": log.get("approved_by_id"),
+        "check_in_time": log["timestamp"],
+        "check_in_gate": log.get("check_in_gate"),
+    }
+
+
+def _log_values(log):
+    if isinstance(log, dict):
+        return log
+    # generated columns (search_text) are skipped: reading them would reload the row
+    return {c.name: getattr(log, c.key) for c in log.__table__.columns if c.computed is None}
+
+
+def record_logs(logs):
+    """
+    Applies a batch of new VisitorLog rows (model objects or dicts) to the
+    presence table: one INSERT for check-ins, one UPDATE per check-out time.
+    Check-ins are also counted into the analytics rollups.
+    """
+    if logs:
+        analytics_cache.mark_changed()  # cached analytics are dropped once this commits
+    checkins = []
+    closed = []
+    for log in logs:
+        values = _log_values(log)
+        if values["status"] == "Checked-In":
+            checkins.append(values)
+        else:
+            closed.append(values)
+
+    if checkins:
+        db.session.execute(insert(VisitSession), [_session_values(values) for values in checkins])
+        record_checkins(checkins)
+
+    # A batch of check-outs shares the same timestamp and gate, so it collapses into one UPDATE
+    by_stamp = {}
+    for values in closed:
+        key = (values["timestamp"], values.get("check_out_gate"))
+        by_stamp.setdefault(key, []).append(values["visit_session_id"])
+    for (timestamp, gate), session_ids in by_stamp.items():
+        db.session.execute(
+            update(VisitSession)
+            .where(VisitSession.id.in_(session_ids), VisitSession.check_out_time.is_(None))
+            .values(check_out_time=timestamp, check_out_gate=gate)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def record_log(log):
+    """Single-log shortcut for record_logs."""
+    record_logs([log])
+
+
+def is_checked_in_today(visit):
+    """True when `visit` is an open VisitSession that started today (Manila time)."""
+    if visit is None or visit.check_out_time is not None or visit.check_in_time is None:
+        return False
+    manila_tz = pytz.timezone('Asia/Manila')
+    return visit.check_in_time.astimezone(manila_tz).date() == get_current_time().date()
+
+
+def _open_query():
+    return VisitSession.query.filter(VisitSession.check_out_time.is_(None))
+
+
+def find_open_visit(visitor_id=None, unique_code=None):
+    """Latest open visit of a visitor (or of a unique code), or None."""
+    query = _open_query()
+    if visitor_id is not None:
+        query = query.filter(VisitSession.visitor_id == visitor_id)
+    if unique_code is not None:
+        query = query.filter(VisitSession.unique_code == unique_code)
+    return query.order_by(VisitSession.check_in_time.desc()).first()
+
+
+def find_open_visits(visitor_ids):
+    """Latest open visit per visitor for a batch of visitors, in one query."""
+    if not visitor_ids:
+        return {}
+    visits = _open_query().filter(
+        VisitSession.visitor_id.in_(visitor_ids)
+    ).order_by(VisitSession.check_in_time).all()
+    # ordered oldest first, so the latest visit per visitor wins
+    return {v.visitor_id: v for v in visits}
+
+
+def open_codes(unique_codes, start_utc=None):
+    """Subset of `unique_codes` that currently have an open visit."""
+    if not unique_codes:
+        return set()
+    query = db.session.query(VisitSession.unique_code).filter(
+        VisitSession.check_out_time.is_(None),
+        VisitSession.unique_code.in_(unique_codes)
+    )
+    if start_utc is not None:
+        query = query.filter(VisitSession.check_in_time >= start_utc)
+    return {row.unique_code for row in query.distinct()}
+
+
+def count_checked_in(start_utc, end_utc):
+    """Number of visits opened in [start_utc, end_utc) that are still open."""
+    return db.session.scalar(
+        select(func.count()).select_from(VisitSession).where(
+            VisitSession.check_out_time.is_(None),
+            VisitSession.check_in_time >= start_utc,
+            VisitSession.check_in_time < end_utc
+        )
+    )
+
+
+def count_visits(start_utc, end_utc):
+    """Number of visits that started in [start_utc, end_utc)."""
+    return db.session.scalar(
+        select(func.count()).select_from(VisitSession).where(
+            VisitSession.check_in_time >= start_utc,
+            VisitSession.check_in_time < end_utc
+        )
+    )
@@ -1,5 +1,5 @@
 import cv2
-import qrcode
+from app.utils.qr_render import render_qr_png
 
 def decode_qr(file_path):
     img = cv2.imread(file_path)
@@ -10,5 +10,5 @@ def decode_qr(file_path):
     return None
 
 def generate_qr_code(data, filename):
-    img = qrcode.make(data)
-    img.save(filename)
\ No newline at end of file
+    with open(filename, "wb") as f:
+        f.write(render_qr_png(data))
\ No newline at end of file
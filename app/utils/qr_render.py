@@ -0,0 +1,107 @@
+from functools import lru_cache
+from io import BytesIO
+import base64
+import hashlib
+import os
+import qrcode
+from flask import current_app, has_app_context
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+# Rendering presets. Version is picked by fit (8-char codes land on version 1-2);
+# the mask is left to qrcode because fixed masks decode less reliably with cv2.
+# box_size 8 + compress_level 6 gives ~300 byte PNGs vs ~450 for qrcode.make().
+QR_STYLES = {
+    "email": {"box_size": 8, "border": 4, "error_correction": qrcode.constants.ERROR_CORRECT_M,
+              "compress_level": 6, "cache": True},
+    # TOTP provisioning URIs contain the shared secret: never cached
+    "totp": {"box_size": 6, "border": 4, "error_correction": qrcode.constants.ERROR_CORRECT_M,
+             "compress_level": 6, "cache": False},
+}
+
+
+def _render(data, style):
+    opts = QR_STYLES[style]
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=opts["error_correction"],
+        box_size=opts["box_size"],
+        border=opts["border"],
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    buf = BytesIO()
+    qr.make_image().save(buf, format="PNG", compress_level=opts["compress_level"])
+    return buf.getvalue()
+
+
+def _disk_cache_dir():
+    if has_app_context():
+        return current_app.config.get('QR_CACHE_DIR')
+    return os.getenv('QR_CACHE_DIR')
+
+
+def _disk_path(directory, data, style):
+    digest = hashlib.sha256(f"{style}:{data}".encode("utf-8")).hexdigest()
+    return os.path.join(directory, digest[:2], f"{digest}.png")
+
+
+@lru_cache(maxsize=1024)
+def _render_cached(data, style, directory):
+    if directory:
+        path = _disk_path(directory, data, style)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+        png = _render(data, style)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, path)  # atomic, safe with several workers
+        except OSError as e:
+            print(f"QR disk cache write failed: {e}")
+        return png
+    return _render(data, style)
+
+
+def render_qr_png(data, style="email"):
+    """
+    PNG bytes for `data`. Cached in an in-process LRU (and on disk when
+    QR_CACHE_DIR is set) keyed by data + style, so resends and the shared
+    group QR are rendered once.
+    """
+    if not QR_STYLES[style]["cache"]:
+        return _render(data, style)
+    return _render_cached(data, style, _disk_cache_dir())
+
+
+def render_qr_base64(data, style="email"):
+    return base64.b64encode(render_qr_png(data, style)).decode("utf-8")
+
+
+# Signed tokens for the public QR image route (/qr/<token>.png), used where an email
+# can't attach each recipient's QR (Brevo batch sends). Signed so the route only
+# renders codes the app issued, and valid for QR_LINK_MAX_AGE seconds only: the
+# image is the visitor's check-in credential, so old emails must not keep serving it.
+
+def _qr_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt="qr-image")
+
+
+def qr_image_token(code):
+    return _qr_serializer().dumps(code)
+
+
+def code_from_qr_token(token):
+    """The code signed into `token`, or None if the token is not valid or has expired."""
+    try:
+        return _qr_serializer().loads(token, max_age=current_app.config['QR_LINK_MAX_AGE'])
+    except BadSignature:  # SignatureExpired included
+        return None
+
+
+def qr_cache_info():
+    return _render_cached.cache_info()._asdict()
@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from sqlalchemy import select, literal, null, cast, true, union_all, Integer, String
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from app.models import db, Visitor, Request, VisitSession
+from app.utils.presence import is_checked_in_today
+
+# Request statuses that can still be scanned at the gate
+SCANNABLE_STATUSES = ("Approve", "Completed")
+
+
+@dataclass
+class ResolvedCode:
+    """
+    Result of classifying a scanned code.
+    kind is one of "visitor", "request", "group" or None (not recognized).
+    visitor / request hold the matching row, open_visit the visitor's latest
+    open VisitSession (or None), and members every request row of a group.
+    """
+    kind: str = None
+    visitor: object = None
+    open_visit: object = None
+    request: object = None
+    members: list = field(default_factory=list)
+
+    @property
+    def checked_in_today(self):
+        return is_checked_in_today(self.open_visit)
+
+
+class _Row:
+    """Lightweight attribute bag so resolved rows can stand in for model objects."""
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def _null(type_):
+    return cast(null(), type_)
+
+
+def _build_resolve_query(code):
+    # Latest open visit per visitor, picked from the partial "open visits" index
+    open_visit = select(
+        VisitSession.id,
+        VisitSession.check_in_time,
+        VisitSession.purpose,
+        VisitSession.destination,
+        VisitSession.address,
+        VisitSession.approved_by_id,
+    ).where(
+        VisitSession.visitor_id == Visitor.id,
+        VisitSession.check_out_time.is_(None)
+    ).order_by(VisitSession.check_in_time.desc()).limit(1).lateral("open_visit")
+
+    visitor_branch = select(
+        literal("visitor").label("kind"),
+        literal(0).label("priority"),
+        Visitor.id.label("visitor_id"),
+        _null(Integer).label("request_id"),
+        Visitor.name,
+        Visitor.email,
+        Visitor.number,
+        Visitor.qr_code.label("code"),
+        Visitor.last_purpose.label("purpose"),
+        Visitor.last_destination.label("destination"),
+        Visitor.last_address.label("address"),
+        _null(Integer).label("approved_by_id"),
+        open_visit.c.id.label("visit_id"),
+        open_visit.c.check_in_time.label("visit_check_in_time"),
+        open_visit.c.purpose.label("visit_purpose"),
+        open_visit.c.destination.label("visit_destination"),
+        open_visit.c.address.label("visit_address"),
+        open_visit.c.approved_by_id.label("visit_approved_by_id"),
+    ).select_from(Visitor).outerjoin(open_visit, true()).where(Visitor.qr_code == code)
+
+    def request_branch(kind, priority, predicate):
+        return select(
+            literal(kind).label("kind"),
+            literal(priority).label("priority"),
+            _null(Integer).label("visitor_id"),
+            Request.id.label("request_id"),
+            Request.name,
+            Request.email,
+            Request.number,
+            Request.unique_code.label("code"),
+            Request.purpose,
+            Request.destination,
+            Request.address,
+            Request.approved_by_id,
+            _null(String).label("visit_id"),
+            _null(TIMESTAMP(timezone=True)).label("visit_check_in_time"),
+            _null(String).label("visit_purpose"),
+            _null(String).label("visit_destination"),
+            _null(String).label("visit_address"),
+            _null(Integer).label("visit_approved_by_id"),
+        ).where(predicate, Request.status.in_(SCANNABLE_STATUSES))
+
+    query = union_all(
+        visitor_branch,
+        request_branch("request", 1, Request.unique_code == code),
+        request_branch("group", 2, Request.group_code == code),
+    ).subquery()
+    return select(query).order_by(query.c.priority, query.c.request_id)
+
+
+def resolve_scan_code(code):
+    """
+    Classifies a scanned code as a permanent visitor, a single request or a
+    group code in ONE round trip. The visitor branch also carries the open
+    visit, so the gate knows the current check-in state without a second query.
+    Precedence matches the old sequential lookups: visitor, request, group.
+    """
+    rows = db.session.execute(_build_resolve_query(code)).all()
+    if not rows:
+        return ResolvedCode()
+
+    first = rows[0]
+    if first.kind == "visitor":
+        visitor = _Row(
+            id=first.visitor_id, name=first.name, email=first.email, number=first.number,
+            qr_code=first.code, last_purpose=first.purpose,
+            last_destination=first.destination, last_address=first.address
+        )
+        open_visit = None
+        if first.visit_id is not None:
+            open_visit = _Row(
+                id=first.visit_id, check_in_time=first.visit_check_in_time, check_out_time=None,
+                purpose=first.visit_purpose, destination=first.visit_destination,
+                address=first.visit_address, approved_by_id=first.visit_approved_by_id
+            )
+        return ResolvedCode(kind="visitor", visitor=visitor, open_visit=open_visit)
+
+    def as_request(row):
+        return _Row(
+            id=row.request_id, name=row.name, email=row.email, number=row.number,
+            unique_code=row.code, purpose=row.purpose, destination=row.destination,
+            address=row.address, approved_by_id=row.approved_by_id
+        )
+
+    if first.kind == "request":
+        return ResolvedCode(kind="request", request=as_request(first))
+
+    return ResolvedCode(kind="group", members=[as_request(r) for r in rows if r.kind == "group"])
@@ -0,0 +1,79 @@
+import re
+from sqlalchemy import case, func, text
+from app.models import db
+
+# Indexed search over visitor logs and requests.
+#
+# Both tables carry a generated `search_text` column: lower-cased name, email and
+# codes plus the phone number reduced to digits (see search_text_sql in models).
+# Where the pg_trgm extension is installed, migration e9b14f7a2c38 adds a
+# trigram GIN index on it and searches are substring matches ("ela cr" finds
+# "Juan Dela Cruz"). Everywhere else the always-present full-text GIN index is
+# used instead and every word of the query matches a word prefix ("juan cr").
+
+PHONE_QUERY = re.compile(r"[\d\s()+.-]+")
+EMAIL_SEPARATORS = str.maketrans("@.", "  ")
+SIMPLE_CONFIG = text("'simple'::regconfig")
+_trigram_tables = {}  # engine url -> set of tables with a trigram search index
+
+
+def normalize_query(query):
+    """Lower-cases a search, reduces phone-number-like input to its digits and splits emails."""
+    query = " ".join(query.strip().lower().split())
+    if PHONE_QUERY.fullmatch(query) and any(ch.isdigit() for ch in query):
+        return re.sub(r"\D", "", query)
+    # emails are stored split at "@" and "."
+    return " ".join(query.translate(EMAIL_SEPARATORS).split())
+
+
+def trigram_indexed(table_name):
+    """True when `table_name` has the trigram search index (checked once per process)."""
+    url = str(db.engine.url)
+    if url not in _trigram_tables:
+        _trigram_tables[url] = set(db.session.execute(text(
+            "SELECT tablename FROM pg_indexes WHERE indexname LIKE 'ix_%_search_trgm'"
+        )).scalars())
+    return table_name in _trigram_tables[url]
+
+
+def search_vector(search_column):
+    # must match the expression of the ix_*_search_fts indexes exactly
+    return func.to_tsvector(SIMPLE_CONFIG, search_column)
+
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_query(term):
+    # every word as a quoted prefix lexeme: 'juan':* & 'cr':*
+    words = [w.replace("'", "''").replace("\\", "") for w in term.split()]
+    return " & ".join(f"'{w}':*" for w in words if w)
+
+
+def search_condition(search_column, query):
+    """WHERE clause matching `query` against a search_text column, using whichever index exists."""
+    term = normalize_query(query)
+    if trigram_indexed(search_column.table.name):
+        return search_column.like(f"%{_escape_like(term)}%", escape="\\")
+    return search_vector(search_column).op("@@")(
+        func.to_tsquery(SIMPLE_CONFIG, _prefix_query(term))
+    )
+
+
+def match_rank(query, name_column, *code_columns):
+    """
+    Relevance tier for ordering search results: 3 for an exact code or full-name
+    match, 2 when the name starts with the query, 1 when one of its later words
+    does, 0 for any other match (e.g. inside an email or phone number).
+    """
+    term = normalize_query(query)
+    name = func.lower(name_column)
+    pattern = _escape_like(term)
+    exact = [func.lower(column) == term for column in (name_column, *code_columns)]
+    return case(
+        *[(condition, 3) for condition in exact],
+        (name.like(f"{pattern}%", escape="\\"), 2),
+        (name.like(f"% {pattern}%", escape="\\"), 1),
+        else_=0,
+    )
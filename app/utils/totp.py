@@ -1,7 +1,5 @@
 import pyotp
-import qrcode
-from io import BytesIO
-import base64
+from app.utils.qr_render import render_qr_base64
 
 def generate_totp_secret():
     return pyotp.random_base32()
@@ -14,8 +12,5 @@ def verify_totp(token, secret):
     return totp.verify(token)
 
 def generate_qr_code_base64(uri):
-    qr = qrcode.make(uri)
-    buf = BytesIO()
-    qr.save(buf, format='PNG')
-    img_bytes = buf.getvalue()
-    return base64.b64encode(img_bytes).decode('utf-8')
\ No newline at end of file
+    # "totp" style is never cached: the URI carries the TOTP secret
+    return render_qr_base64(uri, style="totp")
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""Add composite and partial indexes for hot VisitorLog / Request queries
+
+Revision ID: 3f1c7a9b2e64
+Revises: 9d2263445037
+Create Date: 2026-10-18 10:02:17.540981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c7a9b2e64'
+down_revision = '9d2263445037'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('visitor_log', schema=None) as batch_op:
+        batch_op.create_index('ix_visitor_log_visitor_id_timestamp', ['visitor_id', sa.text('timestamp DESC')], unique=False)
+        batch_op.create_index('ix_visitor_log_session_timestamp', ['visit_session_id', 'timestamp'], unique=False)
+        batch_op.create_index('ix_visitor_log_unique_code_timestamp', ['unique_code', sa.text('timestamp DESC')], unique=False)
+        batch_op.create_index('ix_visitor_log_timestamp', ['timestamp'], unique=False)
+        batch_op.create_index('ix_visitor_log_checkin_timestamp', ['timestamp', 'destination'], unique=False,
+                              postgresql_where=sa.text("status = 'Checked-In'"))
+
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.create_index('ix_request_timestamp', [sa.text('timestamp DESC')], unique=False)
+        batch_op.create_index('ix_request_group_code', ['group_code'], unique=False,
+                              postgresql_where=sa.text('group_code IS NOT NULL'))
+
+    with op.batch_alter_table('visitor', schema=None) as batch_op:
+        batch_op.create_index('ix_visitor_name_number', ['name', 'number'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('visitor', schema=None) as batch_op:
+        batch_op.drop_index('ix_visitor_name_number')
+
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.drop_index('ix_request_group_code')
+        batch_op.drop_index('ix_request_timestamp')
+
+    with op.batch_alter_table('visitor_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_visitor_log_checkin_timestamp')
+        batch_op.drop_index('ix_visitor_log_timestamp')
+        batch_op.drop_index('ix_visitor_log_unique_code_timestamp')
+        batch_op.drop_index('ix_visitor_log_session_timestamp')
+        batch_op.drop_index('ix_visitor_log_visitor_id_timestamp')
@@ -0,0 +1,74 @@
+"""Add visit_session presence table
+
+Revision ID: 9d2263445037
+Revises: 2164558a9ec3
+Create Date: 2026-10-18 09:12:41.308215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '9d2263445037'
+down_revision = '2164558a9ec3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('visit_session',
+    sa.Column('id', sa.String(length=50), nullable=False),
+    sa.Column('visitor_id', sa.Integer(), nullable=True),
+    sa.Column('unique_code', sa.String(length=10), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('purpose', sa.String(length=200), nullable=True),
+    sa.Column('destination', sa.String(length=100), nullable=True),
+    sa.Column('address', sa.String(length=100), nullable=True),
+    sa.Column('approved_by_id', sa.Integer(), nullable=True),
+    sa.Column('check_in_time', postgresql.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('check_out_time', postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('check_in_gate', sa.String(length=50), nullable=True),
+    sa.Column('check_out_gate', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['approved_by_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['visitor_id'], ['visitor.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('visit_session', schema=None) as batch_op:
+        batch_op.create_index('ix_visit_session_open_visitor', ['visitor_id', 'check_in_time'], unique=False,
+                              postgresql_where=sa.text('check_out_time IS NULL'))
+        batch_op.create_index('ix_visit_session_open_code', ['unique_code'], unique=False,
+                              postgresql_where=sa.text('check_out_time IS NULL'))
+        batch_op.create_index('ix_visit_session_check_in_time', ['check_in_time'], unique=False)
+
+    # Backfill one row per existing visit: first check-in opens it, last check-out closes it
+    op.execute("""
+        WITH ins AS (
+            SELECT DISTINCT ON (visit_session_id) *
+            FROM visitor_log
+            WHERE status = 'Checked-In' AND visit_session_id IS NOT NULL
+            ORDER BY visit_session_id, timestamp
+        ), outs AS (
+            SELECT DISTINCT ON (visit_session_id) visit_session_id, timestamp, check_out_gate
+            FROM visitor_log
+            WHERE status = 'Checked-Out' AND visit_session_id IS NOT NULL
+            ORDER BY visit_session_id, timestamp DESC
+        )
+        INSERT INTO visit_session (
+            id, visitor_id, unique_code, name, purpose, destination, address, approved_by_id,
+            check_in_time, check_out_time, check_in_gate, check_out_gate
+        )
+        SELECT ins.visit_session_id, ins.visitor_id, ins.unique_code, ins.name, ins.purpose,
+               ins.destination, ins.address, ins.approved_by_id,
+               ins.timestamp, outs.timestamp, ins.check_in_gate, outs.check_out_gate
+        FROM ins LEFT JOIN outs ON outs.visit_session_id = ins.visit_session_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('visit_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_visit_session_check_in_time')
+        batch_op.drop_index('ix_visit_session_open_code')
+        batch_op.drop_index('ix_visit_session_open_visitor')
+
+    op.drop_table('visit_session')
@@ -0,0 +1,80 @@
+"""Add analytics check-in rollup tables
+
+Revision ID: c41f8e2a7d90
+Revises: 7b4e2d91c5a3
+Create Date: 2026-10-18 15:02:41.603118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f8e2a7d90'
+down_revision = '7b4e2d91c5a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('hourly_checkin_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('hour', sa.SmallInteger(), nullable=False),
+    sa.Column('destination', sa.String(length=100), nullable=False),
+    sa.Column('gate', sa.String(length=50), nullable=False),
+    sa.Column('checkins', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'hour', 'destination', 'gate')
+    )
+    op.create_table('daily_destination_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('destination', sa.String(length=100), nullable=False),
+    sa.Column('checkins', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'destination')
+    )
+    op.create_table('daily_visitor_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('checkins', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'name')
+    )
+    op.create_table('monthly_visitor_rollup',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('checkins', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('month', 'name')
+    )
+
+    # Backfill from the existing history (same SQL as `flask analytics-rebuild`)
+    op.execute("""
+        INSERT INTO hourly_checkin_rollup (day, hour, destination, gate, checkins)
+        SELECT (timestamp AT TIME ZONE 'Asia/Manila')::date,
+               extract(hour FROM timestamp AT TIME ZONE 'Asia/Manila')::smallint,
+               destination, coalesce(check_in_gate, ''), count(*)
+        FROM visitor_log WHERE status = 'Checked-In'
+        GROUP BY 1, 2, 3, 4
+    """)
+    op.execute("""
+        INSERT INTO daily_destination_rollup (day, destination, checkins)
+        SELECT (timestamp AT TIME ZONE 'Asia/Manila')::date, destination, count(*)
+        FROM visitor_log WHERE status = 'Checked-In'
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO daily_visitor_rollup (day, name, checkins)
+        SELECT (timestamp AT TIME ZONE 'Asia/Manila')::date, name, count(*)
+        FROM visitor_log WHERE status = 'Checked-In'
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO monthly_visitor_rollup (month, name, checkins)
+        SELECT date_trunc('month', timestamp AT TIME ZONE 'Asia/Manila')::date, name, count(*)
+        FROM visitor_log WHERE status = 'Checked-In'
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade():
+    op.drop_table('monthly_visitor_rollup')
+    op.drop_table('daily_visitor_rollup')
+    op.drop_table('daily_destination_rollup')
+    op.drop_table('hourly_checkin_rollup')
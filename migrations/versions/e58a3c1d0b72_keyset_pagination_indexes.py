@@ -0,0 +1,33 @@
+"""Indexes for keyset pagination of the Logs and Request pages
+
+Revision ID: e58a3c1d0b72
+Revises: c41f8e2a7d90
+Create Date: 2026-10-18 16:40:12.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58a3c1d0b72'
+down_revision = 'c41f8e2a7d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.create_index('ix_request_timestamp_id', ['timestamp', 'id'], unique=False)
+        batch_op.drop_index('ix_request_timestamp')
+
+    op.create_index('ix_visit_session_last_activity', 'visit_session',
+                    [sa.text('coalesce(check_out_time, check_in_time)'), 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_visit_session_last_activity', table_name='visit_session')
+
+    with op.batch_alter_table('request', schema=None) as batch_op:
+        batch_op.create_index('ix_request_timestamp', [sa.text('timestamp DESC')], unique=False)
+        batch_op.drop_index('ix_request_timestamp_id')
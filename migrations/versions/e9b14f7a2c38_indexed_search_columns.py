@@ -0,0 +1,64 @@
+"""Indexed search_text columns for visitor_log and request
+
+Revision ID: e9b14f7a2c38
+Revises: e58a3c1d0b72
+Create Date: 2026-10-18 18:05:47.219364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b14f7a2c38'
+down_revision = 'e58a3c1d0b72'
+branch_labels = None
+depends_on = None
+
+# name, email (split at @ and .), phone digits and codes, lower-cased (same as search_text_sql in app/models.py)
+VISITOR_LOG_SEARCH_TEXT = (
+    "lower(name || ' ' || translate(coalesce(email, ''), '@.', '  ') || ' ' || "
+    "regexp_replace(coalesce(number, ''), '[^0-9]', '', 'g') || ' ' || coalesce(unique_code, ''))"
+)
+REQUEST_SEARCH_TEXT = (
+    "lower(name || ' ' || translate(coalesce(email, ''), '@.', '  ') || ' ' || "
+    "regexp_replace(coalesce(number, ''), '[^0-9]', '', 'g') || ' ' || coalesce(unique_code, '') || ' ' || "
+    "coalesce(group_code, ''))"
+)
+TABLES = (('visitor_log', VISITOR_LOG_SEARCH_TEXT), ('request', REQUEST_SEARCH_TEXT))
+
+
+def _create_trigram_extension():
+    # pg_trgm is optional: without it (or without the right to create it) search
+    # falls back to the full-text index, see app/utils/search.py
+    bind = op.get_bind()
+    savepoint = bind.begin_nested()
+    try:
+        bind.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        savepoint.commit()
+        return True
+    except sa.exc.DBAPIError as e:
+        savepoint.rollback()
+        print(f"pg_trgm not available ({str(e.orig).splitlines()[0]}); search uses the full-text index only")
+        return False
+
+
+def upgrade():
+    for table, expression in TABLES:
+        op.add_column(table, sa.Column('search_text', sa.Text(), sa.Computed(expression, persisted=True), nullable=True))
+        op.create_index(f'ix_{table}_search_fts', table,
+                        [sa.text("to_tsvector('simple'::regconfig, search_text)")],
+                        unique=False, postgresql_using='gin')
+
+    if _create_trigram_extension():
+        for table, _ in TABLES:
+            op.create_index(f'ix_{table}_search_trgm', table,
+                            [sa.text('search_text gin_trgm_ops')],
+                            unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    for table, _ in TABLES:
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_trgm')
+        op.drop_index(f'ix_{table}_search_fts', table_name=table)
+        op.drop_column(table, 'search_text')
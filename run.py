@@ -2,9 +2,11 @@ import eventlet
 eventlet.monkey_patch()
 
 from app import create_app, socketio
+from app.email_outbox import start_outbox_dispatcher
 import os
 
 app = create_app()
+start_outbox_dispatcher(app)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))  # 5000 for local default
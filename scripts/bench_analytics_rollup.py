@@ -0,0 +1,125 @@
+"""
+Analytics endpoint queries over a one-year range: aggregating the raw
+VisitorLog table (the old /api/destination_distribution, /api/top_visitors and
+/api/visitor_trend) vs reading the rollups in app/analytics_rollup.py.
+
+Seeds a throw-away schema in the DATABASE_URL database with --logs visitor logs
+spread over --days days, builds the rollups with the same code as
+`flask analytics-rebuild`, then times each query.
+
+    python scripts/bench_analytics_rollup.py [--logs 500000] [--days 730]
+
+The schema is dropped at the end.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, func, text
+from app import create_app, db
+from app import analytics_rollup as rollup
+from app.models import VisitorLog
+from app.utils.helpers import get_current_time, in_manila_days
+
+SCHEMA = "bench_rollup"
+REPEAT = 5
+
+SEED_SQL = """
+    INSERT INTO visitor_log (name, email, number, purpose, destination, address, status,
+                             timestamp, visit_session_id, check_in_gate)
+    SELECT 'Visitor ' || (i % 5000), '', '0900', 'Campus Tour',
+           (ARRAY['Library', 'Registrar', 'Gym', 'Admin Office', 'Canteen'])[1 + i % 5], 'Balayan',
+           CASE WHEN i % 2 = 0 THEN 'Checked-In' ELSE 'Checked-Out' END,
+           now() - (random() * :days || ' days')::interval, 'S' || (i / 2),
+           (ARRAY['Gate 1', 'Gate 2', NULL])[1 + i % 3]
+    FROM generate_series(1, :logs) AS i
+"""
+
+
+def raw_queries(start, end):
+    checked_in = VisitorLog.status == "Checked-In"
+    in_range = in_manila_days(VisitorLog.timestamp, start, end)
+    date_column = func.date(func.timezone('Asia/Manila', VisitorLog.timestamp))
+    return {
+        "destination_distribution": lambda: db.session.query(VisitorLog.destination, func.count(VisitorLog.id))
+            .filter(checked_in, in_range).group_by(VisitorLog.destination)
+            .order_by(func.count(VisitorLog.id).desc()).all(),
+        "top_visitors": lambda: db.session.query(VisitorLog.name, func.count(VisitorLog.id))
+            .filter(checked_in, in_range).group_by(VisitorLog.name)
+            .order_by(func.count(VisitorLog.id).desc()).limit(5).all(),
+        "visitor_trend": lambda: db.session.query(date_column, func.count(VisitorLog.id))
+            .filter(checked_in, in_range).group_by(date_column).order_by(date_column).all(),
+    }
+
+
+def rollup_queries(start, end):
+    return {
+        "destination_distribution": lambda: rollup.destination_counts(start, end),
+        "top_visitors": lambda: rollup.top_visitors(start, end, limit=5),
+        "visitor_trend": lambda: rollup.daily_counts(start, end),
+    }
+
+
+def timed(fn):
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=500_000, help="number of visitor logs to seed")
+    parser.add_argument("--days", type=int, default=730, help="history length in days")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", "")
+    if not database_url.startswith("postgres"):
+        sys.exit("This benchmark needs PostgreSQL (DATABASE_URL).")
+    admin = create_engine(database_url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    # every connection of the app below works inside the schema (rebuild() commits)
+    sep = "&" if "?" in database_url else "?"
+    os.environ["DATABASE_URL"] = f"{database_url}{sep}options={quote(f'-csearch_path={SCHEMA}')}"
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.execute(text(SEED_SQL), {"logs": args.logs, "days": args.days})
+            db.session.commit()
+            started = time.perf_counter()
+            rollup.rebuild()
+            print(f"Seeded {args.logs:,} logs over {args.days} days; full rollup rebuild took "
+                  f"{time.perf_counter() - started:.2f} s")
+            db.session.execute(text("ANALYZE"))
+            db.session.commit()
+
+            end = get_current_time().date()
+            start = end - timedelta(days=364)
+            print(f"Range {start} .. {end} (median of {REPEAT})")
+            raw, rolled = raw_queries(start, end), rollup_queries(start, end)
+            for name in raw:
+                raw_ms, raw_rows = timed(raw[name])
+                rollup_ms, rollup_rows = timed(rolled[name])
+                same = sorted(map(tuple, raw_rows)) == sorted((k, int(v)) for k, v in rollup_rows)
+                print(f"- {name:<26} raw {raw_ms:8.1f} ms   rollup {rollup_ms:6.1f} ms   "
+                      f"{raw_ms / rollup_ms:6.0f}x   results {'match' if same else 'DIFFER'}")
+            db.session.rollback()
+    finally:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Codes allocated per second: the old one-query-per-candidate loop vs the bulk
+allocator in app/utils/code_allocator.py.
+
+Seeds a throw-away schema with --existing requests (default 100,000) in the
+database pointed to by DATABASE_URL, then allocates --count codes each way.
+
+    python scripts/bench_code_allocator.py [--existing 100000] [--count 5000]
+
+The schema is dropped at the end.
+"""
+import argparse
+import os
+import secrets
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import text
+from app import create_app, db
+from app.models import Request
+from app.utils.code_allocator import allocate_code, allocate_codes
+
+SCHEMA = "bench_codes"
+
+SEED_SQL = """
+    INSERT INTO request (name, email, number, purpose, destination, address, status,
+                         timestamp, unique_code, group_code)
+    SELECT 'Visitor ' || i, 'r' || i || '@example.com', '0900' || i, 'Campus Tour', 'Library',
+           'Balayan', 'Approve', now(), 'R' || lpad(i::text, 7, '0'),
+           CASE WHEN i % 10 = 0 THEN 'G' || lpad(i::text, 7, '0') END
+    FROM generate_series(1, :existing) AS i
+"""
+
+
+def legacy_code(length=8):
+    """The original generate_unique_secure_code: one query per candidate."""
+    characters = string.ascii_uppercase + string.digits
+    while True:
+        code = ''.join(secrets.choice(characters) for _ in range(length))
+        if not Request.query.filter_by(unique_code=code).first():
+            return code
+
+
+def measure(label, fn, count):
+    started = time.perf_counter()
+    codes = fn(count)
+    elapsed = time.perf_counter() - started
+    assert len(set(codes)) == count
+    print(f"- {label:<28} {count / elapsed:10.0f} codes/s  ({elapsed * 1000:.0f} ms for {count:,})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--existing", type=int, default=100_000, help="number of requests to seed")
+    parser.add_argument("--count", type=int, default=5000, help="number of codes to allocate per case")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            sys.exit("This benchmark needs PostgreSQL (DATABASE_URL).")
+
+        db.session.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        db.session.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        db.session.commit()
+        try:
+            # everything below runs on one connection inside one transaction
+            db.session.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+            db.metadata.create_all(db.session.connection())
+            db.session.execute(text(SEED_SQL), {"existing": args.existing})
+            db.session.execute(text("ANALYZE request"))
+            print(f"Seeded {args.existing:,} requests")
+
+            measure("per-code query (old)", lambda n: [legacy_code() for _ in range(n)], args.count)
+            measure("allocate_code() x N", lambda n: [allocate_code() for _ in range(n)], args.count)
+            measure("allocate_codes(100) batches", lambda n: [
+                code for _ in range(n // 100) for code in allocate_codes(100)
+            ], args.count - args.count % 100)
+            measure("allocate_codes(N)", allocate_codes, args.count)
+        finally:
+            db.session.rollback()
+            db.session.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measures QR PNG generation: the old qrcode.make() path vs the tuned renderer
+in app/utils/qr_render.py, uncached and served from the LRU cache.
+
+    python scripts/bench_qr_render.py [--count 500]
+
+Reports images/sec and average PNG size for each case.
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import qrcode
+from app.utils.qr_render import _render, render_qr_png, qr_cache_info
+
+
+def legacy(data):
+    img = qrcode.make(data)
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def measure(label, fn, codes):
+    started = time.perf_counter()
+    sizes = [len(fn(code)) for code in codes]
+    elapsed = time.perf_counter() - started
+    print(f"- {label:<22} {len(codes) / elapsed:8.0f} img/s   avg {sum(sizes) / len(sizes):5.0f} B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="number of distinct codes to render")
+    args = parser.parse_args()
+
+    codes = [f"{i:08X}" for i in range(args.count)]
+
+    measure("qrcode.make()", legacy, codes)
+    measure("tuned, uncached", lambda code: _render(code, "email"), codes)
+    for code in codes:  # warm the cache
+        render_qr_png(code)
+    measure("tuned, cache hit", render_qr_png, codes)
+    print(f"cache: {qr_cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
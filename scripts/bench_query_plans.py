@@ -0,0 +1,173 @@
+"""
+Shows how the hot VisitorLog / Request queries are planned before and after
+the indexes added in migration 3f1c7a9b2e64.
+
+Seeds a throw-away schema (default: 1,000,000 visitor logs) in the database
+pointed to by DATABASE_URL, runs EXPLAIN ANALYZE on each query shape without
+the indexes, creates them, and runs it again.
+
+    python scripts/bench_query_plans.py [--rows 1000000] [--keep]
+
+The schema is dropped at the end unless --keep is given.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from app import create_app, db
+from app.models import VisitorLog, Request, Visitor
+
+SCHEMA = "bench_plans"
+
+# Indexes whose effect is measured (everything declared on the models apart from unique constraints)
+BENCH_INDEXES = [
+    idx for table in (VisitorLog.__table__, Request.__table__, Visitor.__table__)
+    for idx in table.indexes if idx.name and idx.name.startswith("ix_")
+]
+
+QUERIES = {
+    "latest log of a visitor": (
+        "SELECT * FROM visitor_log WHERE visitor_id = 4242 ORDER BY timestamp DESC LIMIT 1"
+    ),
+    "logs of one visit": (
+        "SELECT * FROM visitor_log WHERE visit_session_id = md5('4242') ORDER BY timestamp"
+    ),
+    "latest log of a code": (
+        "SELECT * FROM visitor_log WHERE unique_code = 'C4242' ORDER BY timestamp DESC LIMIT 1"
+    ),
+    "logs page (one Manila day)": (
+        "SELECT visit_session_id, max(timestamp) FROM visitor_log "
+        "WHERE timestamp >= now() - interval '3 days' AND timestamp < now() - interval '2 days' "
+        "GROUP BY visit_session_id ORDER BY max(timestamp) DESC LIMIT 10"
+    ),
+    "analytics destinations (one week)": (
+        "SELECT destination, count(id) FROM visitor_log "
+        "WHERE status = 'Checked-In' AND timestamp >= now() - interval '8 days' "
+        "AND timestamp < now() - interval '1 day' GROUP BY destination"
+    ),
+    "request page (one day)": (
+        "SELECT * FROM request WHERE timestamp >= now() - interval '3 days' "
+        "AND timestamp < now() - interval '2 days' ORDER BY timestamp DESC LIMIT 10"
+    ),
+    "group scan": (
+        "SELECT * FROM request WHERE group_code = 'G42'"
+    ),
+    "visitor by name + number": (
+        "SELECT * FROM visitor WHERE name = 'Visitor 4242' AND number = '09004242'"
+    ),
+}
+
+SEED_SQL = [
+    # visitors
+    """
+    INSERT INTO visitor (id, name, email, number, qr_code, last_purpose, last_address, last_destination)
+    SELECT i, 'Visitor ' || i, 'v' || i || '@example.com', '0900' || i, 'Q' || i,
+           'Campus Tour', 'Balayan', 'General'
+    FROM generate_series(1, :visitors) AS i
+    """,
+    # requests, about 10% of them in groups of 10
+    """
+    INSERT INTO request (id, name, email, number, purpose, destination, address, status,
+                         timestamp, unique_code, group_code)
+    SELECT i, 'Visitor ' || (i % :visitors + 1), 'r' || i || '@example.com', '0900' || i,
+           'Campus Tour', 'Library', 'Balayan', 'Approve',
+           now() - (i * interval '5 minutes'), 'R' || i,
+           CASE WHEN i % 10 = 0 THEN 'G' || (i / 100) END
+    FROM generate_series(1, :requests) AS i
+    """,
+    # logs: pairs of check-in / check-out rows sharing a visit_session_id
+    """
+    INSERT INTO visitor_log (visitor_id, name, email, number, purpose, destination, address,
+                             status, timestamp, unique_code, visit_session_id)
+    SELECT (i / 2) % :visitors + 1, 'Visitor ' || ((i / 2) % :visitors + 1), 'v@example.com', '0900',
+           'Campus Tour',
+           (ARRAY['Library', 'Registrar', 'Canteen', 'Gym', 'General'])[i % 5 + 1],
+           'Balayan',
+           CASE WHEN i % 2 = 0 THEN 'Checked-In' ELSE 'Checked-Out' END,
+           now() - (i * interval '30 seconds'),
+           'C' || ((i / 2) % :visitors + 1),
+           md5((i / 2)::text)
+    FROM generate_series(1, :rows) AS i
+    """,
+]
+
+
+def scan_nodes(plan_lines):
+    """Scan node types in the plan, e.g. ['Index Scan using ix_... on visitor_log']."""
+    nodes = []
+    for line in plan_lines:
+        match = re.search(r"((?:Parallel )?(?:Seq|Index Only|Index|Bitmap Index|Bitmap Heap) Scan[^(]*)", line)
+        if match:
+            nodes.append(match.group(1).strip())
+    return nodes
+
+
+def explain(conn, sql):
+    plan = [row[0] for row in conn.execute(text("EXPLAIN ANALYZE " + sql))]
+    timing = next((l for l in reversed(plan) if l.startswith("Execution Time")), "")
+    return scan_nodes(plan), timing
+
+
+def run_round(conn, label):
+    print(f"\n=== {label} ===")
+    for name, sql in QUERIES.items():
+        nodes, timing = explain(conn, sql)
+        print(f"- {name}: {timing}")
+        for node in nodes:
+            print(f"    {node}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of visitor_log rows to seed")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded schema afterwards")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != "postgresql":
+            sys.exit("This benchmark needs PostgreSQL (DATABASE_URL).")
+
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        schema_engine = engine.execution_options(schema_translate_map={None: SCHEMA})
+
+        try:
+            with schema_engine.begin() as conn:
+                conn.execute(text(f"SET search_path TO {SCHEMA}"))
+                db.metadata.create_all(conn)
+                for idx in BENCH_INDEXES:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {idx.name}"))
+
+                params = {"rows": args.rows, "visitors": max(args.rows // 20, 10), "requests": max(args.rows // 10, 10)}
+                started = time.perf_counter()
+                for sql in SEED_SQL:
+                    conn.execute(text(sql), params)
+                conn.execute(text("ANALYZE"))
+                print(f"Seeded {args.rows:,} logs in {time.perf_counter() - started:.1f}s")
+
+                run_round(conn, "without indexes")
+
+                started = time.perf_counter()
+                for idx in BENCH_INDEXES:
+                    conn.execute(CreateIndex(idx))
+                conn.execute(text("ANALYZE"))
+                print(f"\nBuilt {len(BENCH_INDEXES)} indexes in {time.perf_counter() - started:.1f}s")
+
+                run_round(conn, "with indexes")
+        finally:
+            if not args.keep:
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
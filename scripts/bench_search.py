@@ -0,0 +1,158 @@
+"""
+Logs search over a large visitor_log table: the old `name ILIKE '%q%'` filter
+(a sequential scan that only ever looked at names) vs the indexed search_text
+search in app/utils/search.py.
+
+Seeds a throw-away schema in the DATABASE_URL database with --logs visitor logs,
+then times, for a few typical searches, the two things the Logs page and the
+export need: the number of matching logs and the 25 newest matching visits.
+When the pg_trgm extension can be created the trigram index is timed as well;
+otherwise only the full-text fallback is.
+
+    python scripts/bench_search.py [--logs 1000000]
+
+The schema is dropped at the end.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, func, text
+from app import create_app, db
+from app.models import VisitorLog
+from app.utils import search
+
+SCHEMA = "bench_search"
+REPEAT = 5
+
+SEED_SQL = """
+    INSERT INTO visitor_log (name, email, number, purpose, destination, address, status,
+                             timestamp, visit_session_id, unique_code)
+    SELECT f.name || ' ' || chr(65 + (i / 7) % 26) || '. ' || l.name,
+           lower(f.name) || '.' || lower(l.name) || (i % 97) || '@gmail.com',
+           '09' || lpad(((i::bigint * 7919) % 1000000000)::text, 9, '0'),
+           'Campus Tour', 'Library', 'Balayan',
+           CASE WHEN i % 2 = 0 THEN 'Checked-In' ELSE 'Checked-Out' END,
+           now() - (random() * 730 || ' days')::interval, 'S' || (i / 2),
+           upper(substr(md5((i / 2)::text), 1, 8))
+    FROM generate_series(1, :logs) AS i
+    JOIN (SELECT row_number() OVER () - 1 AS n, name FROM unnest(ARRAY[
+        'Juan', 'Maria', 'Jose', 'Ana', 'Pedro', 'Rosa', 'Carlo', 'Liza', 'Mark', 'Grace',
+        'Paolo', 'Joy', 'Miguel', 'Kristine', 'Angelo', 'Camille', 'Rafael', 'Bea', 'Noel', 'Trisha'
+    ]) AS name) AS f ON f.n = i % 20
+    JOIN (SELECT row_number() OVER () - 1 AS n, name FROM unnest(ARRAY[
+        'Dela Cruz', 'Santos', 'Reyes', 'Garcia', 'Mendoza', 'Bautista', 'Villanueva', 'Ramos',
+        'Castillo', 'Aquino', 'Navarro', 'Torres', 'Flores', 'Gonzales', 'Lopez', 'Manalo',
+        'Panganiban', 'Soriano', 'Velasco', 'Zamora'
+    ]) AS name) AS l ON l.n = (i / 20) % 20
+"""
+
+
+def searches(sample):
+    return {
+        "common first name": "juan",
+        "full name": sample.name,
+        "surname": "panganiban",
+        "phone number": f"{sample.number[:4]} {sample.number[4:7]} {sample.number[7:]}",
+        "email": sample.email,
+        "visit code": sample.unique_code,
+    }
+
+
+def old_queries(q):
+    condition = VisitorLog.name.ilike(f"%{q}%")
+    return (
+        lambda: db.session.query(func.count(VisitorLog.id)).filter(condition).scalar(),
+        lambda: db.session.query(VisitorLog.visit_session_id).filter(condition)
+            .group_by(VisitorLog.visit_session_id).order_by(func.max(VisitorLog.timestamp).desc()).limit(25).all(),
+    )
+
+
+def new_queries(q):
+    condition = search.search_condition(VisitorLog.search_text, q)
+    return (
+        lambda: db.session.query(func.count(VisitorLog.id)).filter(condition).scalar(),
+        lambda: db.session.query(VisitorLog.visit_session_id).filter(condition)
+            .group_by(VisitorLog.visit_session_id).order_by(func.max(VisitorLog.timestamp).desc()).limit(25).all(),
+    )
+
+
+def timed(fn):
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def run(queries, q):
+    count_ms, count = timed(queries(q)[0])
+    page_ms, _ = timed(queries(q)[1])
+    return count_ms, page_ms, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=1_000_000, help="number of visitor logs to seed")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", "")
+    if not database_url.startswith("postgres"):
+        sys.exit("This benchmark needs PostgreSQL (DATABASE_URL).")
+    admin = create_engine(database_url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    sep = "&" if "?" in database_url else "?"
+    os.environ["DATABASE_URL"] = f"{database_url}{sep}options={quote(f'-csearch_path={SCHEMA}')}"
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            db.session.execute(text(SEED_SQL), {"logs": args.logs})
+            db.session.commit()
+            print(f"Seeded {args.logs:,} logs in {time.perf_counter() - started:.1f} s")
+
+            modes = ["full-text"]
+            try:
+                db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                trgm_schema = db.session.execute(text(
+                    "SELECT extnamespace::regnamespace::text FROM pg_extension WHERE extname = 'pg_trgm'"
+                )).scalar()
+                db.session.execute(text("CREATE INDEX ix_visitor_log_search_trgm ON visitor_log "
+                                        f"USING gin (search_text {trgm_schema}.gin_trgm_ops)"))
+                db.session.commit()
+                modes.append("trigram")
+            except Exception as e:
+                db.session.rollback()
+                print(f"pg_trgm not available ({str(e).splitlines()[0]}); timing the full-text fallback only")
+            db.session.execute(text("ANALYZE"))
+            db.session.commit()
+
+            sample = db.session.query(VisitorLog).order_by(VisitorLog.id).offset(args.logs // 3).first()
+            print(f"Median of {REPEAT}; 'count' = all matching logs, 'page' = 25 newest matching visits")
+            for label, q in searches(sample).items():
+                old_count_ms, old_page_ms, old_count = run(old_queries, q)
+                print(f"- {label:<18} {q!r}")
+                print(f"    old name ILIKE  count {old_count_ms:8.1f} ms   page {old_page_ms:8.1f} ms   {old_count:>7,} matches")
+                for mode in modes:
+                    # pretend only the index being timed exists
+                    search._trigram_tables[str(db.engine.url)] = {"visitor_log"} if mode == "trigram" else set()
+                    count_ms, page_ms, count = run(new_queries, q)
+                    print(f"    {mode:<15} count {count_ms:8.1f} ms   page {page_ms:8.1f} ms   {count:>7,} matches")
+            db.session.rollback()
+    finally:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
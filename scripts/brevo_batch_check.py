@@ -0,0 +1,153 @@
+"""
+Checks the Brevo batch mode against scripts/fake_brevo_server.py (started here
+on a free port): sends a group of members through send_group_qr_batch, reads
+back the payloads the fake server received and checks that every message
+version addresses one member and links a QR image that the app serves (not
+cacheable by shared proxies, rate limited, expiring) and that decodes to that
+member's own code. Also checks the fallback without PUBLIC_BASE_URL (one email
+per member, individual QR attached) and the batch / fallback counters of the
+Brevo metrics.
+
+    python scripts/brevo_batch_check.py [--members 7] [--batch-size 3]
+
+Only the app's config and routes are used; nothing is written to the database.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import threading
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cv2
+import numpy as np
+from scripts.fake_brevo_server import serve
+
+PUBLIC_BASE_URL = "https://vms.example.test"
+
+
+def _get(base, path):
+    with urllib.request.urlopen(base + path) as response:
+        return json.loads(response.read())
+
+
+def _decode(png):
+    img = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_COLOR)
+    data, _, _ = cv2.QRCodeDetector().detectAndDecode(img)
+    return data or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=3)
+    args = parser.parse_args()
+
+    server = serve(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    fake = f"http://127.0.0.1:{server.server_address[1]}"
+
+    os.environ.update(BREVO_API_HOST=f"{fake}/v3", BREVO_API_KEY="fake", BREVO_BATCH_MODE="true",
+                      BREVO_BATCH_SIZE=str(args.batch_size), PUBLIC_BASE_URL=PUBLIC_BASE_URL)
+    os.environ.setdefault("SECRET_KEY", "brevo-batch-check")
+    from app import create_app
+    from app.models import Request
+    from app.brevo_mailer import send_group_qr_batch
+    from app.brevo_client import brevo_client
+
+    app = create_app()
+    client = app.test_client()
+    group_code = uuid.uuid4().hex[:8].upper()
+    members = [Request(id=i + 1, name=f"Member {i + 1}", email=f"member{i + 1}@example.test",
+                       unique_code=uuid.uuid4().hex[:8].upper(), group_code=group_code)
+               for i in range(args.members)]
+    by_email = {r.email: r for r in members}
+    problems = []
+
+    # --- batch mode ---
+    with app.app_context():
+        stats = send_group_qr_batch(members)
+    messages = _get(fake, "/messages")
+    print(f"batch: {stats['recipients']} recipients, {stats['api_calls']} calls, "
+          f"{stats['calls_saved']} saved, {len(messages)} payloads received")
+
+    seen = set()
+    for n, payload in enumerate(messages, 1):
+        html = payload.get("htmlContent", "")
+        if "data:image" in html:
+            problems.append(f"payload {n}: QR embedded as a data: URI")
+        if "{{ params.qr_url }}" not in html:
+            problems.append(f"payload {n}: html does not use params.qr_url")
+        if [a["name"] for a in payload.get("attachment") or []] != ["Group-QR.png"]:
+            problems.append(f"payload {n}: expected the group QR as the only attachment")
+        for version in payload.get("messageVersions") or []:
+            to = [t["email"] for t in version.get("to") or []]
+            member = by_email.get(to[0]) if len(to) == 1 else None
+            if member is None:
+                problems.append(f"payload {n}: version not addressed to exactly one member: {to}")
+                continue
+            seen.add(member.email)
+            url = version.get("params", {}).get("qr_url", "")
+            if not url.startswith(PUBLIC_BASE_URL + "/"):
+                problems.append(f"{member.email}: QR url {url!r} is not under PUBLIC_BASE_URL")
+                continue
+            response = client.get(url[len(PUBLIC_BASE_URL):])
+            if response.status_code != 200 or response.mimetype != "image/png":
+                problems.append(f"{member.email}: QR url answered {response.status_code} {response.mimetype}")
+            elif _decode(response.data) != member.unique_code:
+                problems.append(f"{member.email}: QR image does not decode to {member.unique_code}")
+            elif response.headers.get("Cache-Control") != "private, no-store":
+                problems.append(f"{member.email}: QR image sent with Cache-Control {response.headers.get('Cache-Control')!r}")
+    missing = set(by_email) - seen
+    if missing:
+        problems.append(f"no version for {sorted(missing)}")
+    if client.get("/qr/not-a-token.png").status_code != 404:
+        problems.append("an unsigned token was served")
+    some_url = messages[0]["messageVersions"][0]["params"]["qr_url"][len(PUBLIC_BASE_URL):] if messages else None
+    if some_url:
+        max_age, app.config['QR_LINK_MAX_AGE'] = app.config['QR_LINK_MAX_AGE'], -1  # every token is now too old
+        if client.get(some_url).status_code != 404:
+            problems.append("an expired token was served")
+        app.config['QR_LINK_MAX_AGE'] = max_age
+        statuses = [client.get(some_url).status_code for _ in range(15)]
+        if 429 not in statuses:
+            problems.append("QR image route is not rate limited for anonymous clients")
+
+    # --- fallback without PUBLIC_BASE_URL ---
+    urllib.request.urlopen(urllib.request.Request(f"{fake}/reset", data=b"{}", method="POST")).close()
+    app.config['PUBLIC_BASE_URL'] = None
+    with app.app_context():
+        stats = send_group_qr_batch(members)
+    messages = _get(fake, "/messages")
+    print(f"fallback: {stats['api_calls']} calls, {len(messages)} payloads received")
+    for payload in messages:
+        to = [t["email"] for t in payload.get("to") or []]
+        member = by_email.get(to[0]) if len(to) == 1 else None
+        attachments = {a["name"]: a["content"] for a in payload.get("attachment") or []}
+        individual = attachments.get("Individual-QR.png")
+        if member is None or individual is None or _decode(base64.b64decode(individual)) != member.unique_code:
+            problems.append(f"fallback email to {to}: missing or wrong individual QR")
+    if len(messages) != len(members):
+        problems.append(f"fallback: {len(messages)} emails for {len(members)} members")
+
+    with app.app_context():
+        metrics = brevo_client.metrics()
+    print(f"metrics: {metrics['batch_recipients']} batched recipients in {metrics['batch_calls']} calls "
+          f"({metrics['calls_saved']} saved), {metrics['unbatched_group_recipients']} sent unbatched")
+    expected = (len(members), -(-len(members) // args.batch_size), len(members))
+    if (metrics['batch_recipients'], metrics['batch_calls'], metrics['unbatched_group_recipients']) != expected:
+        problems.append(f"metrics: expected batched/calls/unbatched {expected}")
+
+    server.shutdown()
+    for problem in problems:
+        print("  " + problem)
+    print(f"\nevery member gets their own QR: {'OK' if not problems else 'FAILED'}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Minimal stand-in for the Brevo transactional email API, for local testing of
+app/brevo_mailer.py without sending real mail.
+
+    python scripts/fake_brevo_server.py [--port 8025] [--fail-every N]
+    BREVO_API_HOST=http://127.0.0.1:8025/v3 BREVO_API_KEY=fake python run.py
+
+POST /v3/smtp/email   records the call and answers 201 like Brevo
+GET  /stats           JSON: api calls, recipients, connections opened and calls saved by batching
+GET  /messages        JSON list of the payloads received (see scripts/brevo_batch_check.py)
+POST /reset           clears the counters
+"""
+import argparse
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_lock = threading.Lock()
+_stats = {"api_calls": 0, "recipients": 0, "failed_calls": 0, "connections": 0, "messages": []}
+
+
+def _recipients(payload):
+    versions = payload.get("messageVersions") or []
+    if versions:
+        return sum(len(v.get("to") or []) for v in versions)
+    return len(payload.get("to") or [])
+
+
+class FakeBrevoHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive; "connections" in /stats shows the reuse
+    protocol_version = "HTTP/1.1"
+    fail_every = 0
+
+    def setup(self):
+        super().setup()
+        with _lock:
+            _stats["connections"] += 1
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with _lock:
+                stats = dict(_stats, messages=len(_stats["messages"]))
+            stats["calls_saved"] = stats["recipients"] - stats["api_calls"]
+            return self._reply(200, stats)
+        if self.path.rstrip("/") == "/messages":
+            with _lock:
+                messages = list(_stats["messages"])
+            return self._reply(200, messages)
+        self._reply(404, {"message": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.rstrip("/") == "/reset":
+            with _lock:
+                _stats.update(api_calls=0, recipients=0, failed_calls=0, connections=0, messages=[])
+            return self._reply(200, {})
+
+        if self.path.rstrip("/").endswith("/smtp/email"):
+            if not self.headers.get("api-key"):
+                return self._reply(401, {"code": "unauthorized", "message": "Key not found"})
+            with _lock:
+                _stats["api_calls"] += 1
+                call_number = _stats["api_calls"]
+                fail = self.fail_every and call_number % self.fail_every == 0
+                if fail:
+                    _stats["failed_calls"] += 1
+                else:
+                    _stats["recipients"] += _recipients(payload)
+                    _stats["messages"].append(payload)
+            if fail:
+                return self._reply(500, {"code": "internal_error", "message": "simulated failure"})
+            return self._reply(201, {"messageId": f"<{uuid.uuid4()}@fake-brevo>"})
+
+        self._reply(404, {"message": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8025, fail_every=0):
+    FakeBrevoHandler.fail_every = fail_every
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeBrevoHandler)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-every", type=int, default=0, help="answer 500 to every Nth call")
+    args = parser.parse_args()
+    server = serve(args.port, args.fail_every)
+    print(f"Fake Brevo API on http://127.0.0.1:{args.port}/v3")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Shows that gate scans keep flowing while a long query runs in the same eventlet
+worker, with psycopg2 cooperative (the default, see app/green_db.py) and,
+for comparison, with DB_GREEN=false.
+
+For each mode one gunicorn eventlet worker is started on a throw-away schema in
+the DATABASE_URL database. The check takes an exclusive lock on visitor_log for
+--hold seconds, so the export query (/export-logs-excel?format=csv) sits in
+Postgres for that long, the way a slow export does, and meanwhile sends a scan
+(/scan-checkin, initial lookup of a request code; it doesn't read visitor_log)
+every 100 ms.
+
+    pip install requests
+    python scripts/green_db_check.py [--hold 3]
+
+Passes when, with DB_GREEN=true, no scan took more than a quarter of the hold
+(without it every scan waits for the export). The schema is dropped at the end.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+from sqlalchemy import create_engine, text
+from app import create_app, db
+from app.models import User, Request
+
+SCHEMA = "green_db_check"
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCAN_INTERVAL = 0.1
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def schema_url(database_url):
+    sep = "&" if "?" in database_url else "?"
+    return f"{database_url}{sep}options={quote(f'-csearch_path={SCHEMA}')}"
+
+
+def start_instance(port, env):
+    proc = subprocess.Popen(
+        ["gunicorn", "--worker-class", "eventlet", "-w", "1", "--bind", f"127.0.0.1:{port}", "run:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/help-faq", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.3)
+    proc.kill()
+    sys.exit(f"instance on port {port} did not start:\n{proc.stderr.read().decode()[-2000:]}")
+
+
+def measure(base, cookie, code, engine, hold):
+    """Holds up one export query for `hold` seconds and times scans sent meanwhile."""
+    scan = lambda: requests.post(f"{base}/scan-checkin", json={"qr_data": code},
+                                 headers={"Cookie": cookie}, timeout=120)
+    scan()  # warm-up (connection pool, first request)
+
+    export_time = []
+    def export():
+        started = time.perf_counter()
+        requests.get(f"{base}/export-logs-excel?format=csv", headers={"Cookie": cookie}, timeout=120).content
+        export_time.append(time.perf_counter() - started)
+
+    latencies, statuses = [], set()
+    with engine.connect() as conn:
+        conn.execute(text("LOCK TABLE visitor_log IN ACCESS EXCLUSIVE MODE"))
+        release = threading.Timer(hold, conn.rollback)  # ends the transaction, freeing the export
+        exporter = threading.Thread(target=export)
+        release.start()
+        exporter.start()
+        time.sleep(SCAN_INTERVAL)
+        while exporter.is_alive():
+            started = time.perf_counter()
+            statuses.add(scan().status_code)
+            latencies.append(time.perf_counter() - started)
+            time.sleep(SCAN_INTERVAL)
+        release.join()
+    exporter.join()
+    return export_time[0], latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hold", type=float, default=3, help="seconds the export query is held up")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            sys.exit("This check needs PostgreSQL (DATABASE_URL).")
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            conn.execute(text(f"SET search_path TO {SCHEMA}"))
+            db.metadata.create_all(conn)
+        db.session.execute(text(f"SET search_path TO {SCHEMA}"))
+        user = User(email="check@example.com", username="check", role="admin", gate_role="Gate 1")
+        user.set_password(uuid.uuid4().hex)
+        code = uuid.uuid4().hex[:8].upper()
+        db.session.add_all([user, Request(
+            name="Green Check", email="", number="0900", purpose="Tour", destination="Library",
+            address="Balayan", status="Approve", timestamp=db.func.now(), unique_code=code,
+        )])
+        db.session.commit()
+        serializer = app.session_interface.get_signing_serializer(app)
+        cookie = f"session={serializer.dumps({'_user_id': str(user.id), '_fresh': True})}"
+        db.session.remove()
+
+    lock_engine = create_engine(schema_url(app.config['SQLALCHEMY_DATABASE_URI']))
+    results = {}
+    try:
+        for green in ("true", "false"):
+            env = dict(
+                os.environ,
+                DATABASE_URL=schema_url(app.config['SQLALCHEMY_DATABASE_URI']),
+                EMAIL_OUTBOX_DISPATCHER="worker",
+                DB_GREEN=green,
+            )
+            env.pop("REDIS_URL", None)
+            port = free_port()
+            proc = start_instance(port, env)
+            try:
+                export_s, latencies, statuses = measure(f"http://127.0.0.1:{port}", cookie, code, lock_engine, args.hold)
+            finally:
+                proc.terminate()
+                proc.wait(10)
+            results[green] = (export_s, latencies)
+            print(f"DB_GREEN={green}: export {export_s:.2f} s; {len(latencies)} scans during it "
+                  f"(status {sorted(statuses)}), median {statistics.median(latencies) * 1000:.0f} ms, "
+                  f"slowest {max(latencies) * 1000:.0f} ms")
+    finally:
+        lock_engine.dispose()
+        with app.app_context(), db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    _, latencies = results["true"]
+    ok = len(latencies) > 1 and max(latencies) < args.hold / 4
+    print(f"\nscans keep flowing during a long query: {'OK' if ok else 'FAILED'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
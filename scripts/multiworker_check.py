@@ -0,0 +1,168 @@
+"""
+Proves the app behaves as one service when it runs as several processes:
+Socket.IO events raised on one instance reach browsers connected to another,
+and rate limits are counted once across all of them.
+
+Starts a Redis stand-in (fakeredis over TCP) unless REDIS_URL is set, then two
+gunicorn eventlet instances on separate ports that share it. The instances use
+a throw-away schema in the DATABASE_URL database, which is dropped at the end.
+
+    pip install "fakeredis[lua]" websocket-client requests
+    python scripts/multiworker_check.py
+
+Checks:
+  1. a socket on instance A (page=dashboard) receives the dashboard_update
+     caused by a scan handled by instance B
+  2. GET /forgot-password alternating between A and B is limited at its
+     shared "10 per hour", not 10 per process
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+import socketio as socketio_client
+from sqlalchemy import text
+from app import create_app, db
+from app.models import User, Request
+
+SCHEMA = "multiworker_check"
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_redis_stand_in():
+    from fakeredis import TcpFakeServer
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def schema_url(database_url):
+    sep = "&" if "?" in database_url else "?"
+    return f"{database_url}{sep}options={quote(f'-csearch_path={SCHEMA}')}"
+
+
+def start_instance(port, env):
+    proc = subprocess.Popen(
+        ["gunicorn", "--worker-class", "eventlet", "-w", "1", "--bind", f"127.0.0.1:{port}", "run:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/help-faq", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.3)
+    proc.kill()
+    sys.exit(f"instance on port {port} did not start:\n{proc.stderr.read().decode()[-2000:]}")
+
+
+def check_events(base_a, base_b, cookie, code):
+    received = threading.Event()
+    payloads = []
+    client = socketio_client.Client()
+
+    @client.on("dashboard_update")
+    def on_update(payload):
+        payloads.append(payload)
+        received.set()
+
+    client.connect(f"{base_a}?page=dashboard", transports=["websocket"], headers={"Cookie": cookie})
+    try:
+        response = requests.post(
+            f"{base_b}/scan-checkin", json={"qr_data": code, "purpose": "Tour", "destination": "Library"},
+            headers={"Cookie": cookie}, timeout=10,
+        )
+        print(f"   scan on B: {response.status_code} {response.json()}")
+        ok = received.wait(5)
+        if ok:
+            print(f"   socket on A got dashboard_update: counters={payloads[0]['counters']}")
+        return ok
+    finally:
+        client.disconnect()
+
+
+def check_limits(base_a, base_b):
+    successes = 0
+    for i in range(60):
+        base = base_a if i % 2 == 0 else base_b
+        status = requests.get(f"{base}/forgot-password", timeout=5).status_code
+        if status == 429:
+            other = base_b if base == base_a else base_a
+            other_status = requests.get(f"{other}/forgot-password", timeout=5).status_code
+            print(f"   limited after {successes} requests across both instances; other instance: {other_status}")
+            return successes <= 10 and other_status == 429
+        successes += 1
+    print(f"   no limit hit after {successes} requests")
+    return False
+
+
+def main():
+    redis_url = os.getenv("REDIS_URL") or start_redis_stand_in()
+    print(f"Redis: {redis_url}")
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            sys.exit("This check needs PostgreSQL (DATABASE_URL).")
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            conn.execute(text(f"SET search_path TO {SCHEMA}"))
+            db.metadata.create_all(conn)
+        db.session.execute(text(f"SET search_path TO {SCHEMA}"))
+        user = User(email="check@example.com", username="check", role="admin", gate_role="Gate 1")
+        user.set_password(uuid.uuid4().hex)
+        code = uuid.uuid4().hex[:8].upper()
+        db.session.add_all([user, Request(
+            name="Multi Worker", email="", number="0900", purpose="Tour", destination="Library",
+            address="Balayan", status="Approve", timestamp=db.func.now(), unique_code=code,
+        )])
+        db.session.commit()
+        serializer = app.session_interface.get_signing_serializer(app)
+        cookie = f"session={serializer.dumps({'_user_id': str(user.id), '_fresh': True})}"
+        db.session.remove()
+
+    env = dict(
+        os.environ,
+        REDIS_URL=redis_url,
+        DATABASE_URL=schema_url(app.config['SQLALCHEMY_DATABASE_URI']),
+        EMAIL_OUTBOX_DISPATCHER="worker",
+    )
+    port_a, port_b = free_port(), free_port()
+    procs = [start_instance(port_a, env), start_instance(port_b, env)]
+    base_a, base_b = f"http://127.0.0.1:{port_a}", f"http://127.0.0.1:{port_b}"
+    try:
+        print("1. Socket.IO events across instances")
+        events_ok = check_events(base_a, base_b, cookie, code)
+        print("2. Rate limits across instances")
+        limits_ok = check_limits(base_a, base_b)
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(10)
+        with app.app_context(), db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    print(f"\nevents shared: {'OK' if events_ok else 'FAILED'}")
+    print(f"limits shared: {'OK' if limits_ok else 'FAILED'}")
+    sys.exit(0 if events_ok and limits_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Query-shape check for the gate scan path: runs the /scan-checkin flows (first
+scan, check-in from the purpose modal, check-out, group scan) against a
+throw-away schema in the DATABASE_URL database, records every SQL statement
+they emit and fails if any of them joins the user table. Nothing on that path
+reads who approved or scanned a log, so such a join is pure overhead (it is
+what the old lazy="joined" relationships on VisitorLog / Request added).
+
+    python scripts/query_shape_check.py [-v]
+
+-v prints every statement. The schema is dropped at the end.
+"""
+import argparse
+import os
+import re
+import sys
+import uuid
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, event, text
+from app import create_app, db
+from app.models import User, Request
+
+SCHEMA = "query_shape_check"
+USER_JOIN = re.compile(r'\bJOIN\s+(?:\w+\.)?"?user"?(?:\s|$)', re.IGNORECASE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every statement")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL", "")
+    if not database_url.startswith("postgres"):
+        sys.exit("This check needs PostgreSQL (DATABASE_URL).")
+    admin = create_engine(database_url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    sep = "&" if "?" in database_url else "?"
+    os.environ["DATABASE_URL"] = f"{database_url}{sep}options={quote(f'-csearch_path={SCHEMA}')}"
+    app = create_app()
+    app.config['RATELIMIT_ENABLED'] = False
+
+    statements = []
+    with app.app_context():
+        db.create_all()
+        user = User(email="check@example.com", username="check", role="admin", gate_role="Gate 1")
+        user.set_password(uuid.uuid4().hex)
+        code, group = uuid.uuid4().hex[:8].upper(), uuid.uuid4().hex[:8].upper()
+        requests = [Request(name="Shape Check", email="", number="0900", purpose="Tour", destination="Library",
+                            address="Balayan", status="Approve", timestamp=db.func.now(), unique_code=code)]
+        requests += [Request(name=f"Group Member {i}", email="", number="0900", purpose="Tour",
+                             destination="Library", address="Balayan", status="Approve", timestamp=db.func.now(),
+                             unique_code=uuid.uuid4().hex[:8].upper(), group_code=group) for i in range(3)]
+        db.session.add_all([user, *requests])
+        db.session.commit()
+        user_id = user.id
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    steps = [
+        ("first scan (purpose modal)", {"qr_data": code}),
+        ("check-in from the modal", {"qr_data": code, "purpose": "Tour", "destination": "Library"}),
+        ("check-out scan", {"qr_data": code}),
+        ("group scan (check-in)", {"qr_data": group}),
+        ("group scan (check-out)", {"qr_data": group}),
+    ]
+    failures = []
+    try:
+        for label, payload in steps:
+            statements.clear()
+            response = client.post("/scan-checkin", json=payload)
+            joins = [s for s in statements if USER_JOIN.search(s)]
+            print(f"- {label:<28} {response.status_code}  {len(statements)} statements, {len(joins)} joining user")
+            for statement in statements if args.verbose else joins:
+                print("    " + " ".join(statement.split())[:300])
+            if response.status_code >= 400 or joins:
+                failures.append(label)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    print(f"\nno user joins on the scan path: {'OK' if not failures else 'FAILED (' + ', '.join(failures) + ')'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,24 @@
+// All four charts read from one /api/analytics response per filter. The first
+// chart to ask starts the request and the others reuse it; the browser
+// revalidates it with its ETag, so an unchanged range comes back as a 304.
+let analyticsRequest = null;
+
+function fetchAnalytics(params = {}) {
+  const query = new URLSearchParams(params).toString();
+  if (!analyticsRequest || analyticsRequest.query !== query) {
+    const promise = fetch("/api/analytics" + (query ? "?" + query : ""))
+      .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+      });
+    analyticsRequest = { query, promise };
+    // the charts all ask in the same tick; once settled, the next filter change fetches again
+    const done = () => { if (analyticsRequest && analyticsRequest.promise === promise) analyticsRequest = null; };
+    promise.then(done, done);
+  }
+  return analyticsRequest.promise;
+}
+
 function getFilterParams() {
   const startDate = document.getElementById("start-date").value;
   const endDate = document.getElementById("end-date").value;
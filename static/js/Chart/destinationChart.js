@@ -17,11 +17,6 @@ function setDestinationFilterDesc(desc) {
 }
 
 function fetchDestinationChartData(params = {}) {
-  // 1. Update URL to new route
-  let url = "/api/destination_distribution";
-  const query = new URLSearchParams(params).toString();
-  if (query) url += "?" + query;
-
   let filterDesc = "All Time";
   if (params.days) {
     filterDesc = params.days === "7" ? "Last 7 Days" : `Last ${params.days} Days`;
@@ -30,8 +25,8 @@ function fetchDestinationChartData(params = {}) {
   }
   setDestinationFilterDesc(filterDesc);
 
-  fetch(url)
-    .then(response => response.json())
+  fetchAnalytics(params)
+    .then(all => all.destination_distribution)
     .then(data => {
       // 2. Map 'destination' from JSON
       const destinations = data.map(entry => entry.destination);
@@ -10,11 +10,24 @@ function setDurationFilterDesc(desc) {
   currentDurationFilter = desc;
 }
 
-function fetchDurationChartData(params = {}) {
-  let url = "/api/visit_durations";
-  const query = new URLSearchParams(params).toString();
-  if (query) url += "?" + query;
+// "Median 31 min · p90 103 min · p99 200 min · Mean 44 min (2,077 visits)"
+function setDurationSummary(data) {
+  const el = document.getElementById("duration-summary");
+  if (!el) return;
+  if (!data.count) {
+    el.textContent = "";
+    return;
+  }
+  const fmt = v => (v === null || v === undefined) ? "—" : `${Math.round(v)} min`;
+  const p = data.percentiles;
+  el.textContent = `Median ${fmt(p.p50)} · p90 ${fmt(p.p90)} · p99 ${fmt(p.p99)} · ` +
+    `Mean ${fmt(data.mean_minutes)} (${data.count.toLocaleString()} visits)`;
+  el.title = data.by_destination
+    .map(d => `${d.destination}: ${fmt(d.mean_minutes)} average (${d.count} visits)`)
+    .join("\n");
+}
 
+function fetchDurationChartData(params = {}) {
   // Determine filter description (like Top Visitors)
   let filterDesc = "All Time";
   if (params.days) {
@@ -24,27 +37,22 @@ function fetchDurationChartData(params = {}) {
   }
   setDurationFilterDesc(filterDesc);
 
-  fetch(url)
-    .then(response => response.json())
+  fetchAnalytics(params)
+    .then(all => all.visit_duration_stats)
     .then(data => {
-      const durations = data.durations.map(d => Math.round(d.duration_minutes));
-      if (durations.length === 0) {
+      setDurationSummary(data);
+      if (data.count === 0) {
+        if (window.durationChartInstance) {
+          window.durationChartInstance.destroy();
+          window.durationChartInstance = null;
+        }
         document.querySelector("#duration-chart").innerHTML = "<div style='text-align:center;color:#888;'>No data for selected range.</div>";
         return;
       }
 
-      const maxDuration = Math.max(...durations);
-      const binSize = 5;
-      const bins = [];
-      for (let i = 0; i <= maxDuration; i += binSize) {
-        bins.push(i);
-      }
-
-      const histogramData = bins.map((start, index) => {
-        const end = start + binSize;
-        const count = durations.filter(d => d >= start && d < end).length;
-        return { x: `${start}-${end} min`, y: count };
-      }).filter(d => d.y > 0);
+      const histogramData = data.histogram
+        .map(b => ({ x: b.label, y: b.count }))
+        .filter(d => d.y > 0);
 
       const options = {
         chart: { 
@@ -11,10 +11,6 @@ function setTopVisitorFilterDesc(desc) {
 }
 
 function fetchTopVisitorChartData(params = {}) {
-  let url = "/api/top_visitors";
-  const query = new URLSearchParams(params).toString();
-  if (query) url += "?" + query;
-
   // Determine filter description (unified logic)
   let filterDesc = "All Time";
   if (params.days) {
@@ -24,8 +20,8 @@ function fetchTopVisitorChartData(params = {}) {
   }
   setTopVisitorFilterDesc(filterDesc);
 
-  fetch(url)
-    .then(response => response.json())
+  fetchAnalytics(params)
+    .then(all => all.top_visitors)
     .then(data => {
       const names = data.map(entry => entry.name);
       const counts = data.map(entry => entry.count);
@@ -12,10 +12,6 @@ function setTrendFilterDesc(desc) {
 }
 
 function fetchVisitorTrendChartData(params = {}) {
-  let url = "/api/visitor_trend";
-  const query = new URLSearchParams(params).toString();
-  if (query) url += "?" + query;
-
   // Determine filter description 
   let filterDesc = "All Time";
   if (params.days) {
@@ -25,8 +21,8 @@ function fetchVisitorTrendChartData(params = {}) {
   }
   setTrendFilterDesc(filterDesc);
 
-  fetch(url)
-    .then(response => response.json())
+  fetchAnalytics(params)
+    .then(all => all.visitor_trend)
     .then(data => {
       const dates = data.map(entry => entry.date);
       const counts = data.map(entry => entry.count);
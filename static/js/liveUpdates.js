@@ -0,0 +1,212 @@
+// Applies the Socket.IO deltas built by app/live_updates.py to the page in place,
+// so a scan no longer makes every open tab reload and re-run its queries.
+(function () {
+    function cell(value) {
+        const td = document.createElement('td');
+        td.textContent = (value === null || value === undefined || value === '') ? '—' : value;
+        return td;
+    }
+
+    function codeCell(value) {
+        const td = document.createElement('td');
+        const code = document.createElement('code');
+        code.textContent = value || '';
+        td.appendChild(code);
+        return td;
+    }
+
+    // Same markup as the Check-In / Check-Out tooltip badges in the templates
+    function timeCell(kind, time, gate, by) {
+        const td = document.createElement('td');
+        if (!time) {
+            td.textContent = '—';
+            return td;
+        }
+        const badge = document.createElement('span');
+        badge.className = `status-badge ${kind === 'in' ? 'status-in' : 'status-out'} tooltip`;
+        badge.appendChild(document.createTextNode(time + ' '));
+        const icon = document.createElement('i');
+        icon.className = 'fas fa-info-circle info-icon';
+        badge.appendChild(icon);
+
+        const tip = document.createElement('span');
+        tip.className = 'tooltiptext';
+        const label = document.createElement('strong');
+        label.textContent = kind === 'in' ? 'Entry:' : 'Exit:';
+        const byLabel = document.createElement('strong');
+        byLabel.textContent = 'Scanned By:';
+        tip.append(label, ` ${gate || '—'}`, document.createElement('br'), byLabel, ` ${by || '—'}`);
+        badge.appendChild(tip);
+        td.appendChild(badge);
+        return td;
+    }
+
+    function removeEmptyState(tbody) {
+        const empty = tbody.querySelector('.empty-state');
+        if (empty) empty.closest('tr').remove();
+    }
+
+    function showRefreshNotice(anchor, text) {
+        if (!anchor || document.getElementById('live-refresh-notice')) return;
+        const notice = document.createElement('div');
+        notice.id = 'live-refresh-notice';
+        notice.className = 'animate-in';
+        notice.style.cssText = 'margin: 0 0 12px; display: flex; gap: 12px; align-items: center;';
+        const label = document.createElement('span');
+        label.textContent = text;
+        const link = document.createElement('a');
+        link.href = window.location.href;
+        link.className = 'table-action-btn';
+        link.innerHTML = '<i class="fas fa-sync-alt"></i> Refresh';
+        notice.append(label, link);
+        anchor.prepend(notice);
+    }
+
+    function updateCounters(counters) {
+        if (!counters) return;
+        Object.entries(counters).forEach(([name, value]) => {
+            document.querySelectorAll(`[data-counter="${name}"]`).forEach(el => { el.textContent = value; });
+        });
+    }
+
+    const sessionColumns = {
+        dashboard: s => [
+            cell(s.name), cell(s.destination), cell(s.purpose), cell(s.address), cell(s.approved_by),
+            timeCell('in', s.check_in_time, s.gate_in, s.checked_in_by),
+            timeCell('out', s.check_out_time, s.gate_out, s.checked_out_by),
+            cell(s.visit_date_label),
+        ],
+        logs: s => [
+            cell(''), cell(s.name), cell(s.email), cell(s.number), cell(s.destination), cell(s.purpose),
+            cell(s.address), cell(s.approved_by),
+            timeCell('in', s.check_in_time, s.gate_in, s.checked_in_by),
+            timeCell('out', s.check_out_time, s.gate_out, s.checked_out_by),
+            cell(s.unique_code), cell(s.visit_date_label),
+        ],
+    };
+
+    // Patches visit rows (keyed by data-session). Rows already on the page are
+    // updated; new visits are only inserted when the table opts in with
+    // data-live-insert="true" (first page of today's list).
+    function applySessions(table, payload, layout) {
+        if (!table || !payload) return;
+        const tbody = table.tBodies[0];
+        const liveInsert = table.dataset.liveInsert === 'true';
+        const maxRows = parseInt(table.dataset.maxRows || '0', 10);
+
+        if (payload.truncated) {
+            if (liveInsert) showRefreshNotice(table.parentElement, `${payload.total} visits were updated.`);
+            return;
+        }
+
+        (payload.sessions || []).forEach(s => {
+            const existing = tbody.querySelector(`tr[data-session="${CSS.escape(s.session_id)}"]`);
+            if (!existing && !liveInsert) return;
+
+            const row = document.createElement('tr');
+            row.dataset.session = s.session_id;
+            row.className = 'animate-in';
+            row.append(...sessionColumns[layout](s));
+
+            if (existing) {
+                if (layout === 'logs') row.cells[0].textContent = existing.cells[0].textContent;
+                existing.replaceWith(row);
+            } else {
+                removeEmptyState(tbody);
+                tbody.prepend(row);
+            }
+        });
+
+        if (maxRows) {
+            const rows = tbody.querySelectorAll('tr[data-session]');
+            for (let i = maxRows; i < rows.length; i++) rows[i].remove();
+        }
+        if (layout === 'logs' && liveInsert) {
+            tbody.querySelectorAll('tr[data-session]').forEach((row, i) => { row.cells[0].textContent = i + 1; });
+        }
+    }
+
+    function checkinForm(action, wide) {
+        const form = document.createElement('form');
+        form.method = 'POST';
+        form.action = action;
+        const token = document.createElement('input');
+        token.type = 'hidden';
+        token.name = 'csrf_token';
+        token.value = document.getElementById('csrf_token')?.value || '';
+        const button = document.createElement('button');
+        button.type = 'submit';
+        button.className = 'scanner-btn primary';
+        button.style.cssText = wide ? 'width:100%; padding: 8px 12px;' : 'padding: 8px 12px;';
+        button.textContent = 'Check-In';
+        form.append(token, button);
+        return form;
+    }
+
+    function requestCells(r) {
+        return [cell(r.name), cell(r.email), cell(r.number), cell(r.destination), cell(r.purpose), cell(r.address), codeCell(r.unique_code)];
+    }
+
+    // Adds newly registered requests to the top of the Request page (first page only)
+    function applyRequests(table, payload) {
+        if (!table || !payload || table.dataset.liveInsert !== 'true') return;
+        const tbody = table.tBodies[0];
+        if (payload.truncated) {
+            showRefreshNotice(table.closest('.table-section'), `${payload.total} new requests were registered.`);
+            return;
+        }
+
+        const groups = new Map();
+        const singles = [];
+        (payload.requests || []).forEach(r => {
+            if (r.group_code) {
+                if (!groups.has(r.group_code)) groups.set(r.group_code, []);
+                groups.get(r.group_code).push(r);
+            } else {
+                singles.push(r);
+            }
+        });
+        if (!groups.size && !singles.length) return;
+        removeEmptyState(tbody);
+
+        singles.forEach(r => {
+            const row = document.createElement('tr');
+            row.className = 'animate-in';
+            const action = document.createElement('td');
+            action.appendChild(checkinForm(table.dataset.checkinUrl.replace(/0$/, r.id), false));
+            row.append(cell(''), ...requestCells(r), action);
+            tbody.prepend(row);
+        });
+
+        groups.forEach((members, groupCode) => {
+            const children = members.map(r => {
+                const row = document.createElement('tr');
+                row.className = 'child-row hidden animate-in';
+                row.dataset.group = groupCode;
+                row.append(document.createElement('td'), ...requestCells(r), document.createElement('td'));
+                return row;
+            });
+
+            const groupRow = document.createElement('tr');
+            groupRow.className = 'group-row animate-in';
+            groupRow.dataset.group = groupCode;
+            const summary = document.createElement('td');
+            summary.colSpan = 6;
+            const title = document.createElement('strong');
+            title.textContent = 'Group Request';
+            summary.append(title, ` (${members.length} members)`);
+            const action = document.createElement('td');
+            action.appendChild(checkinForm(table.dataset.groupCheckinUrl.replace('__GROUP__', encodeURIComponent(groupCode)), true));
+            groupRow.append(cell(''), summary, codeCell(groupCode), action);
+
+            tbody.prepend(groupRow, ...children);
+        });
+
+        // renumber the top-level rows
+        tbody.querySelectorAll('tr:not(.child-row)').forEach((row, i) => {
+            if (row.cells.length > 1) row.cells[0].textContent = i + 1;
+        });
+    }
+
+    window.LiveUpdates = { updateCounters, applySessions, applyRequests };
+})();